@@ -2,59 +2,65 @@
 from __future__ import annotations
 
 import asyncio
+import hashlib
 import io
 import json
 import logging
 import os
 import time
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple, cast
 
 import discord
 from discord import app_commands
 from discord.ext import commands
 from dotenv import load_dotenv
 
-from providers import (
-    AnthropicProvider,
-    GeminiProvider,
-    GrokProvider,
-    OpenAIProvider,
-    PromptRequest,
-    ProviderError,
-    ProviderRegistry,
+# Before the local imports: some modules read settings at import time. Spawned
+# workers repeat this harmlessly (the variables are already set).
+load_dotenv()
+
+from graceful import (
+    DEFAULT_DRAIN_TIMEOUT,
+    MIN_FLUSH_SECONDS,
+    RESTART_NOTICE,
+    UNFINISHED_NOTICE,
+    Deadline,
+    DrainingTree,
+    run_until_signalled,
 )
+from providers import PromptRequest, ProviderError, ProviderRegistry, build_registry
+from rendering import ATTACHMENT_NAME, mark_similar, render_response
+from retrieval import DEFAULT_TOP_K as DEFAULT_RAG_TOP_K
+from retrieval import RunbookIndex
+from semantic_cache import DEFAULT_THRESHOLD as DEFAULT_SEMANTIC_THRESHOLD
+from semantic_cache import DEFAULT_TTL as DEFAULT_SEMANTIC_TTL
+from semantic_cache import FLUSH_INTERVAL as SEMANTIC_FLUSH_INTERVAL
+from semantic_cache import SemanticCache
+from shared_state import RateLimiter, SharedState, build_shared_state
+from webhook_pool import WebhookPool, wait_posted
+from workers import DEFAULT_MAX_PENDING, DEFAULT_WORKER_CONCURRENCY, LoopLagMonitor, PoolSaturated, WorkerPool
 
 BASE_DIR = Path(__file__).resolve().parent
 PROMPTS_PATH = BASE_DIR / "prompts.json"
+DATA_DIR = Path(os.getenv("AI_ROUTER_DATA_DIR", BASE_DIR / "data"))
+COMMAND_SYNC_PATH = DATA_DIR / "command_sync.json"
+RUNBOOKS_DIR = BASE_DIR / "runbooks"
+RUNBOOK_INDEX_DIR = DATA_DIR / "runbook_index"
+DEFAULT_SERVER_STATE_PATH = BASE_DIR.parent / "discord_team_hub_blueprint" / "server_state.json"
 DEFAULT_RATE_LIMIT = 5
 DEFAULT_RATE_WINDOW = 60
+DEFAULT_CACHE_TTL = 0
+DEFAULT_METRICS_INTERVAL = 60
+DEFAULT_RAG_POLL_SECONDS = 30
+DEFAULT_MENTION_DEBOUNCE = 2.5
+MENTION_MAX_WAIT = 10.0
+MENTION_MAX_MESSAGES = 20
 
-load_dotenv()
-logging.basicConfig(level=getattr(logging, os.getenv("LOG_LEVEL", "INFO").upper(), logging.INFO))
 logger = logging.getLogger("ai-router")
 
 
-class SimpleRateLimiter:
-    def __init__(self, limit: int, window_seconds: int) -> None:
-        self.limit = limit
-        self.window = window_seconds
-        self._events: Dict[str, List[float]] = {}
-        self._lock = asyncio.Lock()
-
-    async def check(self, key: str) -> bool:
-        async with self._lock:
-            now = time.monotonic()
-            events = [stamp for stamp in self._events.get(key, []) if now - stamp < self.window]
-            if len(events) >= self.limit:
-                self._events[key] = events
-                return False
-            events.append(now)
-            self._events[key] = events
-            return True
-
-
 def load_prompts() -> Dict[str, str]:
     if not PROMPTS_PATH.exists():
         raise FileNotFoundError(f"Prompts file missing at {PROMPTS_PATH}")
@@ -62,6 +68,137 @@ def load_prompts() -> Dict[str, str]:
         return json.load(handle)
 
 
+def command_tree_signature(tree: app_commands.CommandTree, guild: Optional[discord.abc.Snowflake]) -> str:
+    """Stable hash of the payload ``tree.sync(guild=guild)`` would upload."""
+    payloads = []
+    for command in tree.get_commands(guild=guild):
+        try:
+            payloads.append(command.to_dict(tree))
+        except TypeError:  # discord.py < 2.4 serialises without the tree
+            payloads.append(command.to_dict())  # type: ignore[call-arg]
+    payloads.sort(key=lambda payload: (payload.get("type", 1), payload["name"]))
+    blob = json.dumps(payloads, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def read_sync_signatures() -> Dict[str, str]:
+    try:
+        return json.loads(COMMAND_SYNC_PATH.read_text(encoding="utf-8")).get("signatures", {})
+    except (OSError, ValueError):
+        return {}
+
+
+def write_sync_signatures(signatures: Dict[str, str]) -> None:
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_path = COMMAND_SYNC_PATH.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps({"signatures": signatures}, indent=2, sort_keys=True), encoding="utf-8")
+    os.replace(tmp_path, COMMAND_SYNC_PATH)
+
+
+@dataclass
+class _MentionBatch:
+    messages: List[discord.Message]
+    started: float
+    last_seen: float
+    full: asyncio.Event = field(default_factory=asyncio.Event)
+    timer: Optional[asyncio.Task[None]] = None
+
+
+class MentionBatcher:
+    """Per-channel debouncer that folds bursts of messages into one callback.
+
+    Each channel's batch fires once ``debounce`` seconds pass without a new
+    message, or ``max_wait`` seconds after its first message. A batch that
+    reaches ``max_messages`` fires at once, and later messages in the channel
+    start a new batch. One sleeper task per batch waits for its deadline or for
+    the batch to fill, rather than being cancelled and recreated per message.
+    ``drain`` stops batching for shutdown.
+    """
+
+    def __init__(
+        self,
+        callback: Callable[[List[discord.Message]], Awaitable[None]],
+        *,
+        debounce: float = DEFAULT_MENTION_DEBOUNCE,
+        max_wait: float = MENTION_MAX_WAIT,
+        max_messages: int = MENTION_MAX_MESSAGES,
+    ) -> None:
+        self.callback = callback
+        self.debounce = debounce
+        self.max_wait = max_wait
+        self.max_messages = max(1, max_messages)
+        # Batches still collecting messages; a full batch leaves this map before it fires.
+        self._batches: Dict[int, _MentionBatch] = {}
+        self._answering: Dict[asyncio.Task[None], discord.Message] = {}
+        self._tasks: Set[asyncio.Task[None]] = set()
+        self.accepting = True
+
+    def add(self, message: discord.Message) -> None:
+        if not self.accepting:
+            return
+        channel_id = message.channel.id
+        now = time.monotonic()
+        batch = self._batches.get(channel_id)
+        if batch is None:
+            batch = self._batches[channel_id] = _MentionBatch([], now, now)
+            batch.timer = asyncio.create_task(self._flush_when_quiet(channel_id, batch))
+            self._tasks.add(batch.timer)
+            batch.timer.add_done_callback(self._tasks.discard)
+        batch.messages.append(message)
+        batch.last_seen = now
+        if len(batch.messages) >= self.max_messages:
+            del self._batches[channel_id]
+            batch.full.set()
+
+    async def _flush_when_quiet(self, channel_id: int, batch: _MentionBatch) -> None:
+        while not batch.full.is_set():
+            now = time.monotonic()
+            deadline = min(batch.last_seen + self.debounce, batch.started + self.max_wait)
+            if now >= deadline:
+                break
+            try:
+                await asyncio.wait_for(batch.full.wait(), deadline - now)
+            except asyncio.TimeoutError:
+                pass
+        if self._batches.get(channel_id) is batch:
+            del self._batches[channel_id]
+        task = asyncio.current_task()
+        assert task is not None
+        self._answering[task] = batch.messages[-1]
+        try:
+            await self.callback(batch.messages)
+        except Exception:  # pragma: no cover - keep the batcher alive
+            logger.exception("Mention batch for channel %s failed", channel_id)
+        finally:
+            self._answering.pop(task, None)
+
+    async def drain(self, deadline: Deadline) -> None:
+        """Stop batching, tell channels with a queued batch to ask again, and let running replies finish."""
+        self.accepting = False
+        queued = list(self._batches.values())
+        self._batches.clear()
+        for batch in queued:
+            if batch.timer is not None:
+                batch.timer.cancel()
+            await _reply_quietly(batch.messages[-1], RESTART_NOTICE)
+        running = self._tasks - {batch.timer for batch in queued}
+        if not running:
+            return
+        _, pending = await asyncio.wait(running, timeout=deadline.remaining())
+        stranded = list(self._answering.values())
+        for task in pending:
+            task.cancel()
+        for message in stranded:
+            await _reply_quietly(message, UNFINISHED_NOTICE)
+
+
+async def _reply_quietly(message: discord.Message, text: str) -> None:
+    try:
+        await message.reply(text, mention_author=False)
+    except discord.HTTPException as exc:
+        logger.debug("Could not reply to message %s: %s", message.id, exc)
+
+
 @dataclass
 class BotConfig:
     token: str
@@ -71,6 +208,30 @@ class BotConfig:
     rate_limit: int
     rate_window: int
     enable_message_content: bool
+    force_command_sync: bool = False
+    state_url: Optional[str] = None
+    state_prefix: str = "ai-router:"
+    cache_ttl: int = DEFAULT_CACHE_TTL
+    shard_count: Optional[int] = None
+    shard_ids: Optional[List[int]] = None
+    workers: int = 0
+    worker_concurrency: int = DEFAULT_WORKER_CONCURRENCY
+    max_pending: int = DEFAULT_MAX_PENDING
+    metrics_interval: int = DEFAULT_METRICS_INTERVAL
+    semantic_cache: bool = False
+    semantic_threshold: float = DEFAULT_SEMANTIC_THRESHOLD
+    semantic_ttl: int = DEFAULT_SEMANTIC_TTL
+    semantic_dir: Optional[Path] = None
+    rag_roles: Tuple[str, ...] = ("ops", "partner")
+    rag_docs_dir: Path = RUNBOOKS_DIR
+    rag_top_k: int = DEFAULT_RAG_TOP_K
+    rag_poll_seconds: int = DEFAULT_RAG_POLL_SECONDS
+    mention_replies: bool = False
+    mention_role: str = "default"
+    mention_debounce: float = DEFAULT_MENTION_DEBOUNCE
+    webhook_posting: bool = False
+    server_state_path: Path = DEFAULT_SERVER_STATE_PATH
+    drain_timeout: float = DEFAULT_DRAIN_TIMEOUT
 
     @classmethod
     def from_env(cls) -> "BotConfig":
@@ -83,6 +244,8 @@ class BotConfig:
         rate_limit = int(os.getenv("AI_RATE_LIMIT", DEFAULT_RATE_LIMIT))
         rate_window = int(os.getenv("AI_RATE_WINDOW", DEFAULT_RATE_WINDOW))
         enable_message_content = os.getenv("ENABLE_MESSAGE_CONTENT", "0") == "1"
+        shard_count = os.getenv("SHARD_COUNT")
+        shard_ids = os.getenv("SHARD_IDS")
         return cls(
             token=token,
             guild_id=int(guild_id) if guild_id else None,
@@ -91,68 +254,352 @@ class BotConfig:
             rate_limit=rate_limit,
             rate_window=rate_window,
             enable_message_content=enable_message_content,
+            force_command_sync=os.getenv("FORCE_COMMAND_SYNC", "0") == "1",
+            state_url=os.getenv("AI_STATE_URL") or None,
+            state_prefix=os.getenv("AI_STATE_PREFIX", "ai-router:"),
+            cache_ttl=int(os.getenv("AI_CACHE_TTL", DEFAULT_CACHE_TTL)),
+            shard_count=int(shard_count) if shard_count else None,
+            shard_ids=[int(part) for part in shard_ids.split(",") if part.strip()] if shard_ids else None,
+            workers=int(os.getenv("AI_WORKERS", "0")),
+            worker_concurrency=int(os.getenv("AI_WORKER_CONCURRENCY", DEFAULT_WORKER_CONCURRENCY)),
+            max_pending=int(os.getenv("AI_MAX_PENDING", DEFAULT_MAX_PENDING)),
+            metrics_interval=int(os.getenv("AI_METRICS_INTERVAL", DEFAULT_METRICS_INTERVAL)),
+            semantic_cache=os.getenv("AI_SEMANTIC_CACHE", "0") == "1",
+            semantic_threshold=float(os.getenv("AI_SEMANTIC_THRESHOLD", DEFAULT_SEMANTIC_THRESHOLD)),
+            semantic_ttl=int(os.getenv("AI_SEMANTIC_TTL", DEFAULT_SEMANTIC_TTL)),
+            semantic_dir=Path(os.environ["AI_SEMANTIC_DIR"]) if os.getenv("AI_SEMANTIC_DIR") else None,
+            rag_roles=tuple(
+                part.strip().lower() for part in os.getenv("RAG_ROLES", "ops,partner").split(",") if part.strip()
+            ),
+            rag_docs_dir=Path(os.getenv("RAG_DOCS_DIR") or RUNBOOKS_DIR),
+            rag_top_k=int(os.getenv("RAG_TOP_K", DEFAULT_RAG_TOP_K)),
+            rag_poll_seconds=int(os.getenv("RAG_POLL_SECONDS", DEFAULT_RAG_POLL_SECONDS)),
+            mention_replies=os.getenv("AI_MENTION_REPLIES", "0") == "1",
+            mention_role=os.getenv("AI_MENTION_ROLE", "default").lower(),
+            mention_debounce=float(os.getenv("AI_MENTION_DEBOUNCE", DEFAULT_MENTION_DEBOUNCE)),
+            webhook_posting=os.getenv("WEBHOOK_POSTING", "0") == "1",
+            server_state_path=Path(os.getenv("SERVER_STATE_PATH") or DEFAULT_SERVER_STATE_PATH),
+            drain_timeout=float(os.getenv("DRAIN_TIMEOUT", DEFAULT_DRAIN_TIMEOUT)),
         )
 
 
-def build_registry() -> ProviderRegistry:
-    registry = ProviderRegistry()
-    openai_key = os.getenv("OPENAI_API_KEY")
-    if openai_key:
-        registry.register(OpenAIProvider(openai_key, os.getenv("OPENAI_BASE_URL")))
-    anthropic_key = os.getenv("ANTHROPIC_API_KEY")
-    if anthropic_key:
-        registry.register(AnthropicProvider(anthropic_key, os.getenv("ANTHROPIC_VERSION", "2023-06-01")))
-    gemini_key = os.getenv("GEMINI_API_KEY")
-    if gemini_key:
-        registry.register(GeminiProvider(gemini_key, os.getenv("GEMINI_BASE_URL")))
-    grok_key = os.getenv("GROK_API_KEY")
-    grok_url = os.getenv("GROK_BASE_URL")
-    if grok_key and grok_url:
-        registry.register(GrokProvider(grok_key, grok_url))
-    return registry
-
-
-class AIRouterBot(commands.Bot):
-    def __init__(self, config: BotConfig, registry: ProviderRegistry, prompts: Dict[str, str]) -> None:
+def request_cache_key(provider_name: str, request: PromptRequest) -> str:
+    """Identity of a completion: everything sent to the provider, nothing about the caller."""
+    blob = json.dumps(
+        [
+            provider_name,
+            request.model,
+            request.metadata.get("role"),
+            request.system_prompt,
+            request.prompt,
+            request.temperature,
+            request.max_tokens,
+        ],
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class AIRouterBot(commands.AutoShardedBot):
+    def __init__(
+        self,
+        config: BotConfig,
+        registry: ProviderRegistry,
+        prompts: Dict[str, str],
+        state: SharedState,
+    ) -> None:
         intents = discord.Intents.default()
         intents.guilds = True
         if config.enable_message_content:
             intents.message_content = True
-        super().__init__(command_prefix="!", intents=intents)
+        shard_options: Dict[str, Any] = {}
+        if config.shard_count:
+            shard_options["shard_count"] = config.shard_count
+            if config.shard_ids:
+                shard_options["shard_ids"] = config.shard_ids
+        super().__init__(command_prefix="!", intents=intents, tree_cls=DrainingTree, **shard_options)
         self.config = config
         self.registry = registry
         self.prompts = prompts
-        self.rate_limiter = SimpleRateLimiter(config.rate_limit, config.rate_window)
+        self.state = state
+        self.rate_limiter = RateLimiter(state, config.rate_limit, config.rate_window)
+        self.pool: Optional[WorkerPool] = None
+        if config.workers > 0:
+            self.pool = WorkerPool(config.workers, concurrency=config.worker_concurrency, max_pending=config.max_pending)
+        self.semantic_cache: Optional[SemanticCache] = None
+        if config.semantic_cache:
+            self.semantic_cache = SemanticCache(
+                threshold=config.semantic_threshold,
+                ttl=config.semantic_ttl,
+                directory=config.semantic_dir,
+            )
+        self.runbooks: Optional[RunbookIndex] = None
+        if config.rag_roles and config.rag_docs_dir.is_dir():
+            self.runbooks = RunbookIndex(config.rag_docs_dir, RUNBOOK_INDEX_DIR)
+        self._runbook_task: Optional[asyncio.Task[None]] = None
+        self._cache_flush_task: Optional[asyncio.Task[None]] = None
+        self.webhooks: Optional[WebhookPool] = None
+        self.mentions = MentionBatcher(self._answer_mentions, debounce=config.mention_debounce)
+        self.lag_monitor = LoopLagMonitor()
+        self._metrics_task: Optional[asyncio.Task[None]] = None
+        self.started_at = time.perf_counter()
+        self._ready_logged = False
+        self._sync_lock = asyncio.Lock()
 
     async def setup_hook(self) -> None:  # type: ignore[override]
-        if self.config.guild_id:
-            guild = discord.Object(id=self.config.guild_id)
+        started = time.perf_counter()
+        if self.pool is not None:
+            self.pool.start()
+        if self.config.webhook_posting:
+            self.webhooks = await asyncio.to_thread(WebhookPool.from_state, self.config.server_state_path)
+        if self.runbooks is not None:
+            await asyncio.to_thread(self.runbooks.load)
+            if self.config.rag_poll_seconds > 0:
+                self._runbook_task = asyncio.create_task(self._watch_runbooks())
+        if self.semantic_cache is not None and self.semantic_cache.directory is not None:
+            self._cache_flush_task = asyncio.create_task(self._flush_semantic_cache())
+        if self.config.metrics_interval > 0:
+            self.lag_monitor.start()
+            self._metrics_task = asyncio.create_task(self._log_metrics())
+        synced = await self.sync_commands(force=self.config.force_command_sync)
+        logger.info(
+            "setup_hook finished in %.2fs (command sync %s)",
+            time.perf_counter() - started,
+            "performed" if synced else "skipped, command tree unchanged",
+        )
+
+    async def sync_commands(self, *, force: bool = False) -> bool:
+        """Sync the command tree only when its signature differs from the last sync."""
+        guild = discord.Object(id=self.config.guild_id) if self.config.guild_id else None
+        if guild is not None:
             self.tree.copy_global_to(guild=guild)
+        scope = f"{self.application_id}:{self.config.guild_id or 'global'}"
+        signature = command_tree_signature(self.tree, guild)
+        async with self._sync_lock:
+            signatures = await asyncio.to_thread(read_sync_signatures)
+            if not force and signatures.get(scope) == signature:
+                return False
             await self.tree.sync(guild=guild)
+            signatures[scope] = signature
+            await asyncio.to_thread(write_sync_signatures, signatures)
+        return True
+
+    async def on_ready(self) -> None:
+        if not self._ready_logged:
+            self._ready_logged = True
+            logger.info(
+                "Ready as %s on shards %s %.2fs after start",
+                self.user,
+                sorted(self.shards),
+                time.perf_counter() - self.started_at,
+            )
+
+    def _is_ai_thread(self, channel: Any) -> bool:
+        return isinstance(channel, discord.Thread) and self.user is not None and channel.owner_id == self.user.id
+
+    async def on_message(self, message: discord.Message) -> None:
+        """Queue messages that mention the bot, or that land in a thread it opened, for a batched reply."""
+        if not self.config.mention_replies or message.author.bot or self.user is None:
+            return
+        if self.user in message.mentions or self._is_ai_thread(message.channel):
+            self.mentions.add(message)
+
+    async def _answer_mentions(self, batch: List[discord.Message]) -> None:
+        last = batch[-1]
+        channel = last.channel
+        assert self.user is not None
+        mention_tokens = (f"<@{self.user.id}>", f"<@!{self.user.id}>")
+        lines = []
+        for message in batch:
+            content = message.content
+            for token in mention_tokens:
+                content = content.replace(token, "")
+            content = content.strip()
+            if content:
+                lines.append(f"{message.author.display_name}: {content}" if len(batch) > 1 else content)
+        if not lines:
+            # Without the message content intent only the mention itself is visible.
+            return
+        if not await self.rate_limiter.check(str(channel.id)):
+            await last.add_reaction("⏳")
+            return
+        if self.saturated:
+            await last.reply("The AI router is at capacity. Try again in a moment.", mention_author=False)
+            return
+
+        provider_name = self.config.default_provider or next(iter(self.registry.names()))
+        role_key = self.config.mention_role if self.config.mention_role in self.prompts else "default"
+        prompt = "\n".join(lines)
+        request = PromptRequest(
+            prompt=prompt,
+            model=self.config.default_model,
+            temperature=0.2,
+            max_tokens=800,
+            system_prompt=self.augment_system_prompt(role_key, prompt, self.prompts.get(role_key, self.prompts.get("default"))),
+            metadata={
+                "user_id": last.author.id,
+                "channel_id": channel.id,
+                "role": role_key,
+                "provider": provider_name,
+                "source": "mention",
+                "batched_messages": len(batch),
+            },
+        )
+        try:
+            async with channel.typing():
+                rendered = await self.complete(provider_name, request)
+        except PoolSaturated:
+            await last.reply("The AI router is at capacity. Try again in a moment.", mention_author=False)
+            return
+        except ProviderError as exc:
+            logger.exception("Provider error from %s", provider_name)
+            await last.reply(f"Provider error: {exc}", mention_author=False)
+            return
+        embed = discord.Embed.from_dict(rendered["embed"])
+        if rendered["attachment"] is None and self.webhooks is not None and self.webhooks.has_webhook(channel.id):
+            # Webhook messages cannot reply, so link back to the message being answered.
+            embed.set_author(name=f"Reply to {last.author.display_name}", url=last.jump_url)
+            try:
+                await wait_posted(self.webhooks.post(channel, embed, username="AI Router"))
+            except Exception:
+                await last.reply(embed=embed, mention_author=False)
+        elif rendered["attachment"] is not None:
+            file = discord.File(io.StringIO(rendered["attachment"]), filename=ATTACHMENT_NAME)
+            await last.reply(embed=embed, file=file, mention_author=False)
         else:
-            await self.tree.sync()
-
-
-prompts = load_prompts()
-registry = build_registry()
-if not any(True for _ in registry.names()):
-    raise RuntimeError("No AI providers configured. Set provider API keys in the environment.")
-config = BotConfig.from_env()
-bot = AIRouterBot(config, registry, prompts)
-
-
-def resolve_provider(name: Optional[str]) -> Optional[str]:
+            await last.reply(embed=embed, mention_author=False)
+
+    async def _watch_runbooks(self) -> None:
+        assert self.runbooks is not None
+        while True:
+            await asyncio.sleep(self.config.rag_poll_seconds)
+            try:
+                await asyncio.to_thread(self.runbooks.refresh)
+            except OSError as exc:
+                logger.warning("Runbook refresh failed: %s", exc)
+
+    async def _flush_semantic_cache(self) -> None:
+        assert self.semantic_cache is not None
+        while True:
+            await asyncio.sleep(SEMANTIC_FLUSH_INTERVAL)
+            try:
+                await self.semantic_cache.flush_async()
+            except OSError as exc:
+                logger.warning("Semantic cache flush failed: %s", exc)
+
+    def augment_system_prompt(self, role_key: str, prompt: str, system_prompt: Optional[str]) -> Optional[str]:
+        """Append the best-matching runbook excerpts for retrieval-enabled roles."""
+        if self.runbooks is None or role_key not in self.config.rag_roles:
+            return system_prompt
+        context = self.runbooks.context_for(prompt, self.config.rag_top_k)
+        if context is None:
+            return system_prompt
+        return f"{system_prompt}\n\n{context}" if system_prompt else context
+
+    async def _log_metrics(self) -> None:
+        while True:
+            await asyncio.sleep(self.config.metrics_interval)
+            lag = self.lag_monitor.drain()
+            pool = self.pool.stats() if self.pool is not None else {}
+            logger.info(
+                "loop lag p50=%sms p99=%sms max=%sms heartbeat=%.0fms pool=%s",
+                lag["p50_ms"],
+                lag["p99_ms"],
+                lag["max_ms"],
+                self.latency * 1000,
+                pool or "in-process",
+            )
+            if self.runbooks is not None:
+                logger.info("runbook retrieval %s", self.runbooks.stats())
+            if self.semantic_cache is not None:
+                logger.info("semantic cache %s", self.semantic_cache.stats())
+            if self.webhooks is not None:
+                logger.info("webhook posting %s", self.webhooks.stats())
+
+    @property
+    def saturated(self) -> bool:
+        return self.pool is not None and self.pool.saturated
+
+    async def complete(self, provider_name: str, request: PromptRequest) -> Dict[str, Any]:
+        """Return the rendered reply, calling the provider once per identical request across replicas.
+
+        With a worker pool the provider call and rendering run in a worker
+        process; otherwise they run on this event loop. With the semantic cache
+        enabled, a sufficiently similar earlier prompt for the same role,
+        provider and model answers without any provider call.
+        """
+        scope = f"{request.metadata.get('role')}:{provider_name}:{request.model}"
+        if self.semantic_cache is not None:
+            match = self.semantic_cache.lookup(scope, request.prompt)
+            if match is not None:
+                payload, similarity = match
+                return mark_similar(payload, similarity)
+
+        async def call_provider() -> Dict[str, Any]:
+            if self.pool is not None:
+                return await self.pool.submit(provider_name, request)
+            provider_impl = self.registry.get(provider_name)
+            assert provider_impl is not None
+            return render_response(provider_name, request, await provider_impl.complete(request))
+
+        value, shared = await self.state.coalesce(
+            request_cache_key(provider_name, request),
+            call_provider,
+            ttl=self.config.cache_ttl,
+        )
+        if shared:
+            logger.debug("Served %s request from shared state", provider_name)
+        elif self.semantic_cache is not None:
+            self.semantic_cache.add(scope, request.prompt, value)
+        return value
+
+    async def drain(self, timeout: float) -> None:
+        """Stop taking work, let in-flight provider calls finish within ``timeout``, then flush and stop workers."""
+        deadline = Deadline(timeout)
+        tree: DrainingTree = self.tree  # type: ignore[assignment]
+        tree.draining = True
+        await self.mentions.drain(deadline)
+        await tree.wait_inflight(deadline)
+        if self.webhooks is not None:
+            await deadline.wait(self.webhooks.flush(), "queued webhook posts", floor=MIN_FLUSH_SECONDS)
+        if self.semantic_cache is not None:
+            await deadline.wait(self.semantic_cache.flush_async(), "semantic cache flush", floor=MIN_FLUSH_SECONDS)
+        if self.pool is not None:
+            # Jobs abandoned at the deadline get what is left of it before the workers are terminated.
+            await self.pool.close(timeout=deadline.remaining(MIN_FLUSH_SECONDS))
+
+    async def close(self) -> None:
+        for task in (self._metrics_task, self._runbook_task, self._cache_flush_task):
+            if task is not None:
+                task.cancel()
+        self.lag_monitor.stop()
+        if self.webhooks is not None:
+            # Before the gateway session closes: channels without a webhook fall back to channel.send.
+            await self.webhooks.close()
+        await super().close()
+        if self.pool is not None:
+            await self.pool.close()
+        if self.semantic_cache is not None:
+            self.semantic_cache.flush()
+        await self.state.close()
+
+
+def resolve_provider(bot: AIRouterBot, name: Optional[str]) -> Optional[str]:
     if name:
         return name.lower()
     return bot.config.default_provider or next(iter(bot.registry.names()))
 
 
-def resolve_role(role: Optional[str]) -> str:
+def resolve_role(bot: AIRouterBot, role: Optional[str]) -> str:
     if role and role.lower() in bot.prompts:
         return role.lower()
     return "default"
 
 
+# Commands are defined at module level and attached to a bot in ``create_bot``, so
+# importing this module (as spawned worker processes do) builds nothing.
+
+
 @app_commands.describe(
     provider="AI provider to target (openai, anthropic, gemini, grok)",
     model="Model identifier for the selected provider",
@@ -163,7 +610,7 @@ def resolve_role(role: Optional[str]) -> str:
     thread="Create a follow-up thread with the response",
     public="Set true to send a channel-visible message",
 )
-@bot.tree.command(name="ai", description="Route prompts to configured AI providers.")
+@app_commands.command(name="ai", description="Route prompts to configured AI providers.")
 async def ai(
     interaction: discord.Interaction,
     prompt: str,
@@ -175,7 +622,8 @@ async def ai(
     thread: bool = False,
     public: bool = False,
 ) -> None:
-    provider_name = resolve_provider(provider)
+    bot = cast(AIRouterBot, interaction.client)
+    provider_name = resolve_provider(bot, provider)
     if not provider_name or provider_name not in bot.registry:
         available = ", ".join(sorted(bot.registry.names()))
         await interaction.response.send_message(
@@ -183,7 +631,13 @@ async def ai(
             ephemeral=True,
         )
         return
-    role_key = resolve_role(role)
+    role_key = resolve_role(bot, role)
+    if bot.saturated:
+        await interaction.response.send_message(
+            "The AI router is at capacity. Try again in a moment.",
+            ephemeral=True,
+        )
+        return
     channel_key = str(interaction.channel_id)
     if not await bot.rate_limiter.check(channel_key):
         await interaction.response.send_message(
@@ -192,11 +646,8 @@ async def ai(
         )
         return
 
-    provider_impl = bot.registry.get(provider_name)
-    assert provider_impl is not None
-
     model_name = model or bot.config.default_model
-    system_prompt = bot.prompts.get(role_key, bot.prompts.get("default"))
+    system_prompt = bot.augment_system_prompt(role_key, prompt, bot.prompts.get(role_key, bot.prompts.get("default")))
     metadata: Dict[str, Any] = {
         "user_id": interaction.user.id if interaction.user else None,
         "channel_id": interaction.channel_id,
@@ -219,7 +670,10 @@ async def ai(
         metadata=metadata,
     )
     try:
-        response = await provider_impl.complete(request)
+        rendered = await bot.complete(provider_name, request)
+    except PoolSaturated:
+        await interaction.followup.send("The AI router is at capacity. Try again in a moment.", ephemeral=True)
+        return
     except ProviderError as exc:
         logger.exception("Provider error from %s", provider_name)
         await interaction.followup.send(f"Provider error: {exc}", ephemeral=True)
@@ -229,24 +683,11 @@ async def ai(
         await interaction.followup.send("Unexpected error while contacting the provider.", ephemeral=True)
         return
 
-    text = response.text.strip() or "(empty response)"
-    embed = discord.Embed(
-        title=f"{provider_name.title()} • {model_name}",
-        colour=discord.Colour.dark_teal(),
-    )
-    embed.add_field(name="Role", value=role_key, inline=True)
-    usage = response.usage
-    if usage:
-        usage_summary = ", ".join(f"{key}: {value}" for key, value in usage.items())
-        embed.add_field(name="Usage", value=usage_summary, inline=False)
-    if len(text) > 3900:
-        truncated = text[:1900] + "…"
-        embed.description = truncated
-        buffer = io.StringIO(text)
-        file = discord.File(buffer, filename="ai-response.txt")
+    embed = discord.Embed.from_dict(rendered["embed"])
+    if rendered["attachment"] is not None:
+        file = discord.File(io.StringIO(rendered["attachment"]), filename=ATTACHMENT_NAME)
         await interaction.followup.send(embed=embed, file=file, ephemeral=not public)
     else:
-        embed.description = text
         await interaction.followup.send(embed=embed, ephemeral=not public)
 
     if thread and public:
@@ -263,8 +704,28 @@ async def ai(
         )
 
 
+@app_commands.command(name="sync_commands", description="Force a slash command re-sync with Discord (administrators only).")
+@app_commands.default_permissions(administrator=True)
+@app_commands.guild_only()
+async def sync_commands(interaction: discord.Interaction) -> None:
+    bot = cast(AIRouterBot, interaction.client)
+    member = interaction.user
+    if not isinstance(member, discord.Member) or not member.guild_permissions.administrator:
+        await interaction.response.send_message("Only administrators can re-sync commands.", ephemeral=True)
+        return
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    started = time.perf_counter()
+    try:
+        await bot.sync_commands(force=True)
+    except discord.HTTPException as exc:
+        await interaction.followup.send(f"Command sync failed: {exc}", ephemeral=True)
+        return
+    await interaction.followup.send(f"Slash commands re-synced in {time.perf_counter() - started:.2f}s.", ephemeral=True)
+
+
 @ai.autocomplete("provider")
 async def provider_autocomplete(interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
+    bot = cast(AIRouterBot, interaction.client)
     suggestions = []
     for name in bot.registry.names():
         if current.lower() in name.lower():
@@ -274,6 +735,7 @@ async def provider_autocomplete(interaction: discord.Interaction, current: str)
 
 @ai.autocomplete("role")
 async def role_autocomplete(interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
+    bot = cast(AIRouterBot, interaction.client)
     suggestions = []
     for name in bot.prompts.keys():
         if current.lower() in name.lower():
@@ -281,9 +743,23 @@ async def role_autocomplete(interaction: discord.Interaction, current: str) -> L
     return suggestions[:25]
 
 
+def create_bot() -> AIRouterBot:
+    prompts = load_prompts()
+    registry = build_registry()
+    if not any(True for _ in registry.names()):
+        raise RuntimeError("No AI providers configured. Set provider API keys in the environment.")
+    config = BotConfig.from_env()
+    bot = AIRouterBot(config, registry, prompts, build_shared_state(config.state_url, config.state_prefix))
+    bot.tree.add_command(ai)
+    bot.tree.add_command(sync_commands)
+    return bot
+
+
 async def main() -> None:
-    await bot.start(bot.config.token)
+    bot = create_bot()
+    await run_until_signalled(bot, bot.config.token, timeout=bot.config.drain_timeout)
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=getattr(logging, os.getenv("LOG_LEVEL", "INFO").upper(), logging.INFO))
     asyncio.run(main())
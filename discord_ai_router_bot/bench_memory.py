@@ -0,0 +1,109 @@
+"""Bytes per cached provider response, before and after the compact types.
+
+``before`` mirrors the previous representation: a plain dataclass holding the
+text, the provider's usage dict and the full decoded JSON body. ``after`` is the
+current ``ProviderResponse`` with ``__slots__``, the normalised ``Usage`` struct
+and no raw payload (the default unless ``AI_RETAIN_RAW=1``). ``after + raw``
+shows the cost of turning raw retention on. Each variant decodes the same
+OpenAI-style body N times and keeps every response alive, like a cache would;
+``tracemalloc`` reports the net allocation per response.
+
+Usage
+-----
+```
+python bench_memory.py              # 1000 responses, 40 choices of logprobs
+python bench_memory.py --count 5000 --logprobs 200
+```
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import os
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List
+
+from providers import ProviderResponse, Usage
+
+
+@dataclass
+class LegacyResponse:
+    text: str
+    raw: Dict[str, Any]
+    usage: Dict[str, Any]
+
+
+def _body(logprobs: int) -> str:
+    return json.dumps(
+        {
+            "id": "chatcmpl-0123456789",
+            "object": "chat.completion",
+            "created": 1_700_000_000,
+            "model": "gpt-4o-mini-2024-07-18",
+            "system_fingerprint": "fp_0123456789",
+            "choices": [
+                {
+                    "index": 0,
+                    "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": "Deploy window confirmed for Thursday. " * 20},
+                    "logprobs": {
+                        "content": [
+                            {"token": f"tok{index}", "logprob": -0.01 * index, "bytes": [116, 111, 107]}
+                            for index in range(logprobs)
+                        ]
+                    },
+                }
+            ],
+            "usage": {"prompt_tokens": 412, "completion_tokens": 160, "total_tokens": 572},
+        }
+    )
+
+
+def _legacy(body: str) -> Any:
+    data = json.loads(body)
+    return LegacyResponse(text=data["choices"][0]["message"]["content"], raw=data, usage=data.get("usage", {}))
+
+
+def _compact(body: str) -> Any:
+    data = json.loads(body)
+    return ProviderResponse.build(data["choices"][0]["message"]["content"], Usage.from_openai(data.get("usage")), data)
+
+
+def _measure(factory: Callable[[str], Any], body: str, count: int) -> float:
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.take_snapshot()
+    kept: List[Any] = [factory(body) for _ in range(count)]
+    gc.collect()
+    snapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in snapshot.compare_to(baseline, "filename"))
+    del kept
+    return allocated / count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--logprobs", type=int, default=40)
+    args = parser.parse_args()
+
+    body = _body(args.logprobs)
+    os.environ["AI_RETAIN_RAW"] = "0"
+    before = _measure(_legacy, body, args.count)
+    after = _measure(_compact, body, args.count)
+    os.environ["AI_RETAIN_RAW"] = "1"
+    with_raw = _measure(_compact, body, args.count)
+    os.environ["AI_RETAIN_RAW"] = "0"
+
+    print(f"body: {len(body)} bytes of JSON, {args.count} responses kept")
+    print(f"{'variant':<12}  {'bytes/response':>14}")
+    for label, value in (("before", before), ("after", after), ("after + raw", with_raw)):
+        print(f"{label:<12}  {value:>14,.0f}")
+    print(f"saving: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Measure event-loop (heartbeat) lag with provider calls in process vs. in workers.
+
+A synthetic provider stands in for the real ones: each call waits like a
+network round trip, then decodes and renders a large JSON body, which is the
+CPU work that used to run on the gateway loop. ``LoopLagMonitor`` records how
+late the loop wakes up while the requests are in flight; discord.py sends
+gateway heartbeats from the same loop, so this is the delay a heartbeat would
+see.
+
+Usage
+-----
+```
+python bench_workers.py                          # 200 requests, 32 concurrent
+python bench_workers.py --requests 500 --workers 4 --payload-kb 2048
+```
+No Discord token or provider keys are needed.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Any, Dict, Optional
+
+from providers import PromptRequest, Provider, ProviderRegistry, ProviderResponse, Usage
+from rendering import render_response
+from workers import LoopLagMonitor, PoolSaturated, WorkerPool
+
+PAYLOAD_KB = 512
+NETWORK_SECONDS = 0.05
+
+
+def _synthetic_body(size_kb: int) -> str:
+    chunk = {"index": 0, "logprob": -0.125, "token": "lorem ipsum dolor sit amet"}
+    items = [dict(chunk, index=index) for index in range(max(1, size_kb * 1024 // 80))]
+    return json.dumps({"choices": [{"message": {"content": "ok " * 400}}], "usage": {"total_tokens": 42}, "logprobs": items})
+
+
+class SyntheticProvider(Provider):
+    name = "synthetic"
+
+    def __init__(self, size_kb: int) -> None:
+        self.body = _synthetic_body(size_kb)
+
+    async def complete(self, request: PromptRequest) -> ProviderResponse:
+        await asyncio.sleep(NETWORK_SECONDS)
+        data = json.loads(self.body)
+        return ProviderResponse.build(data["choices"][0]["message"]["content"], Usage.from_openai(data["usage"]), data)
+
+
+class SyntheticRegistryFactory:
+    """Picklable registry factory so worker processes build the same provider."""
+
+    def __init__(self, size_kb: int) -> None:
+        self.size_kb = size_kb
+
+    def __call__(self) -> ProviderRegistry:
+        registry = ProviderRegistry()
+        registry.register(SyntheticProvider(self.size_kb))
+        return registry
+
+
+def _request(index: int) -> PromptRequest:
+    return PromptRequest(
+        prompt=f"benchmark prompt {index}",
+        model="synthetic-1",
+        temperature=0.2,
+        max_tokens=800,
+        system_prompt=None,
+        metadata={"role": "default"},
+    )
+
+
+async def _run(mode: str, requests: int, concurrency: int, size_kb: int, workers: int) -> Dict[str, Any]:
+    factory = SyntheticRegistryFactory(size_kb)
+    pool: Optional[WorkerPool] = None
+    provider = factory().get("synthetic")
+    assert provider is not None
+    if mode == "workers":
+        pool = WorkerPool(workers, concurrency=max(1, concurrency // workers), max_pending=concurrency, registry_factory=factory)
+        pool.start()
+        # Let the workers finish importing before the clock starts.
+        await pool.submit("synthetic", _request(-1))
+
+    gate = asyncio.Semaphore(concurrency)
+    rejected = 0
+
+    async def one(index: int) -> None:
+        nonlocal rejected
+        async with gate:
+            request = _request(index)
+            try:
+                if pool is not None:
+                    await pool.submit("synthetic", request)
+                else:
+                    render_response("synthetic", request, await provider.complete(request))
+            except PoolSaturated:
+                rejected += 1
+
+    monitor = LoopLagMonitor(interval=0.01)
+    monitor.start()
+    started = time.perf_counter()
+    await asyncio.gather(*(one(index) for index in range(requests)))
+    elapsed = time.perf_counter() - started
+    monitor.stop()
+    if pool is not None:
+        await pool.close()
+    lag = monitor.drain()
+    return {
+        "mode": mode if pool is None else f"{mode} ({workers})",
+        "seconds": round(elapsed, 2),
+        "req_per_s": round(requests / elapsed, 1),
+        "lag_p50_ms": lag["p50_ms"],
+        "lag_p99_ms": lag["p99_ms"],
+        "lag_max_ms": lag["max_ms"],
+        "rejected": rejected,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--payload-kb", type=int, default=PAYLOAD_KB)
+    args = parser.parse_args()
+
+    rows = [
+        asyncio.run(_run(mode, args.requests, args.concurrency, args.payload_kb, args.workers))
+        for mode in ("in-process", "workers")
+    ]
+    headers = list(rows[0])
+    widths = [max(len(header), *(len(str(row[header])) for row in rows)) for header in headers]
+    print("  ".join(header.ljust(width) for header, width in zip(headers, widths)))
+    for row in rows:
+        print("  ".join(str(row[header]).ljust(width) for header, width in zip(headers, widths)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,10 @@
 """Provider registry for the AI router bot."""
 from __future__ import annotations
 
+import os
 from typing import Dict, Iterable, Optional
 
-from .base import PromptRequest, Provider, ProviderError, ProviderResponse
+from .base import PromptRequest, Provider, ProviderError, ProviderResponse, Usage
 from .anthropic_provider import AnthropicProvider
 from .gemini_provider import GeminiProvider
 from .grok_provider import GrokProvider
@@ -28,12 +29,33 @@ class ProviderRegistry:
         return item.lower() in self._providers
 
 
+def build_registry() -> ProviderRegistry:
+    """Register every provider whose credentials are present in the environment."""
+    registry = ProviderRegistry()
+    openai_key = os.getenv("OPENAI_API_KEY")
+    if openai_key:
+        registry.register(OpenAIProvider(openai_key, os.getenv("OPENAI_BASE_URL")))
+    anthropic_key = os.getenv("ANTHROPIC_API_KEY")
+    if anthropic_key:
+        registry.register(AnthropicProvider(anthropic_key, os.getenv("ANTHROPIC_VERSION", "2023-06-01")))
+    gemini_key = os.getenv("GEMINI_API_KEY")
+    if gemini_key:
+        registry.register(GeminiProvider(gemini_key, os.getenv("GEMINI_BASE_URL")))
+    grok_key = os.getenv("GROK_API_KEY")
+    grok_url = os.getenv("GROK_BASE_URL")
+    if grok_key and grok_url:
+        registry.register(GrokProvider(grok_key, grok_url))
+    return registry
+
+
 __all__ = [
     "PromptRequest",
     "Provider",
     "ProviderError",
     "ProviderResponse",
     "ProviderRegistry",
+    "Usage",
+    "build_registry",
     "AnthropicProvider",
     "GeminiProvider",
     "GrokProvider",
@@ -3,7 +3,7 @@ from __future__ import annotations
 
 import aiohttp
 
-from .base import PromptRequest, Provider, ProviderError, ProviderResponse
+from .base import PromptRequest, Provider, ProviderError, ProviderResponse, Usage
 
 
 class AnthropicProvider(Provider):
@@ -42,5 +42,4 @@ class AnthropicProvider(Provider):
                     raise ProviderError(f"Anthropic error {response.status}: {message}")
         content = data.get("content", [])
         text = "".join(part.get("text", "") for part in content)
-        usage = data.get("usage", {})
-        return ProviderResponse(text=text, raw=data, usage=usage)
+        return ProviderResponse.build(text, Usage.from_anthropic(data.get("usage")), data)
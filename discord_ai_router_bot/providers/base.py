@@ -1,11 +1,21 @@
 """Provider abstraction for the AI router bot."""
 from __future__ import annotations
 
-from dataclasses import dataclass
+import os
+from dataclasses import dataclass, field
 from typing import Any, Dict, Mapping, Optional
 
 
-@dataclass
+def retain_raw() -> bool:
+    """Whether to keep the decoded provider payload on each response.
+
+    Off by default: the raw JSON is many times the size of the text and only
+    useful when debugging. Read per call so a ``.env`` loaded after import counts.
+    """
+    return os.getenv("AI_RETAIN_RAW", "0") == "1"
+
+
+@dataclass(slots=True)
 class PromptRequest:
     prompt: str
     model: str
@@ -15,11 +25,61 @@ class PromptRequest:
     metadata: Mapping[str, Any]
 
 
-@dataclass
+def _count(data: Mapping[str, Any], key: str) -> int:
+    value = data.get(key)
+    return int(value) if isinstance(value, (int, float)) else 0
+
+
+@dataclass(slots=True, frozen=True)
+class Usage:
+    """Token usage normalised across providers."""
+
+    input_tokens: int = 0
+    output_tokens: int = 0
+    total_tokens: int = 0
+
+    @classmethod
+    def from_counts(cls, input_tokens: int, output_tokens: int, total_tokens: int = 0) -> "Usage":
+        return cls(input_tokens, output_tokens, total_tokens or input_tokens + output_tokens)
+
+    @classmethod
+    def from_openai(cls, data: Optional[Mapping[str, Any]]) -> "Usage":
+        """OpenAI-compatible ``usage`` block (OpenAI, Grok)."""
+        data = data or {}
+        return cls.from_counts(
+            _count(data, "prompt_tokens"), _count(data, "completion_tokens"), _count(data, "total_tokens")
+        )
+
+    @classmethod
+    def from_anthropic(cls, data: Optional[Mapping[str, Any]]) -> "Usage":
+        data = data or {}
+        return cls.from_counts(_count(data, "input_tokens"), _count(data, "output_tokens"))
+
+    @classmethod
+    def from_gemini(cls, data: Optional[Mapping[str, Any]]) -> "Usage":
+        """Gemini ``usageMetadata`` block."""
+        data = data or {}
+        return cls.from_counts(
+            _count(data, "promptTokenCount"), _count(data, "candidatesTokenCount"), _count(data, "totalTokenCount")
+        )
+
+    def __bool__(self) -> bool:
+        return self.total_tokens > 0
+
+    def summary(self) -> str:
+        return f"input: {self.input_tokens}, output: {self.output_tokens}, total: {self.total_tokens}"
+
+
+@dataclass(slots=True)
 class ProviderResponse:
     text: str
-    raw: Dict[str, Any]
-    usage: Dict[str, Any]
+    usage: Usage = field(default_factory=Usage)
+    raw: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def build(cls, text: str, usage: Usage, raw: Dict[str, Any]) -> "ProviderResponse":
+        """Create a response, keeping ``raw`` only when ``AI_RETAIN_RAW=1``."""
+        return cls(text=text, usage=usage, raw=raw if retain_raw() else None)
 
 
 class ProviderError(RuntimeError):
@@ -3,7 +3,7 @@ from __future__ import annotations
 
 import aiohttp
 
-from .base import PromptRequest, Provider, ProviderError, ProviderResponse
+from .base import PromptRequest, Provider, ProviderError, ProviderResponse, Usage
 
 
 class GeminiProvider(Provider):
@@ -41,5 +41,4 @@ class GeminiProvider(Provider):
             raise ProviderError("Gemini response did not include candidates")
         parts = candidates[0].get("content", {}).get("parts", [])
         text = "".join(part.get("text", "") for part in parts)
-        usage = data.get("usageMetadata", {})
-        return ProviderResponse(text=text, raw=data, usage=usage)
+        return ProviderResponse.build(text, Usage.from_gemini(data.get("usageMetadata")), data)
@@ -3,7 +3,7 @@ from __future__ import annotations
 
 import aiohttp
 
-from .base import PromptRequest, Provider, ProviderError, ProviderResponse
+from .base import PromptRequest, Provider, ProviderError, ProviderResponse, Usage
 
 
 class GrokProvider(Provider):
@@ -37,5 +37,4 @@ class GrokProvider(Provider):
                     raise ProviderError(f"Grok error {response.status}: {message}")
         choice = data["choices"][0]["message"]
         text = choice.get("content", "")
-        usage = data.get("usage", {})
-        return ProviderResponse(text=text, raw=data, usage=usage)
+        return ProviderResponse.build(text, Usage.from_openai(data.get("usage")), data)
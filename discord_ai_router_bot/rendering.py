@@ -0,0 +1,46 @@
+"""Render provider responses into Discord message payloads.
+
+Kept free of ``discord`` imports and bot state so provider worker processes can
+render without a gateway connection; the gateway only rebuilds the embed with
+``discord.Embed.from_dict``.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Optional
+
+from providers import PromptRequest, ProviderResponse
+
+EMBED_COLOUR = 0x11806A  # discord.Colour.dark_teal()
+EMBED_LIMIT = 3900
+TRUNCATED_LENGTH = 1900
+ATTACHMENT_NAME = "ai-response.txt"
+
+
+def render_response(provider_name: str, request: PromptRequest, response: ProviderResponse) -> Dict[str, Any]:
+    """Build the ``/ai`` reply: an embed dict plus the full text as an attachment when it is too long."""
+    text = response.text.strip() or "(empty response)"
+    fields = [{"name": "Role", "value": str(request.metadata.get("role", "default")), "inline": True}]
+    if response.usage:
+        fields.append({"name": "Usage", "value": response.usage.summary(), "inline": False})
+    attachment: Optional[str] = None
+    if len(text) > EMBED_LIMIT:
+        description = text[:TRUNCATED_LENGTH] + "…"
+        attachment = text
+    else:
+        description = text
+    return {
+        "embed": {
+            "type": "rich",
+            "title": f"{provider_name.title()} • {request.model}",
+            "color": EMBED_COLOUR,
+            "description": description,
+            "fields": fields,
+        },
+        "attachment": attachment,
+    }
+
+
+def mark_similar(payload: Dict[str, Any], similarity: float) -> Dict[str, Any]:
+    """Copy of a cached reply with a footer noting it answered a similar question."""
+    embed = dict(payload["embed"], footer={"text": f"Cached answer to a similar question (similarity {similarity:.2f})"})
+    return dict(payload, embed=embed)
@@ -0,0 +1,293 @@
+"""Local runbook retrieval for the AI router bot.
+
+``RunbookIndex`` chunks the Markdown/text files in a docs directory by heading
+and paragraph. Each chunk is scored two ways: BM25 over an inverted index, and
+cosine similarity of hashed n-gram vectors (the same embedder as the semantic
+cache). The two scores are blended, and the top chunks are formatted for the
+system prompt.
+
+The index persists in ``index_dir``:
+
+- ``manifest.json`` holds each file's mtime/size and its chunks.
+- ``vectors.f32`` is the chunk matrix, opened as an ``np.memmap``.
+
+``refresh`` re-chunks and re-embeds only files whose mtime or size changed.
+Every refresh builds a new immutable ``_Snapshot`` and swaps it in with a
+single assignment, so queries on the event loop never see a half-built index.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import math
+import os
+import re
+import time
+from collections import Counter, deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from semantic_cache import STOP_WORDS, HashedNgramEmbedder, normalise
+
+logger = logging.getLogger("ai-router.retrieval")
+
+DOC_SUFFIXES = (".md", ".markdown", ".txt")
+CHUNK_CHARS = 900
+DEFAULT_TOP_K = 3
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Weight of the normalised BM25 score against cosine similarity.
+LEXICAL_WEIGHT = 0.6
+MAX_CONTEXT_CHARS = 3000
+
+_HEADING = re.compile(r"^(#{1,6})\s+(.*)$")
+
+
+@dataclass(frozen=True)
+class Chunk:
+    source: str
+    heading: str
+    text: str
+
+
+def terms(text: str) -> List[str]:
+    return [word for word in normalise(text).split() if word not in STOP_WORDS]
+
+
+def chunk_document(source: str, text: str) -> List[Chunk]:
+    """Split on headings, then pack paragraphs into chunks of about ``CHUNK_CHARS``."""
+    chunks: List[Chunk] = []
+    headings: List[str] = []
+    paragraphs: List[str] = []
+
+    def emit() -> None:
+        heading = " › ".join(headings) or Path(source).stem
+        buffer = ""
+        for paragraph in paragraphs:
+            if buffer and len(buffer) + len(paragraph) > CHUNK_CHARS:
+                chunks.append(Chunk(source, heading, buffer))
+                buffer = ""
+            buffer = f"{buffer}\n\n{paragraph}" if buffer else paragraph
+        if buffer:
+            chunks.append(Chunk(source, heading, buffer))
+        paragraphs.clear()
+
+    for block in re.split(r"\n\s*\n", text):
+        lines = block.strip().splitlines()
+        if not lines:
+            continue
+        match = _HEADING.match(lines[0])
+        if match:
+            emit()
+            level = len(match.group(1))
+            del headings[level - 1 :]
+            headings.append(match.group(2).strip())
+            lines = lines[1:]
+            if not lines:
+                continue
+        paragraphs.append("\n".join(lines).strip())
+    emit()
+    return chunks
+
+
+class _Snapshot:
+    """Immutable query structures for one version of the docs directory."""
+
+    def __init__(self, chunks: List[Chunk], vectors: np.ndarray) -> None:
+        self.chunks = chunks
+        self.vectors = vectors
+        lengths = np.zeros(len(chunks), dtype=np.float32)
+        postings: Dict[str, Tuple[List[int], List[int]]] = {}
+        for index, chunk in enumerate(chunks):
+            counts = Counter(terms(f"{chunk.heading} {chunk.text}"))
+            lengths[index] = sum(counts.values())
+            for term, count in counts.items():
+                ids, freqs = postings.setdefault(term, ([], []))
+                ids.append(index)
+                freqs.append(count)
+        self.average_length = float(lengths.mean()) if len(chunks) else 0.0
+        self.lengths = lengths
+        total = len(chunks)
+        self.postings: Dict[str, Tuple[np.ndarray, np.ndarray, float]] = {
+            term: (
+                np.asarray(ids, dtype=np.int32),
+                np.asarray(freqs, dtype=np.float32),
+                math.log(1 + (total - len(ids) + 0.5) / (len(ids) + 0.5)),
+            )
+            for term, (ids, freqs) in postings.items()
+        }
+
+    def bm25(self, query_terms: List[str]) -> np.ndarray:
+        scores = np.zeros(len(self.chunks), dtype=np.float32)
+        if not self.average_length:
+            return scores
+        for term in set(query_terms):
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            ids, freqs, idf = posting
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[ids] / self.average_length)
+            scores[ids] += idf * freqs * (BM25_K1 + 1) / (freqs + norm)
+        return scores
+
+
+class RunbookIndex:
+    """Hybrid BM25 + vector index over a directory of runbooks."""
+
+    def __init__(self, docs_dir: Path, index_dir: Path, embedder: Optional[HashedNgramEmbedder] = None) -> None:
+        self.docs_dir = docs_dir
+        self.index_dir = index_dir
+        self.embedder = embedder or HashedNgramEmbedder()
+        self._files: Dict[str, Dict[str, Any]] = {}
+        self._snapshot = _Snapshot([], np.zeros((0, self.embedder.dim), dtype=np.float32))
+        self._latencies: Deque[float] = deque(maxlen=1024)
+        self.queries = 0
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.index_dir / "manifest.json"
+
+    @property
+    def vectors_path(self) -> Path:
+        return self.index_dir / "vectors.f32"
+
+    def load(self) -> None:
+        """Open the persisted index, if any, then bring it up to date with the docs directory."""
+        try:
+            manifest = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            manifest = {}
+        if manifest.get("dim") == self.embedder.dim and self.vectors_path.exists():
+            self._files = manifest.get("files", {})
+            chunks = [Chunk(**chunk) for entry in self._files.values() for chunk in entry["chunks"]]
+            if chunks and self.vectors_path.stat().st_size == len(chunks) * self.embedder.dim * 4:
+                vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(len(chunks), self.embedder.dim))
+                self._snapshot = _Snapshot(chunks, vectors)
+            else:
+                self._files = {}
+        self.refresh()
+
+    def refresh(self) -> bool:
+        """Re-index files whose mtime or size changed; returns True if anything changed."""
+        if not self.docs_dir.is_dir():
+            return False
+        seen: Dict[str, os.stat_result] = {
+            path.relative_to(self.docs_dir).as_posix(): path.stat()
+            for path in sorted(self.docs_dir.rglob("*"))
+            if path.is_file() and path.suffix.lower() in DOC_SUFFIXES
+        }
+        unchanged = {
+            name
+            for name, stat in seen.items()
+            if name in self._files
+            and self._files[name]["mtime"] == stat.st_mtime_ns
+            and self._files[name]["size"] == stat.st_size
+        }
+        if len(unchanged) == len(seen) == len(self._files):
+            return False
+
+        started = time.perf_counter()
+        old = self._snapshot
+        old_rows: Dict[str, Tuple[int, int]] = {}
+        offset = 0
+        for name, entry in self._files.items():
+            old_rows[name] = (offset, offset + len(entry["chunks"]))
+            offset += len(entry["chunks"])
+
+        files: Dict[str, Dict[str, Any]] = {}
+        blocks: List[np.ndarray] = []
+        embedded = 0
+        for name, stat in seen.items():
+            if name in unchanged:
+                files[name] = self._files[name]
+                start, end = old_rows[name]
+                blocks.append(np.array(old.vectors[start:end]))
+                continue
+            text = (self.docs_dir / name).read_text(encoding="utf-8", errors="replace")
+            chunks = chunk_document(name, text)
+            files[name] = {
+                "mtime": stat.st_mtime_ns,
+                "size": stat.st_size,
+                "chunks": [{"source": c.source, "heading": c.heading, "text": c.text} for c in chunks],
+            }
+            blocks.append(
+                np.stack([self.embedder.embed(f"{c.heading} {c.text}") for c in chunks])
+                if chunks
+                else np.zeros((0, self.embedder.dim), dtype=np.float32)
+            )
+            embedded += len(chunks)
+
+        vectors = np.concatenate(blocks) if blocks else np.zeros((0, self.embedder.dim), dtype=np.float32)
+        chunks = [Chunk(**chunk) for entry in files.values() for chunk in entry["chunks"]]
+        self._persist(files, vectors)
+        if len(chunks):
+            vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=vectors.shape)
+        self._files = files
+        self._snapshot = _Snapshot(chunks, vectors)
+        logger.info(
+            "Indexed %s runbook files (%s chunks, %s re-embedded) in %.0fms",
+            len(files),
+            len(chunks),
+            embedded,
+            (time.perf_counter() - started) * 1000,
+        )
+        return True
+
+    def _persist(self, files: Dict[str, Dict[str, Any]], vectors: np.ndarray) -> None:
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        tmp_vectors = self.vectors_path.with_suffix(".tmp")
+        vectors.astype(np.float32).tofile(tmp_vectors)
+        os.replace(tmp_vectors, self.vectors_path)
+        tmp_manifest = self.manifest_path.with_suffix(".tmp")
+        tmp_manifest.write_text(json.dumps({"dim": self.embedder.dim, "files": files}), encoding="utf-8")
+        os.replace(tmp_manifest, self.manifest_path)
+
+    def search(self, query: str, k: int = DEFAULT_TOP_K) -> List[Tuple[float, Chunk]]:
+        started = time.perf_counter()
+        snapshot = self._snapshot
+        self.queries += 1
+        # argpartition with k=0 would select every chunk.
+        if not snapshot.chunks or k <= 0:
+            return []
+        lexical = snapshot.bm25(terms(query))
+        peak = float(lexical.max())
+        if peak > 0:
+            lexical /= peak
+        semantic = np.asarray(snapshot.vectors @ self.embedder.embed(query))
+        scores = LEXICAL_WEIGHT * lexical + (1 - LEXICAL_WEIGHT) * semantic
+        k = min(k, len(snapshot.chunks))
+        top = np.argpartition(scores, -k)[-k:]
+        ordered = top[np.argsort(scores[top])[::-1]]
+        results = [(float(scores[index]), snapshot.chunks[index]) for index in ordered if lexical[index] > 0]
+        self._latencies.append(time.perf_counter() - started)
+        return results
+
+    def context_for(self, query: str, k: int = DEFAULT_TOP_K) -> Optional[str]:
+        """Runbook excerpts to append to a system prompt, or None when nothing matches."""
+        sections: List[str] = []
+        used = 0
+        for number, (_, chunk) in enumerate(self.search(query, k), start=1):
+            section = f"[{number}] {chunk.source} — {chunk.heading}\n{chunk.text}"
+            if used + len(section) > MAX_CONTEXT_CHARS and sections:
+                break
+            sections.append(section)
+            used += len(section)
+        if not sections:
+            return None
+        return (
+            "Relevant runbook excerpts (cite them by number, and say so if they do not cover the question):\n\n"
+            + "\n\n".join(sections)
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        latencies = sorted(self._latencies)
+        return {
+            "files": len(self._files),
+            "chunks": len(self._snapshot.chunks),
+            "queries": self.queries,
+            "p50_ms": round(latencies[len(latencies) // 2] * 1000, 3) if latencies else 0.0,
+            "p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 3) if latencies else 0.0,
+        }
@@ -0,0 +1,243 @@
+"""Near-duplicate prompt cache for the AI router bot.
+
+Prompts are embedded with hashed word and character n-grams (no model download,
+stable across processes) into unit-length float32 vectors. Each scope
+(role, provider, model) keeps its vectors in one NumPy matrix, so a lookup is a
+single matrix-vector product followed by a top-k partition. A cached reply is
+returned when the best live match scores at or above the similarity threshold.
+
+With ``directory`` set, each scope's matrix is a ``np.memmap`` file next to a
+JSON sidecar of the cached replies, so the cache survives restarts and large
+matrices stay out of the Python heap. Give each process its own directory.
+``add`` never writes to disk; callers flush periodically with ``flush_async``,
+which snapshots the replies on the event loop and writes them in a thread.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+import zlib
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_DIM = 1024
+DEFAULT_CAPACITY = 2048
+DEFAULT_THRESHOLD = 0.85
+DEFAULT_TTL = 3600
+DEFAULT_TOP_K = 4
+FLUSH_INTERVAL = 30.0
+
+_JOINERS = re.compile(r"(?<=\w)[-'’_](?=\w)")
+_NON_WORD = re.compile(r"[^\w]+")
+# Question scaffolding that carries no topic; dropping it lets "how do I X" match "how to X".
+STOP_WORDS = frozenset(
+    "a an and are can do does for how i in is me my of on or our please the to we what you".split()
+)
+
+
+def normalise(text: str) -> str:
+    """Lower-case, join hyphenated words ("on-call" -> "oncall") and collapse punctuation."""
+    return _NON_WORD.sub(" ", _JOINERS.sub("", text.lower())).strip()
+
+
+class HashedNgramEmbedder:
+    """Signed feature hashing of word unigrams/bigrams and character 3-5 grams, minus stop words."""
+
+    def __init__(self, dim: int = DEFAULT_DIM) -> None:
+        self.dim = dim
+
+    def features(self, text: str) -> List[str]:
+        words = normalise(text).split()
+        words = [word for word in words if word not in STOP_WORDS] or words
+        features = [f"w:{word}" for word in words]
+        features.extend(f"b:{left} {right}" for left, right in zip(words, words[1:]))
+        for word in words:
+            padded = f" {word} "
+            for size in (3, 4, 5):
+                features.extend(f"c:{padded[index:index + size]}" for index in range(len(padded) - size + 1))
+        return features
+
+    def embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature in self.features(text):
+            digest = zlib.crc32(feature.encode("utf-8"))
+            vector[digest % self.dim] += 1.0 if digest & 0x80000000 else -1.0
+        norm = float(np.linalg.norm(vector))
+        if norm:
+            vector /= norm
+        return vector
+
+
+class _Snapshot(NamedTuple):
+    """A partition's reply state, copied on the event loop for a background write."""
+
+    partition: "_Partition"
+    payloads: List[Optional[Dict[str, Any]]]
+    expires: np.ndarray
+    count: int
+    cursor: int
+
+
+class _Partition:
+    """Fixed-capacity ring of vectors and replies for one scope."""
+
+    def __init__(self, dim: int, capacity: int, path: Optional[Path]) -> None:
+        self.capacity = capacity
+        self.path = path
+        self.payloads: List[Optional[Dict[str, Any]]] = [None] * capacity
+        self.expires = np.zeros(capacity, dtype=np.float64)
+        self.count = 0
+        self.cursor = 0
+        self.dirty = False
+        if path is None:
+            self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+            return
+        matrix_path = path.with_suffix(".f32")
+        mode = "r+" if matrix_path.exists() and matrix_path.stat().st_size == capacity * dim * 4 else "w+"
+        self.vectors = np.memmap(matrix_path, dtype=np.float32, mode=mode, shape=(capacity, dim))
+        sidecar = path.with_suffix(".json")
+        if mode == "r+" and sidecar.exists():
+            try:
+                state = json.loads(sidecar.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                state = {}
+            # Wall-clock expiry so entries written before a restart age correctly.
+            for index, entry in enumerate(state.get("entries", [])[:capacity]):
+                if entry is not None:
+                    self.payloads[index] = entry["payload"]
+                    self.expires[index] = entry["expires"]
+            self.count = min(int(state.get("count", 0)), capacity)
+            self.cursor = int(state.get("cursor", 0)) % capacity
+
+    def add(self, vector: np.ndarray, payload: Dict[str, Any], expires_at: float) -> None:
+        slot = self.cursor
+        self.vectors[slot] = vector
+        self.payloads[slot] = payload
+        self.expires[slot] = expires_at
+        self.cursor = (slot + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        self.dirty = True
+
+    def search(self, vector: np.ndarray, k: int, now: float) -> List[Tuple[float, int]]:
+        if not self.count:
+            return []
+        scores = self.vectors[: self.count] @ vector
+        scores = np.where(self.expires[: self.count] > now, scores, -1.0)
+        k = min(k, self.count)
+        top = np.argpartition(scores, -k)[-k:]
+        ordered = top[np.argsort(scores[top])[::-1]]
+        return [(float(scores[index]), int(index)) for index in ordered if scores[index] > -1.0]
+
+    def snapshot(self) -> Optional[_Snapshot]:
+        """Copy what ``write`` needs; call on the thread that runs ``add``.
+
+        Clearing ``dirty`` here means an add made while the copy is written
+        marks the partition for the next flush instead of being lost.
+        """
+        if self.path is None or not self.dirty:
+            return None
+        self.dirty = False
+        return _Snapshot(self, list(self.payloads), self.expires.copy(), self.count, self.cursor)
+
+    @staticmethod
+    def write(snapshot: _Snapshot) -> None:
+        partition = snapshot.partition
+        assert partition.path is not None and isinstance(partition.vectors, np.memmap)
+        partition.vectors.flush()
+        entries = [
+            {"payload": payload, "expires": float(snapshot.expires[index])} if payload is not None else None
+            for index, payload in enumerate(snapshot.payloads)
+        ]
+        sidecar = partition.path.with_suffix(".json")
+        tmp_path = sidecar.with_suffix(".tmp")
+        state = {"count": snapshot.count, "cursor": snapshot.cursor, "entries": entries}
+        tmp_path.write_text(json.dumps(state), encoding="utf-8")
+        os.replace(tmp_path, sidecar)
+
+
+class SemanticCache:
+    """Per-scope cosine-similarity cache with hit-rate and lookup-latency metrics."""
+
+    def __init__(
+        self,
+        *,
+        threshold: float = DEFAULT_THRESHOLD,
+        ttl: float = DEFAULT_TTL,
+        capacity: int = DEFAULT_CAPACITY,
+        top_k: int = DEFAULT_TOP_K,
+        directory: Optional[Path] = None,
+        embedder: Optional[HashedNgramEmbedder] = None,
+    ) -> None:
+        self.threshold = threshold
+        self.ttl = ttl
+        self.capacity = capacity
+        self.top_k = top_k
+        self.directory = directory
+        self.embedder = embedder or HashedNgramEmbedder()
+        self.lookups = 0
+        self.hits = 0
+        self._latencies: Deque[float] = deque(maxlen=1024)
+        self._partitions: Dict[str, _Partition] = {}
+        if directory is not None:
+            directory.mkdir(parents=True, exist_ok=True)
+
+    def _partition(self, scope: str) -> _Partition:
+        partition = self._partitions.get(scope)
+        if partition is None:
+            path = None
+            if self.directory is not None:
+                path = self.directory / hashlib.sha1(scope.encode("utf-8")).hexdigest()[:16]
+            partition = _Partition(self.embedder.dim, self.capacity, path)
+            self._partitions[scope] = partition
+        return partition
+
+    def lookup(self, scope: str, prompt: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        """Return ``(payload, similarity)`` for the closest live prompt at or above the threshold."""
+        started = time.perf_counter()
+        self.lookups += 1
+        partition = self._partition(scope)
+        matches = partition.search(self.embedder.embed(prompt), self.top_k, time.time())
+        self._latencies.append(time.perf_counter() - started)
+        if not matches or matches[0][0] < self.threshold:
+            return None
+        score, index = matches[0]
+        payload = partition.payloads[index]
+        if payload is None:
+            return None
+        self.hits += 1
+        return payload, score
+
+    def add(self, scope: str, prompt: str, payload: Dict[str, Any]) -> None:
+        self._partition(scope).add(self.embedder.embed(prompt), payload, time.time() + self.ttl)
+
+    def _snapshots(self) -> List[_Snapshot]:
+        snapshots = (partition.snapshot() for partition in self._partitions.values())
+        return [snapshot for snapshot in snapshots if snapshot is not None]
+
+    def flush(self) -> None:
+        """Write every changed partition now, blocking the caller (used once the loop is stopping)."""
+        for snapshot in self._snapshots():
+            _Partition.write(snapshot)
+
+    async def flush_async(self) -> None:
+        """Snapshot changed partitions on the event loop and write them in a worker thread."""
+        snapshots = self._snapshots()
+        if snapshots:
+            await asyncio.to_thread(lambda: [_Partition.write(snapshot) for snapshot in snapshots])
+
+    def stats(self) -> Dict[str, Any]:
+        latencies = sorted(self._latencies)
+        return {
+            "entries": sum(partition.count for partition in self._partitions.values()),
+            "lookups": self.lookups,
+            "hit_rate": round(self.hits / self.lookups, 3) if self.lookups else 0.0,
+            "p50_ms": round(latencies[len(latencies) // 2] * 1000, 3) if latencies else 0.0,
+            "p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 3) if latencies else 0.0,
+        }
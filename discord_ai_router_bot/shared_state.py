@@ -0,0 +1,282 @@
+"""Shared rate-limit, response cache and in-flight state for the AI router bot.
+
+Every replica (or shard process) of the router talks to the same backend so
+channel limits, cached responses and duplicate-request suppression hold across
+the whole deployment. ``MemoryState`` keeps everything in process and is the
+default for single-process runs; ``RedisState`` implements the same contract on
+any Redis-protocol server using Lua scripts so each check is atomic.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+# How long a finished result stays readable for requests that waited on it when
+# the response cache itself is disabled. Cache lookups never read it.
+HANDOFF_SECONDS = 10.0
+# Upper bound on how long a single provider call may hold the in-flight lease.
+DEFAULT_LEASE_SECONDS = 120.0
+WAIT_POLL_SECONDS = 0.1
+
+
+class SharedState:
+    """Backend contract: sliding-window limits, a TTL cache and in-flight leases."""
+
+    async def hit(self, key: str, limit: int, window: float) -> bool:  # pragma: no cover - interface
+        """Record one event for ``key`` and return False if the window is already full."""
+        raise NotImplementedError
+
+    async def cache_get(self, key: str) -> Optional[Dict[str, Any]]:  # pragma: no cover - interface
+        raise NotImplementedError
+
+    async def cache_set(self, key: str, value: Dict[str, Any], ttl: float) -> None:  # pragma: no cover - interface
+        raise NotImplementedError
+
+    async def hand_off(self, key: str, value: Dict[str, Any], ttl: float) -> None:  # pragma: no cover - interface
+        """Publish ``value`` to callers waiting on the lease without caching it."""
+        raise NotImplementedError
+
+    async def acquire(self, key: str, lease: float) -> Optional[str]:  # pragma: no cover - interface
+        """Take the in-flight lease for ``key``; returns a release token or None if held elsewhere."""
+        raise NotImplementedError
+
+    async def release(self, key: str, token: str) -> None:  # pragma: no cover - interface
+        raise NotImplementedError
+
+    async def wait_for(self, key: str, timeout: float) -> Optional[Dict[str, Any]]:  # pragma: no cover - interface
+        """Wait for the lease holder of ``key`` to publish a result; None if it gave up.
+
+        Reads the cache first and then the hand-off slot.
+        """
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        return None
+
+    async def coalesce(
+        self,
+        key: str,
+        factory: Callable[[], Awaitable[Dict[str, Any]]],
+        *,
+        ttl: float,
+        lease: float = DEFAULT_LEASE_SECONDS,
+    ) -> Tuple[Dict[str, Any], bool]:
+        """Return ``(value, shared)`` for ``key``, running ``factory`` at most once at a time.
+
+        ``shared`` is True when the value came from the cache or from another
+        caller's in-flight request. If the lease holder fails, waiters run the
+        factory themselves rather than surfacing someone else's error. With
+        ``ttl <= 0`` nothing is cached; the result only reaches current waiters.
+        """
+        if ttl > 0:
+            cached = await self.cache_get(key)
+            if cached is not None:
+                return cached, True
+        token = await self.acquire(key, lease)
+        if token is None:
+            result = await self.wait_for(key, lease)
+            if result is not None:
+                return result, True
+            return await factory(), False
+        try:
+            value = await factory()
+            if ttl > 0:
+                await self.cache_set(key, value, ttl)
+            else:
+                await self.hand_off(key, value, HANDOFF_SECONDS)
+            return value, False
+        finally:
+            await self.release(key, token)
+
+
+class MemoryState(SharedState):
+    """In-process backend; correct for one process, and the stand-in for tests."""
+
+    def __init__(self) -> None:
+        self._events: Dict[str, List[float]] = {}
+        self._cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._handoffs: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._leases: Dict[str, Tuple[str, float, asyncio.Event]] = {}
+        self._lock = asyncio.Lock()
+
+    async def hit(self, key: str, limit: int, window: float) -> bool:
+        async with self._lock:
+            now = time.monotonic()
+            events = [stamp for stamp in self._events.get(key, []) if now - stamp < window]
+            if len(events) >= limit:
+                self._events[key] = events
+                return False
+            events.append(now)
+            self._events[key] = events
+            return True
+
+    async def cache_get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self._read(self._cache, key)
+
+    async def cache_set(self, key: str, value: Dict[str, Any], ttl: float) -> None:
+        self._write(self._cache, key, value, ttl)
+
+    async def hand_off(self, key: str, value: Dict[str, Any], ttl: float) -> None:
+        self._write(self._handoffs, key, value, ttl)
+
+    @staticmethod
+    def _read(entries: Dict[str, Tuple[float, Dict[str, Any]]], key: str) -> Optional[Dict[str, Any]]:
+        entry = entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            entries.pop(key, None)
+            return None
+        return value
+
+    @staticmethod
+    def _write(entries: Dict[str, Tuple[float, Dict[str, Any]]], key: str, value: Dict[str, Any], ttl: float) -> None:
+        now = time.monotonic()
+        entries[key] = (now + ttl, value)
+        if len(entries) > 1024:
+            for stale in [name for name, (expires_at, _) in entries.items() if expires_at <= now]:
+                del entries[stale]
+
+    async def acquire(self, key: str, lease: float) -> Optional[str]:
+        async with self._lock:
+            current = self._leases.get(key)
+            if current is not None and current[1] > time.monotonic():
+                return None
+            token = uuid.uuid4().hex
+            self._leases[key] = (token, time.monotonic() + lease, asyncio.Event())
+            return token
+
+    async def release(self, key: str, token: str) -> None:
+        async with self._lock:
+            current = self._leases.get(key)
+            if current is not None and current[0] == token:
+                del self._leases[key]
+                current[2].set()
+
+    async def wait_for(self, key: str, timeout: float) -> Optional[Dict[str, Any]]:
+        current = self._leases.get(key)
+        if current is not None:
+            try:
+                await asyncio.wait_for(current[2].wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        cached = self._read(self._cache, key)
+        return cached if cached is not None else self._read(self._handoffs, key)
+
+
+# KEYS[1] = window zset; ARGV = window_ms, limit, unique member suffix.
+# Server time keeps replicas with skewed clocks on the same window.
+RATE_LIMIT_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local window = tonumber(ARGV[1])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[2]) then
+  return 0
+end
+redis.call('ZADD', KEYS[1], now, now .. '-' .. ARGV[3])
+redis.call('PEXPIRE', KEYS[1], window)
+return 1
+"""
+
+# KEYS[1] = lease key; ARGV[1] = token. Only the holder may release.
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# KEYS[1] = cache key, KEYS[2] = lease key, KEYS[3] = hand-off key. One round trip
+# per poll: {1, value} when published, {0} while the lease is held, {-1} when abandoned.
+WAIT_SCRIPT = """
+local value = redis.call('GET', KEYS[1]) or redis.call('GET', KEYS[3])
+if value then
+  return {1, value}
+end
+if redis.call('EXISTS', KEYS[2]) == 1 then
+  return {0}
+end
+return {-1}
+"""
+
+
+class RedisState(SharedState):
+    """Backend for any Redis-protocol server, shared by every router replica."""
+
+    def __init__(self, url: str, prefix: str = "ai-router:") -> None:
+        from redis import asyncio as redis_asyncio
+
+        self.prefix = prefix
+        self._client = redis_asyncio.from_url(url, decode_responses=True)
+        self._rate_limit = self._client.register_script(RATE_LIMIT_SCRIPT)
+        self._release = self._client.register_script(RELEASE_SCRIPT)
+        self._wait = self._client.register_script(WAIT_SCRIPT)
+
+    def _key(self, kind: str, key: str) -> str:
+        return f"{self.prefix}{kind}:{key}"
+
+    async def hit(self, key: str, limit: int, window: float) -> bool:
+        allowed = await self._rate_limit(
+            keys=[self._key("rate", key)],
+            args=[int(window * 1000), limit, uuid.uuid4().hex],
+        )
+        return bool(allowed)
+
+    async def cache_get(self, key: str) -> Optional[Dict[str, Any]]:
+        payload = await self._client.get(self._key("cache", key))
+        return json.loads(payload) if payload is not None else None
+
+    async def cache_set(self, key: str, value: Dict[str, Any], ttl: float) -> None:
+        await self._client.set(self._key("cache", key), json.dumps(value), px=max(1, int(ttl * 1000)))
+
+    async def hand_off(self, key: str, value: Dict[str, Any], ttl: float) -> None:
+        await self._client.set(self._key("handoff", key), json.dumps(value), px=max(1, int(ttl * 1000)))
+
+    async def acquire(self, key: str, lease: float) -> Optional[str]:
+        token = uuid.uuid4().hex
+        taken = await self._client.set(self._key("lease", key), token, nx=True, px=int(lease * 1000))
+        return token if taken else None
+
+    async def release(self, key: str, token: str) -> None:
+        await self._release(keys=[self._key("lease", key)], args=[token])
+
+    async def wait_for(self, key: str, timeout: float) -> Optional[Dict[str, Any]]:
+        deadline = time.monotonic() + timeout
+        keys = [self._key("cache", key), self._key("lease", key), self._key("handoff", key)]
+        while time.monotonic() < deadline:
+            status = await self._wait(keys=keys)
+            if status[0] == 1:
+                return json.loads(status[1])
+            if status[0] == -1:
+                return None
+            await asyncio.sleep(WAIT_POLL_SECONDS)
+        return None
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+def build_shared_state(url: Optional[str], prefix: str = "ai-router:") -> SharedState:
+    """``None``/``memory://`` selects the in-process backend; ``redis://`` or ``rediss://`` selects Redis."""
+    if not url or url.startswith("memory://"):
+        return MemoryState()
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisState(url, prefix=prefix)
+    raise RuntimeError(f"Unsupported AI_STATE_URL scheme: {url}")
+
+
+class RateLimiter:
+    """Per-key sliding-window limiter backed by a ``SharedState``."""
+
+    def __init__(self, state: SharedState, limit: int, window_seconds: int) -> None:
+        self.state = state
+        self.limit = limit
+        self.window = window_seconds
+
+    async def check(self, key: str) -> bool:
+        return await self.state.hit(f"channel:{key}", self.limit, self.window)
@@ -0,0 +1,230 @@
+"""Provider worker processes for the AI router bot.
+
+With ``AI_WORKERS`` above zero the gateway process no longer calls providers
+itself. It puts ``(job_id, provider, PromptRequest)`` jobs on a multiprocessing
+queue; each worker process runs its own event loop and provider registry, calls
+the provider, decodes the response, renders the reply with
+``rendering.render_response`` and sends the payload back. The gateway loop only
+does queue hand-offs and Discord I/O, so large responses no longer delay
+heartbeats. ``max_pending`` bounds the number of queued or running jobs;
+submissions beyond it raise ``PoolSaturated`` so callers can turn users away.
+"""
+from __future__ import annotations
+
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import signal
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from providers import PromptRequest, ProviderError, ProviderRegistry, build_registry
+from rendering import render_response
+
+logger = logging.getLogger("ai-router.workers")
+
+DEFAULT_WORKER_CONCURRENCY = 4
+DEFAULT_MAX_PENDING = 64
+DEFAULT_JOB_TIMEOUT = 180.0
+
+Job = Tuple[int, str, PromptRequest]
+# (job_id, status, payload) where status is "ok", "provider_error" or "error".
+Result = Tuple[int, str, Any]
+
+
+class PoolSaturated(RuntimeError):
+    """Raised when the worker pool already holds ``max_pending`` jobs."""
+
+
+async def _run_job(job: Job, registry: ProviderRegistry, results: Any) -> None:
+    job_id, provider_name, request = job
+    provider = registry.get(provider_name)
+    try:
+        if provider is None:
+            raise ProviderError(f"Provider {provider_name} is not configured in the worker")
+        response = await provider.complete(request)
+        results.put((job_id, "ok", render_response(provider_name, request, response)))
+    except ProviderError as exc:
+        results.put((job_id, "provider_error", str(exc)))
+    except Exception as exc:  # pragma: no cover - reported back to the gateway
+        logger.exception("Worker failed job %s", job_id)
+        results.put((job_id, "error", f"{type(exc).__name__}: {exc}"))
+
+
+async def _serve(jobs: Any, results: Any, registry: ProviderRegistry, concurrency: int) -> None:
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(concurrency)
+    running: Set[asyncio.Task[None]] = set()
+    while True:
+        # Only take a job off the shared queue when this worker has a free slot,
+        # so idle workers pick up the backlog instead of a busy one hoarding it.
+        await slots.acquire()
+        job = await loop.run_in_executor(None, jobs.get)
+        if job is None:
+            slots.release()
+            break
+        task = asyncio.create_task(_run_job(job, registry, results))
+        running.add(task)
+        task.add_done_callback(running.discard)
+        task.add_done_callback(lambda _: slots.release())
+    if running:
+        await asyncio.gather(*running, return_exceptions=True)
+
+
+def _worker_main(jobs: Any, results: Any, registry_factory: Callable[[], ProviderRegistry], concurrency: int) -> None:
+    # Ctrl-C reaches the whole process group; the gateway process drains and stops the workers itself.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_serve(jobs, results, registry_factory(), concurrency))
+
+
+class WorkerPool:
+    """Gateway-side handle on the provider worker processes."""
+
+    def __init__(
+        self,
+        size: int,
+        *,
+        concurrency: int = DEFAULT_WORKER_CONCURRENCY,
+        max_pending: int = DEFAULT_MAX_PENDING,
+        job_timeout: float = DEFAULT_JOB_TIMEOUT,
+        registry_factory: Callable[[], ProviderRegistry] = build_registry,
+    ) -> None:
+        self.size = size
+        self.concurrency = concurrency
+        self.max_pending = max_pending
+        self.job_timeout = job_timeout
+        self.registry_factory = registry_factory
+        self.submitted = 0
+        self.rejected = 0
+        self.failed = 0
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, asyncio.Future[Dict[str, Any]]] = {}
+        self._processes: List[multiprocessing.process.BaseProcess] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._reader: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        context = multiprocessing.get_context("spawn")
+        self._jobs = context.Queue()
+        self._results = context.Queue()
+        self._loop = asyncio.get_running_loop()
+        for index in range(self.size):
+            process = context.Process(
+                target=_worker_main,
+                args=(self._jobs, self._results, self.registry_factory, self.concurrency),
+                name=f"ai-router-worker-{index}",
+                daemon=True,
+            )
+            process.start()
+            self._processes.append(process)
+        self._reader = threading.Thread(target=self._read_results, name="ai-router-results", daemon=True)
+        self._reader.start()
+        logger.info("Started %s provider workers (%s jobs each, %s pending max)", self.size, self.concurrency, self.max_pending)
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    @property
+    def saturated(self) -> bool:
+        return len(self._pending) >= self.max_pending
+
+    def stats(self) -> Dict[str, int]:
+        alive = sum(1 for process in self._processes if process.is_alive())
+        return {
+            "workers": alive,
+            "pending": self.pending,
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "failed": self.failed,
+        }
+
+    async def submit(self, provider_name: str, request: PromptRequest) -> Dict[str, Any]:
+        """Run ``request`` on a worker and return the rendered payload."""
+        if self._loop is None:
+            raise RuntimeError("WorkerPool.start() has not been called")
+        if self.saturated:
+            self.rejected += 1
+            raise PoolSaturated(f"{self.pending} requests already queued")
+        job_id = next(self._ids)
+        future: asyncio.Future[Dict[str, Any]] = self._loop.create_future()
+        self._pending[job_id] = future
+        self.submitted += 1
+        self._jobs.put((job_id, provider_name, request))
+        try:
+            return await asyncio.wait_for(future, self.job_timeout)
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self._pending.pop(job_id, None)
+
+    def _read_results(self) -> None:
+        while True:
+            item = self._results.get()
+            if item is None:
+                return
+            assert self._loop is not None
+            self._loop.call_soon_threadsafe(self._resolve, item)
+
+    def _resolve(self, item: Result) -> None:
+        job_id, status, payload = item
+        future = self._pending.get(job_id)
+        if future is None or future.done():
+            return
+        if status == "ok":
+            future.set_result(payload)
+        elif status == "provider_error":
+            future.set_exception(ProviderError(payload))
+        else:
+            future.set_exception(RuntimeError(payload))
+
+    async def close(self, timeout: float = 10.0) -> None:
+        if not self._processes:
+            return
+        for _ in self._processes:
+            self._jobs.put(None)
+        deadline = time.monotonic() + timeout
+        for process in self._processes:
+            await asyncio.to_thread(process.join, max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.terminate()
+        self._results.put(None)
+        self._processes.clear()
+
+
+class LoopLagMonitor:
+    """Measure how late the event loop wakes up, i.e. how long heartbeats would be delayed."""
+
+    def __init__(self, interval: float = 0.05) -> None:
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task[None]] = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, time.perf_counter() - started - self.interval))
+
+    def drain(self) -> Dict[str, float]:
+        """Return lag percentiles in milliseconds since the last drain and reset the window."""
+        samples, self.samples = sorted(self.samples), []
+        if not samples:
+            return {"samples": 0, "p50_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+        return {
+            "samples": len(samples),
+            "p50_ms": round(samples[len(samples) // 2] * 1000, 1),
+            "p99_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000, 1),
+            "max_ms": round(samples[-1] * 1000, 1),
+        }
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
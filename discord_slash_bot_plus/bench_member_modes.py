@@ -0,0 +1,89 @@
+"""Compare startup time and memory of the ops bot member cache modes.
+
+Each mode is measured in a fresh interpreter so RSS figures are not polluted by
+the previous run. The child connects with the same gateway options the bot
+uses, waits for ``on_ready`` (which, in ``full`` mode, is only dispatched once
+every guild has been chunked), records the numbers and disconnects.
+
+Usage
+-----
+```
+python bench_member_modes.py            # runs both modes
+python bench_member_modes.py --runs 3   # repeat each mode three times
+```
+Requires ``DISCORD_BOT_TOKEN`` (and the privileged members intent for ``full``).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+BASE_DIR = Path(__file__).resolve().parent
+
+
+async def _measure(mode: str) -> Dict[str, Any]:
+    import discord
+
+    from bot import BotConfig, client_options
+
+    config = BotConfig.from_env()
+    config.member_cache_mode = mode
+    client = discord.Client(**client_options(config))
+    started = time.perf_counter()
+    result: Dict[str, Any] = {"mode": mode}
+
+    @client.event
+    async def on_ready() -> None:  # type: ignore[override]
+        result["ready_seconds"] = round(time.perf_counter() - started, 3)
+        result["guilds"] = len(client.guilds)
+        result["cached_members"] = sum(len(guild.members) for guild in client.guilds)
+        result["max_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+        await client.close()
+
+    await client.start(config.token)
+    return result
+
+
+def _run_child(mode: str) -> Dict[str, Any]:
+    completed = subprocess.run(
+        [sys.executable, str(Path(__file__).resolve()), "--child", mode],
+        cwd=BASE_DIR,
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=1)
+    parser.add_argument("--child", choices=("full", "light"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(_measure(args.child))))
+        return
+
+    results: List[Dict[str, Any]] = []
+    for _ in range(args.runs):
+        for mode in ("full", "light"):
+            results.append(_run_child(mode))
+
+    print(f"{'mode':<6} {'ready (s)':>10} {'max RSS (MB)':>13} {'cached members':>15} {'guilds':>7}")
+    for row in results:
+        print(
+            f"{row['mode']:<6} {row['ready_seconds']:>10} {row['max_rss_mb']:>13} "
+            f"{row['cached_members']:>15} {row['guilds']:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -2,30 +2,70 @@
 from __future__ import annotations
 
 import asyncio
+import hashlib
+import io
 import json
 import logging
 import os
+import tempfile
+import time
+from collections import OrderedDict
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import date, datetime, timedelta
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, Iterable, List, Mapping, Optional, Set, Tuple, TypeVar
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
+import aiohttp
 import discord
 from discord import app_commands
-from discord.ext import commands
+from discord.ext import commands, tasks
 from dotenv import load_dotenv
 
+from graceful import (
+    DEFAULT_DRAIN_TIMEOUT,
+    MIN_FLUSH_SECONDS,
+    Deadline,
+    DrainingModal,
+    DrainingTree,
+    DrainingView,
+    run_until_signalled,
+)
+from wbs import WBSTemplateRegistry, WBSValidationError, render_wbs_pages, validate_wbs
+from wbs_import import WBSImportError, WBSRollup, detect_format, import_wbs
+from webhook_pool import WebhookPool, wait_posted
+
 BASE_DIR = Path(__file__).resolve().parent
 DATA_DIR = BASE_DIR / "data"
 SCHEDULES_PATH = DATA_DIR / "schedules.json"
 ONCALL_PATH = DATA_DIR / "oncall.json"
+RETROS_PATH = DATA_DIR / "retros.json"
+COMMAND_SYNC_PATH = DATA_DIR / "command_sync.json"
+STANDUPS_PATH = DATA_DIR / "standups.json"
 WBS_TEMPLATE_DIR = DATA_DIR / "wbs_templates"
+DEFAULT_SERVER_STATE_PATH = BASE_DIR.parent / "discord_team_hub_blueprint" / "server_state.json"
 
 REQUIRED_APPROVER_ROLES = {"Program Manager", "Project Manager", "DevOps"}
 DEFAULT_RETRO_LENSES = ("Keep", "Drop", "Start", "Kudos")
+RETRO_LENS_SETS: Dict[str, Tuple[str, ...]] = {
+    "kdsk": DEFAULT_RETRO_LENSES,
+    "4ls": ("Liked", "Learned", "Lacked", "Longed For"),
+    "mad-sad-glad": ("Mad", "Sad", "Glad"),
+    "sailboat": ("Wind", "Anchors", "Rocks", "Island"),
+    "start-stop-continue": ("Start", "Stop", "Continue"),
+}
+MAX_RETRO_LENSES = 10
+DISCORD_API_CONCURRENCY = 4
+DISCORD_API_CALLS_PER_SECOND = 5.0
+MEMBER_CACHE_MODES = ("full", "light")
+DEFAULT_MEMBER_LRU_SIZE = 512
+WBS_IMPORT_MAX_BYTES = 25 * 1024 * 1024
+DIGEST_EDIT_DEBOUNCE = 5.0
+DIGEST_RETENTION_DAYS = 14
 
 load_dotenv()
 logging.basicConfig(level=getattr(logging, os.getenv("LOG_LEVEL", "INFO").upper(), logging.INFO))
+logger = logging.getLogger("ops-bot")
 
 
 def load_env(key: str, *, default: Optional[str] = None, required: bool = False) -> Optional[str]:
@@ -38,13 +78,17 @@ def load_env(key: str, *, default: Optional[str] = None, required: bool = False)
 def ensure_data_files() -> None:
     DATA_DIR.mkdir(parents=True, exist_ok=True)
     WBS_TEMPLATE_DIR.mkdir(parents=True, exist_ok=True)
-    for path in (SCHEDULES_PATH, ONCALL_PATH):
+    for path in (SCHEDULES_PATH, ONCALL_PATH, RETROS_PATH, COMMAND_SYNC_PATH, STANDUPS_PATH):
         if not path.exists():
             path.write_text(json.dumps({}, indent=2), encoding="utf-8")
 
 
 class PersistentJSON:
-    """Async helper that serialises JSON payloads to disk."""
+    """Async helper that serialises JSON payloads to disk.
+
+    Saves write a temporary file and rename it over the original, so a process
+    killed mid-save leaves the previous contents instead of a truncated file.
+    """
 
     def __init__(self, path: Path, default: Any) -> None:
         self._path = path
@@ -60,22 +104,258 @@ class PersistentJSON:
     async def save(self, data: Any) -> None:
         async with self._lock:
             payload = json.dumps(data, indent=2, sort_keys=True)
-            await asyncio.to_thread(self._path.write_text, payload, encoding="utf-8")
+            await asyncio.to_thread(self._write, payload)
+
+    def _write(self, payload: str) -> None:
+        tmp_path = self._path.with_suffix(".tmp")
+        tmp_path.write_text(payload, encoding="utf-8")
+        os.replace(tmp_path, self._path)
+
+    async def idle(self) -> None:
+        """Wait for an in-progress load or save to finish."""
+        async with self._lock:
+            return
+
+
+def command_tree_signature(tree: app_commands.CommandTree, guild: Optional[discord.abc.Snowflake]) -> str:
+    """Stable hash of the payload ``tree.sync(guild=guild)`` would upload."""
+    payloads = []
+    for command in tree.get_commands(guild=guild):
+        try:
+            payloads.append(command.to_dict(tree))
+        except TypeError:  # discord.py < 2.4 serialises without the tree
+            payloads.append(command.to_dict())  # type: ignore[call-arg]
+    payloads.sort(key=lambda payload: (payload.get("type", 1), payload["name"]))
+    blob = json.dumps(payloads, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+T = TypeVar("T")
+
+
+class DiscordCallLimiter:
+    """Bounds concurrent Discord API calls and spaces them to a steady rate.
+
+    discord.py already waits out 429 responses per bucket; this keeps fan-out
+    work (thread creation, history reads) from bursting into those buckets in the
+    first place while still overlapping request latency.
+    """
+
+    def __init__(self, concurrency: int, calls_per_second: float) -> None:
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._interval = 1.0 / calls_per_second
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def run(self, factory: Callable[[], Awaitable[T]]) -> T:
+        async with self._semaphore:
+            async with self._lock:
+                now = asyncio.get_running_loop().time()
+                delay = self._next_slot - now
+                self._next_slot = max(now, self._next_slot) + self._interval
+            if delay > 0:
+                await asyncio.sleep(delay)
+            return await factory()
+
+
+class ApproverRoleCache:
+    """Resolves approver role names to IDs and memoises member eligibility.
+
+    Role IDs are anchored on the provisioning ``server_state.json`` role map so
+    renaming a role in Discord does not revoke approval rights. Names missing from
+    the state file fall back to a lookup against the guild's roles.
+    """
+
+    def __init__(
+        self,
+        role_names: Iterable[str],
+        state_path: Optional[Path],
+        *,
+        memoize_members: bool = True,
+    ) -> None:
+        self._role_names: FrozenSet[str] = frozenset(role_names)
+        self._state_path = state_path
+        self._memoize_members = memoize_members
+        self._state_roles: Dict[str, int] = {}
+        self._state_guild_id: Optional[int] = None
+        self._role_ids: Dict[int, FrozenSet[int]] = {}
+        self._members: Dict[Tuple[int, int], bool] = {}
+
+    async def load_state(self) -> None:
+        if self._state_path is None or not self._state_path.exists():
+            return
+        try:
+            raw = await asyncio.to_thread(self._state_path.read_text, encoding="utf-8")
+            state = json.loads(raw)
+        except (OSError, json.JSONDecodeError):
+            logger.warning("Unable to read server state from %s", self._state_path)
+            return
+        roles: Mapping[str, Any] = state.get("roles") or {}
+        self._state_roles = {name: int(role_id) for name, role_id in roles.items() if role_id}
+        self._state_guild_id = int(state["guild_id"]) if state.get("guild_id") else None
+        self.invalidate()
+
+    def role_ids(self, guild: discord.Guild) -> FrozenSet[int]:
+        cached = self._role_ids.get(guild.id)
+        if cached is None:
+            cached = self._resolve(guild)
+            self._role_ids[guild.id] = cached
+        return cached
+
+    def _resolve(self, guild: discord.Guild) -> FrozenSet[int]:
+        ids: set[int] = set()
+        unresolved = set(self._role_names)
+        if self._state_guild_id in (None, guild.id):
+            for name in self._role_names:
+                role_id = self._state_roles.get(name)
+                if role_id is not None and guild.get_role(role_id) is not None:
+                    ids.add(role_id)
+                    unresolved.discard(name)
+        for role in guild.roles:
+            if role.name in unresolved:
+                ids.add(role.id)
+        return frozenset(ids)
+
+    def is_approver(self, member: discord.Member) -> bool:
+        key = (member.guild.id, member.id)
+        cached = self._members.get(key)
+        if cached is None:
+            approver_ids = self.role_ids(member.guild)
+            cached = any(role.id in approver_ids for role in member.roles)
+            if self._memoize_members:
+                self._members[key] = cached
+        return cached
+
+    def invalidate(self, guild_id: Optional[int] = None) -> None:
+        if guild_id is None:
+            self._role_ids.clear()
+            self._members.clear()
+            return
+        self._role_ids.pop(guild_id, None)
+        self._members = {key: value for key, value in self._members.items() if key[0] != guild_id}
+
+    def invalidate_member(self, guild_id: int, member_id: int) -> None:
+        self._members.pop((guild_id, member_id), None)
+
+
+class MemberLookup:
+    """Bounded LRU of guild members fetched on demand.
+
+    In ``light`` member cache mode the gateway no longer delivers member lists,
+    so rotation commands fetch members over REST and keep the most recently used
+    ones here. In ``full`` mode the chunked guild cache is authoritative and
+    nothing is fetched.
+    """
+
+    def __init__(self, max_size: int, *, fetch_missing: bool = True) -> None:
+        self.max_size = max(1, max_size)
+        self.fetch_missing = fetch_missing
+        self._members: "OrderedDict[Tuple[int, int], discord.Member]" = OrderedDict()
+
+    async def get(self, guild: discord.Guild, member_id: int, *, fresh: bool = False) -> Optional[discord.Member]:
+        member = guild.get_member(member_id)
+        if member is not None or not self.fetch_missing:
+            return member
+        key = (guild.id, member_id)
+        if not fresh:
+            member = self._members.get(key)
+            if member is not None:
+                self._members.move_to_end(key)
+                return member
+        try:
+            member = await guild.fetch_member(member_id)
+        except discord.NotFound:
+            self._members.pop(key, None)
+            return None
+        except discord.HTTPException as exc:
+            # Treat Forbidden and 5xx like a miss so one failure cannot abort a get_many batch.
+            logger.warning("Member lookup for %s in guild %s failed: %s", member_id, guild.id, exc)
+            return None
+        self.put(member)
+        return member
+
+    async def get_many(
+        self,
+        guild: discord.Guild,
+        member_ids: Iterable[int],
+        *,
+        fresh: bool = False,
+    ) -> List[Optional[discord.Member]]:
+        return list(await asyncio.gather(*(self.get(guild, member_id, fresh=fresh) for member_id in member_ids)))
+
+    def put(self, member: discord.Member) -> None:
+        if not self.fetch_missing:
+            return
+        key = (member.guild.id, member.id)
+        self._members[key] = member
+        self._members.move_to_end(key)
+        while len(self._members) > self.max_size:
+            self._members.popitem(last=False)
+
+    def discard(self, guild_id: int, member_id: int) -> None:
+        self._members.pop((guild_id, member_id), None)
 
 
 @dataclass
 class BotConfig:
     token: str
     guild_id: Optional[int]
+    server_state_path: Optional[Path] = DEFAULT_SERVER_STATE_PATH
+    member_cache_mode: str = "full"
+    member_lru_size: int = DEFAULT_MEMBER_LRU_SIZE
+    enable_message_content: bool = False
+    force_command_sync: bool = False
+    webhook_posting: bool = False
+    drain_timeout: float = DEFAULT_DRAIN_TIMEOUT
 
     @classmethod
     def from_env(cls) -> "BotConfig":
         token = load_env("DISCORD_BOT_TOKEN", required=True)
         guild_id_raw = load_env("DISCORD_GUILD_ID")
-        return cls(token=token or "", guild_id=int(guild_id_raw) if guild_id_raw else None)
+        state_path_raw = load_env("SERVER_STATE_PATH")
+        member_cache_mode = (load_env("MEMBER_CACHE_MODE", default="full") or "full").lower()
+        if member_cache_mode not in MEMBER_CACHE_MODES:
+            raise RuntimeError(f"MEMBER_CACHE_MODE must be one of: {', '.join(MEMBER_CACHE_MODES)}")
+        return cls(
+            token=token or "",
+            guild_id=int(guild_id_raw) if guild_id_raw else None,
+            server_state_path=Path(state_path_raw) if state_path_raw else DEFAULT_SERVER_STATE_PATH,
+            member_cache_mode=member_cache_mode,
+            member_lru_size=int(load_env("MEMBER_LRU_SIZE", default=str(DEFAULT_MEMBER_LRU_SIZE)) or DEFAULT_MEMBER_LRU_SIZE),
+            enable_message_content=load_env("ENABLE_MESSAGE_CONTENT", default="0") == "1",
+            force_command_sync=load_env("FORCE_COMMAND_SYNC", default="0") == "1",
+            webhook_posting=load_env("WEBHOOK_POSTING", default="0") == "1",
+            drain_timeout=float(load_env("DRAIN_TIMEOUT", default=str(DEFAULT_DRAIN_TIMEOUT)) or DEFAULT_DRAIN_TIMEOUT),
+        )
 
 
-class StandupModal(discord.ui.Modal, title="Standup Update"):
+def client_options(config: BotConfig) -> Dict[str, Any]:
+    """Gateway options for the configured member cache mode.
+
+    ``full`` keeps the privileged members intent and chunks every guild at
+    startup. ``light`` drops the intent, skips chunking and caches no members;
+    the handful of commands that need member objects fetch them on demand.
+    """
+    intents = discord.Intents.default()
+    intents.guilds = True
+    if config.enable_message_content:
+        intents.message_content = True
+    if config.member_cache_mode == "light":
+        intents.members = False
+        return {
+            "intents": intents,
+            "member_cache_flags": discord.MemberCacheFlags.none(),
+            "chunk_guilds_at_startup": False,
+        }
+    intents.members = True
+    return {
+        "intents": intents,
+        "member_cache_flags": discord.MemberCacheFlags.from_intents(intents),
+        "chunk_guilds_at_startup": True,
+    }
+
+
+class StandupModal(DrainingModal, title="Standup Update"):
     yesterday: discord.ui.TextInput[discord.ui.Modal] = discord.ui.TextInput(
         label="Yesterday",
         placeholder="What did you complete yesterday?",
@@ -110,24 +390,297 @@ class StandupModal(discord.ui.Modal, title="Standup Update"):
         )
         embed.add_field(name="Yesterday", value=self.yesterday.value or "—", inline=False)
         embed.add_field(name="Today", value=self.today.value or "—", inline=False)
+        digests: Optional[StandupDigests] = getattr(interaction.client, "digests", None)
+        if digests is not None and await digests.schedule_for(self.target_channel.id) is not None:
+            await digests.submit(
+                self.target_channel,
+                self.author,
+                yesterday=self.yesterday.value,
+                today=self.today.value,
+                blockers=self.blockers.value,
+            )
+            await interaction.response.send_message("Standup added to today's digest.", ephemeral=True)
+            return
         embed.add_field(name="Blockers", value=self.blockers.value or "None", inline=False)
-        await self.target_channel.send(embed=embed)
-        await interaction.response.send_message("Standup submitted.", ephemeral=True)
+        webhooks: Optional[WebhookPool] = getattr(interaction.client, "webhooks", None)
+        if webhooks is None:
+            await self.target_channel.send(embed=embed)
+            await interaction.response.send_message("Standup submitted.", ephemeral=True)
+            return
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        try:
+            sent = await wait_posted(webhooks.post(self.target_channel, embed, username="Standups"))
+        except Exception:
+            # Hand the update back so it is not lost; the pool has already logged the failure.
+            await interaction.followup.send(
+                f"Could not post your standup to {self.target_channel.mention}. Here it is so you can repost it:",
+                embed=embed,
+                ephemeral=True,
+            )
+            return
+        await interaction.followup.send(
+            "Standup submitted." if sent else "Standup queued; it will appear shortly.",
+            ephemeral=True,
+        )
+
+
+def schedule_zone(schedule: Mapping[str, Any]) -> ZoneInfo:
+    try:
+        return ZoneInfo(str(schedule.get("timezone") or "UTC"))
+    except (ZoneInfoNotFoundError, ValueError):
+        return ZoneInfo("UTC")
+
+
+def parse_hhmm(value: str) -> Optional[Tuple[int, int]]:
+    try:
+        hours, minutes = (int(part) for part in value.split(":", 1))
+    except ValueError:
+        return None
+    return (hours, minutes) if 0 <= hours < 24 and 0 <= minutes < 60 else None
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[: limit - 1] + "…"
+
+
+class StandupDigests:
+    """Buffers standup submissions into one rolling digest message per channel and day.
+
+    Submissions are stored in ``data/standups.json`` keyed by ``<channel>:<date>``
+    (the date in the schedule's timezone). Each submission marks the digest dirty;
+    a single delayed task per digest sends or edits the message after
+    ``DIGEST_EDIT_DEBOUNCE`` seconds, so a burst of submissions costs one edit.
+    At the schedule's cutoff the digest is frozen and a final summary, with the
+    full updates attached and the missing roster members mentioned, is posted.
+    The digest's ``summary_posted`` flag is set only once that post succeeds,
+    so a failed cutoff is retried on the next tick.
+    """
+
+    def __init__(self, bot: "OpsBot") -> None:
+        self.bot = bot
+        self.store = PersistentJSON(STANDUPS_PATH, {"digests": {}})
+        self._pending: Dict[str, asyncio.Task[None]] = {}
+        # The store's own lock covers one load or save; this one covers each
+        # load-modify-save so concurrent submissions do not overwrite each other.
+        self._store_lock = asyncio.Lock()
+        # Serialises sending or editing one digest message, so a debounced
+        # refresh and the cutoff cannot both post it.
+        self._message_locks: Dict[str, asyncio.Lock] = {}
+
+    async def schedule_for(self, channel_id: int) -> Optional[Dict[str, Any]]:
+        data = await self.bot.schedules.load()
+        for entry in data.get("schedules", []):
+            if entry.get("channel_id") == channel_id and entry.get("digest"):
+                return entry
+        return None
+
+    @staticmethod
+    def digest_key(channel_id: int, day: date) -> str:
+        return f"{channel_id}:{day.isoformat()}"
+
+    async def submit(
+        self,
+        channel: discord.TextChannel,
+        member: discord.Member,
+        *,
+        yesterday: str,
+        today: str,
+        blockers: str,
+    ) -> None:
+        schedule = await self.schedule_for(channel.id) or {}
+        day = datetime.now(schedule_zone(schedule)).date()
+        key = self.digest_key(channel.id, day)
+        async with self._store_lock:
+            data = await self.store.load()
+            digests: Dict[str, Any] = data.setdefault("digests", {})
+            digest = digests.setdefault(
+                key,
+                {"channel_id": channel.id, "date": day.isoformat(), "message_id": None, "final": False, "entries": {}},
+            )
+            digest["entries"][str(member.id)] = {
+                "name": member.display_name,
+                "yesterday": yesterday,
+                "today": today,
+                "blockers": blockers,
+                "submitted_at": datetime.utcnow().isoformat(timespec="seconds"),
+                "late": bool(digest["final"]),
+            }
+            cutoff = (date.today() - timedelta(days=DIGEST_RETENTION_DAYS)).isoformat()
+            data["digests"] = {name: entry for name, entry in digests.items() if entry.get("date", "") >= cutoff}
+            await self.store.save(data)
+        self._message_locks = {
+            name: lock for name, lock in self._message_locks.items() if name in data["digests"] or lock.locked()
+        }
+        if key not in self._pending:
+            self._pending[key] = asyncio.create_task(self._refresh_later(key, channel))
+
+    async def _refresh_later(self, key: str, channel: discord.TextChannel) -> None:
+        try:
+            await asyncio.sleep(DIGEST_EDIT_DEBOUNCE)
+        finally:
+            # Submissions from here on schedule a fresh edit.
+            self._pending.pop(key, None)
+        await self.refresh(key, channel)
+
+    async def flush(self) -> None:
+        """Apply every pending digest edit now (used on shutdown)."""
+        pending = list(self._pending.items())
+        for task in (task for _, task in pending):
+            task.cancel()
+        self._pending.clear()
+        for key, _ in pending:
+            channel_id = int(key.split(":", 1)[0])
+            channel = self.bot.get_channel(channel_id)
+            if isinstance(channel, discord.TextChannel):
+                await self.refresh(key, channel)
+
+    def roster(self, channel: discord.TextChannel, schedule: Mapping[str, Any]) -> List[discord.Member]:
+        role = channel.guild.get_role(int(schedule["roster_role_id"])) if schedule.get("roster_role_id") else None
+        return [member for member in role.members if not member.bot] if role is not None else []
+
+    def render(self, digest: Mapping[str, Any], roster: List[discord.Member]) -> discord.Embed:
+        entries: Dict[str, Dict[str, Any]] = digest["entries"]
+        title = f"Standup digest · {digest['date']}" + (" (final)" if digest.get("final") else "")
+        lines = [f"• **{entry['name']}** — {_clip(entry['today'] or '—', 140)}" for entry in entries.values()]
+        description = ""
+        for index, line in enumerate(lines):
+            if len(description) + len(line) + 40 > 4096:
+                description += f"\n…and {len(lines) - index} more"
+                break
+            description = f"{description}\n{line}" if description else line
+        embed = discord.Embed(title=title, description=description or "No updates yet.", colour=discord.Colour.blurple())
+        blockers = [f"• {entry['name']}: {_clip(entry['blockers'], 120)}" for entry in entries.values() if entry.get("blockers")]
+        if blockers:
+            embed.add_field(name="Blockers", value=_clip_lines(blockers, 1024), inline=False)
+        missing = [member for member in roster if str(member.id) not in entries]
+        if missing:
+            embed.add_field(name="Waiting on", value=_clip_lines([member.mention for member in missing], 1024, " "), inline=False)
+        submitted = f"{len(entries)} update(s)"
+        if roster:
+            submitted = f"{len(roster) - len(missing)}/{len(roster)} of roster · {submitted}"
+        embed.set_footer(text=f"{submitted} · updated {datetime.utcnow():%H:%M} UTC")
+        return embed
+
+    async def refresh(self, key: str, channel: discord.TextChannel) -> None:
+        async with self._message_locks.setdefault(key, asyncio.Lock()):
+            # Read inside the lock so a message posted by a concurrent refresh is edited, not duplicated.
+            data = await self.store.load()
+            digest = data.get("digests", {}).get(key)
+            if digest is None:
+                return
+            schedule = await self.schedule_for(channel.id) or {}
+            embed = self.render(digest, self.roster(channel, schedule))
+            message_id = digest.get("message_id")
+            if message_id:
+                try:
+                    await self.bot.api_limiter.run(lambda: channel.get_partial_message(message_id).edit(embed=embed))
+                    return
+                except discord.NotFound:
+                    logger.info("Digest message %s was deleted; posting a new one", message_id)
+            message = await self.bot.api_limiter.run(lambda: channel.send(embed=embed))
+            async with self._store_lock:
+                data = await self.store.load()
+                if key in data.get("digests", {}):
+                    data["digests"][key]["message_id"] = message.id
+                    await self.store.save(data)
+
+    async def finalize_due(self) -> None:
+        """Post the final summary for every digest schedule whose cutoff has passed today."""
+        schedules = (await self.bot.schedules.load()).get("schedules", [])
+        for schedule in schedules:
+            cutoff = parse_hhmm(str(schedule.get("cutoff") or ""))
+            if not schedule.get("digest") or cutoff is None:
+                continue
+            now = datetime.now(schedule_zone(schedule))
+            if (now.hour, now.minute) < cutoff:
+                continue
+            channel = self.bot.get_channel(int(schedule["channel_id"]))
+            if not isinstance(channel, discord.TextChannel):
+                continue
+            key = self.digest_key(channel.id, now.date())
+            roster = self.roster(channel, schedule)
+            async with self._store_lock:
+                data = await self.store.load()
+                digests = data.setdefault("digests", {})
+                digest = digests.get(key)
+                # Digests finalised before the marker existed count as posted.
+                if digest is not None and digest.get("summary_posted", digest.get("final")):
+                    continue
+                if digest is None:
+                    if not roster:
+                        continue
+                    digest = digests[key] = {
+                        "channel_id": channel.id,
+                        "date": now.date().isoformat(),
+                        "message_id": None,
+                        "final": False,
+                        "entries": {},
+                    }
+                digest["final"] = True
+                digest["summary_posted"] = False
+                await self.store.save(data)
+            pending = self._pending.pop(key, None)
+            if pending is not None:
+                pending.cancel()
+            # If either call fails the marker stays unset and the next tick retries.
+            await self.refresh(key, channel)
+            await self._post_summary(channel, digest, roster)
+            async with self._store_lock:
+                data = await self.store.load()
+                if key in data.get("digests", {}):
+                    data["digests"][key]["summary_posted"] = True
+                    await self.store.save(data)
+
+    async def _post_summary(self, channel: discord.TextChannel, digest: Mapping[str, Any], roster: List[discord.Member]) -> None:
+        entries: Dict[str, Dict[str, Any]] = digest["entries"]
+        missing = [member for member in roster if str(member.id) not in entries]
+        blocked = sum(1 for entry in entries.values() if entry.get("blockers"))
+        lines = [f"Standups closed for {digest['date']}: {len(entries)} update(s), {blocked} with blockers."]
+        if missing:
+            lines.append("No update from: " + " ".join(member.mention for member in missing))
+        report = [f"# Standups {digest['date']}"]
+        for entry in entries.values():
+            report.append(
+                f"\n## {entry['name']}\n\n**Yesterday:** {entry['yesterday'] or '—'}\n\n"
+                f"**Today:** {entry['today'] or '—'}\n\n**Blockers:** {entry['blockers'] or 'None'}"
+            )
+        file = discord.File(io.BytesIO("\n".join(report).encode("utf-8")), filename=f"standups-{digest['date']}.md")
+        await self.bot.api_limiter.run(
+            lambda: channel.send(
+                "\n".join(lines),
+                file=file if entries else discord.utils.MISSING,
+                allowed_mentions=discord.AllowedMentions(users=True, roles=False, everyone=False),
+            )
+        )
 
 
-class DeployApprovalView(discord.ui.View):
-    def __init__(self, quorum: int, approver_roles: set[str]) -> None:
+def _clip_lines(lines: List[str], limit: int, separator: str = "\n") -> str:
+    """Join ``lines`` within ``limit`` characters, ending with "…and N more" when they do not all fit."""
+    text = ""
+    for index, line in enumerate(lines):
+        candidate = f"{text}{separator}{line}" if text else line
+        remaining = len(lines) - index - 1
+        reserve = len(f"{separator}…and {remaining} more") if remaining else 0
+        if len(candidate) + reserve > limit:
+            more = f"…and {len(lines) - index} more"
+            return f"{text}{separator}{more}" if text else more
+        text = candidate
+    return text
+
+
+class DeployApprovalView(DrainingView):
+    def __init__(self, quorum: int, approvers: ApproverRoleCache) -> None:
         super().__init__(timeout=3600)
         self.quorum = quorum
-        self.approver_roles = approver_roles
+        self.approvers = approvers
         self.approved: Dict[int, datetime] = {}
         self.rejected: Dict[int, datetime] = {}
 
     async def _check_permissions(self, interaction: discord.Interaction) -> bool:
         if not isinstance(interaction.user, discord.Member):
             return False
-        member_role_names = {role.name for role in interaction.user.roles}
-        return bool(member_role_names & self.approver_roles)
+        return self.approvers.is_approver(interaction.user)
 
     async def _handle_vote(
         self,
@@ -163,7 +716,20 @@ class DeployApprovalView(discord.ui.View):
             for child in self.children:
                 child.disabled = True
             await interaction.response.edit_message(embed=embed, view=self)
-            await interaction.followup.send(completion_message, ephemeral=False)
+            webhooks: Optional[WebhookPool] = getattr(interaction.client, "webhooks", None)
+            channel = interaction.channel
+            if webhooks is not None and channel is not None and webhooks.has_webhook(channel.id):
+                announcement = discord.Embed(
+                    title=embed.title if embed is not None else "Deployment",
+                    description=completion_message,
+                    colour=discord.Colour.green() if approval_complete else discord.Colour.red(),
+                )
+                try:
+                    await wait_posted(webhooks.post(channel, announcement, username="Deployments"))  # type: ignore[arg-type]
+                except Exception:
+                    await interaction.followup.send(completion_message, ephemeral=False)
+            else:
+                await interaction.followup.send(completion_message, ephemeral=False)
         else:
             await interaction.response.edit_message(embed=embed, view=self)
 
@@ -194,27 +760,146 @@ class DeployApprovalView(discord.ui.View):
 
 class OpsBot(commands.Bot):
     def __init__(self, config: BotConfig) -> None:
-        intents = discord.Intents.default()
-        intents.guilds = True
-        intents.members = True
-        super().__init__(command_prefix="!", intents=intents)
+        super().__init__(command_prefix="!", tree_cls=DrainingTree, **client_options(config))
         self.config = config
+        self.started_at = time.perf_counter()
+        self._ready_logged = False
         ensure_data_files()
+        self.command_sync = PersistentJSON(COMMAND_SYNC_PATH, {"signatures": {}})
         self.schedules = PersistentJSON(SCHEDULES_PATH, {"schedules": []})
         self.oncall = PersistentJSON(ONCALL_PATH, {"rotations": {}})
+        self.retros = PersistentJSON(RETROS_PATH, {"retros": {}})
+        self.api_limiter = DiscordCallLimiter(DISCORD_API_CONCURRENCY, DISCORD_API_CALLS_PER_SECOND)
+        self.approvers = ApproverRoleCache(
+            REQUIRED_APPROVER_ROLES,
+            config.server_state_path,
+            memoize_members=config.member_cache_mode == "full",
+        )
+        self.wbs_templates = WBSTemplateRegistry(WBS_TEMPLATE_DIR)
+        self.members = MemberLookup(
+            config.member_lru_size,
+            fetch_missing=config.member_cache_mode == "light",
+        )
+        self.webhooks: Optional[WebhookPool] = None
+        self.digests = StandupDigests(self)
 
     async def setup_hook(self) -> None:  # type: ignore[override]
-        if self.config.guild_id:
-            guild = discord.Object(id=self.config.guild_id)
+        started = time.perf_counter()
+        await self.approvers.load_state()
+        await self.wbs_templates.load_all()
+        if self.config.webhook_posting:
+            self.webhooks = await asyncio.to_thread(WebhookPool.from_state, self.config.server_state_path)
+            logger.info("Webhook posting enabled for %s channel(s)", self.webhooks.stats()["webhooks"])
+        self.standup_cutoffs.start()
+        synced = await self.sync_commands(force=self.config.force_command_sync)
+        logger.info(
+            "setup_hook finished in %.2fs (command sync %s)",
+            time.perf_counter() - started,
+            "performed" if synced else "skipped, command tree unchanged",
+        )
+
+    async def sync_commands(self, *, force: bool = False) -> bool:
+        """Sync the command tree only when its signature differs from the last sync.
+
+        Signatures are stored per application and guild scope in
+        ``data/command_sync.json``; ``force`` bypasses the comparison.
+        """
+        guild = discord.Object(id=self.config.guild_id) if self.config.guild_id else None
+        if guild is not None:
             self.tree.copy_global_to(guild=guild)
-            await self.tree.sync(guild=guild)
-        else:
-            await self.tree.sync()
+        scope = f"{self.application_id}:{self.config.guild_id or 'global'}"
+        signature = command_tree_signature(self.tree, guild)
+        data = await self.command_sync.load()
+        signatures = data.setdefault("signatures", {})
+        if not force and signatures.get(scope) == signature:
+            return False
+        await self.tree.sync(guild=guild)
+        signatures[scope] = signature
+        await self.command_sync.save(data)
+        return True
+
+    async def on_ready(self) -> None:
+        if not self._ready_logged:
+            self._ready_logged = True
+            logger.info("Ready as %s %.2fs after start", self.user, time.perf_counter() - self.started_at)
+
+    @tasks.loop(minutes=1)
+    async def standup_cutoffs(self) -> None:
+        try:
+            await self.digests.finalize_due()
+        except discord.HTTPException as exc:
+            logger.warning("Standup digest finalisation failed: %s", exc)
+
+    @standup_cutoffs.before_loop
+    async def _before_standup_cutoffs(self) -> None:
+        await self.wait_until_ready()
+
+    async def drain(self, timeout: float) -> None:
+        """Stop taking commands, let running ones finish within ``timeout``, then flush buffered state."""
+        deadline = Deadline(timeout)
+        tree: DrainingTree = self.tree  # type: ignore[assignment]
+        tree.draining = True
+        # stop() lets a cutoff pass that is already posting summaries finish.
+        self.standup_cutoffs.stop()
+        await tree.wait_inflight(deadline)
+        cutoffs = self.standup_cutoffs.get_task()
+        if cutoffs is not None and not cutoffs.done():
+            await deadline.wait(asyncio.shield(cutoffs), "standup cutoffs")
+        await deadline.wait(self.digests.flush(), "standup digest edits", floor=MIN_FLUSH_SECONDS)
+        if self.webhooks is not None:
+            await deadline.wait(self.webhooks.flush(), "queued webhook posts", floor=MIN_FLUSH_SECONDS)
+        stores = (self.schedules, self.oncall, self.retros, self.command_sync, self.digests.store)
+        await deadline.wait(
+            asyncio.gather(*(store.idle() for store in stores)), "data file saves", floor=MIN_FLUSH_SECONDS
+        )
+
+    async def close(self) -> None:
+        self.standup_cutoffs.cancel()
+        await self.digests.flush()
+        if self.webhooks is not None:
+            await self.webhooks.close()
+        await super().close()
+
+    async def on_guild_role_create(self, role: discord.Role) -> None:
+        self.approvers.invalidate(role.guild.id)
+
+    async def on_guild_role_update(self, before: discord.Role, after: discord.Role) -> None:
+        self.approvers.invalidate(after.guild.id)
+
+    async def on_guild_role_delete(self, role: discord.Role) -> None:
+        self.approvers.invalidate(role.guild.id)
+
+    async def on_member_update(self, before: discord.Member, after: discord.Member) -> None:
+        if before.roles != after.roles:
+            self.approvers.invalidate_member(after.guild.id, after.id)
+        self.members.discard(after.guild.id, after.id)
+
+    async def on_member_remove(self, member: discord.Member) -> None:
+        self.approvers.invalidate_member(member.guild.id, member.id)
+        self.members.discard(member.guild.id, member.id)
 
 
 bot = OpsBot(BotConfig.from_env())
 
 
+@bot.tree.command(name="sync_commands", description="Force a slash command re-sync with Discord (administrators only).")
+@app_commands.default_permissions(administrator=True)
+@app_commands.guild_only()
+async def sync_commands(interaction: discord.Interaction) -> None:
+    member = interaction.user
+    if not isinstance(member, discord.Member) or not member.guild_permissions.administrator:
+        await interaction.response.send_message("Only administrators can re-sync commands.", ephemeral=True)
+        return
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    started = time.perf_counter()
+    try:
+        await bot.sync_commands(force=True)
+    except discord.HTTPException as exc:
+        await interaction.followup.send(f"Command sync failed: {exc}", ephemeral=True)
+        return
+    await interaction.followup.send(f"Slash commands re-synced in {time.perf_counter() - started:.2f}s.", ephemeral=True)
+
+
 @bot.tree.command(name="standup", description="Submit a standup update using an interactive modal.")
 async def standup(interaction: discord.Interaction) -> None:
     if not isinstance(interaction.user, discord.Member):
@@ -231,17 +916,30 @@ standup_sched_group = app_commands.Group(name="standup_sched", description="Mana
 
 
 @standup_sched_group.command(name="schedule")
-@app_commands.describe(time="24-hour time, e.g. 09:30", timezone="Timezone label", channel="Channel to post reminders in")
+@app_commands.describe(
+    time="24-hour time, e.g. 09:30",
+    timezone="IANA timezone, e.g. UTC or Europe/London",
+    channel="Channel to post reminders in",
+    digest="Collect submissions into one rolling digest message instead of one message each",
+    cutoff="24-hour time the digest closes and the final summary is posted, e.g. 11:00",
+    roster="Role whose members are expected to submit (needs MEMBER_CACHE_MODE=full)",
+)
 async def standup_schedule(
     interaction: discord.Interaction,
     time: str,
     timezone: str = "UTC",
     channel: Optional[discord.TextChannel] = None,
+    digest: bool = False,
+    cutoff: Optional[str] = None,
+    roster: Optional[discord.Role] = None,
 ) -> None:
     target_channel = channel or interaction.channel
     if not isinstance(target_channel, discord.TextChannel):
         await interaction.response.send_message("Please choose a text channel for standup reminders.", ephemeral=True)
         return
+    if cutoff is not None and parse_hhmm(cutoff) is None:
+        await interaction.response.send_message("Cutoff must be a 24-hour time such as 11:00.", ephemeral=True)
+        return
     data = await bot.schedules.load()
     schedules: List[Dict[str, Any]] = data.setdefault("schedules", [])
     schedules = [entry for entry in schedules if entry.get("channel_id") != target_channel.id]
@@ -250,12 +948,16 @@ async def standup_schedule(
             "channel_id": target_channel.id,
             "time": time,
             "timezone": timezone,
+            "digest": digest,
+            "cutoff": cutoff,
+            "roster_role_id": roster.id if roster else None,
         }
     )
     data["schedules"] = schedules
     await bot.schedules.save(data)
+    mode = f" Digest mode on{f', closing at {cutoff}' if cutoff else ''}." if digest else ""
     await interaction.response.send_message(
-        f"Standup scheduled for {target_channel.mention} at {time} {timezone}.",
+        f"Standup scheduled for {target_channel.mention} at {time} {timezone}.{mode}",
         ephemeral=True,
     )
 
@@ -271,7 +973,8 @@ async def standup_list(interaction: discord.Interaction) -> None:
     for entry in schedules:
         channel = interaction.guild.get_channel(entry.get("channel_id")) if interaction.guild else None
         channel_name = channel.mention if isinstance(channel, discord.TextChannel) else "Unknown channel"
-        lines.append(f"• {channel_name}: {entry.get('time')} {entry.get('timezone', 'UTC')}")
+        digest = f" · digest until {entry.get('cutoff') or 'end of day'}" if entry.get("digest") else ""
+        lines.append(f"• {channel_name}: {entry.get('time')} {entry.get('timezone', 'UTC')}{digest}")
     await interaction.response.send_message("\n".join(lines), ephemeral=True)
 
 
@@ -296,6 +999,31 @@ async def standup_clear(interaction: discord.Interaction, channel: Optional[disc
 bot.tree.add_command(standup_sched_group)
 
 
+async def send_embed_pages(interaction: discord.Interaction, pages: List[List[Dict[str, Any]]]) -> None:
+    sent_at = datetime.utcnow()
+    for index, page in enumerate(pages):
+        embeds = [discord.Embed.from_dict(item) for item in page]
+        for embed in embeds:
+            embed.timestamp = sent_at
+        if index == 0 and not interaction.response.is_done():
+            await interaction.response.send_message(embeds=embeds)
+        else:
+            await interaction.followup.send(embeds=embeds)
+
+
+async def send_private_error(interaction: discord.Interaction, message: str) -> None:
+    """Report an error to the caller after a public ``defer(thinking=True)``.
+
+    The first follow-up to a public deferral replaces the "thinking" message and
+    ignores ``ephemeral``, so that message is deleted before the error is sent.
+    """
+    try:
+        await interaction.delete_original_response()
+    except discord.HTTPException as exc:
+        logger.debug("Could not delete deferred response for interaction %s: %s", interaction.id, exc)
+    await interaction.followup.send(message, ephemeral=True)
+
+
 @bot.tree.command(name="wbs", description="Render a work breakdown structure from JSON data.")
 @app_commands.describe(input_json="Inline JSON payload", template="Name of a template file in data/wbs_templates")
 async def wbs(
@@ -303,38 +1031,105 @@ async def wbs(
     input_json: Optional[str] = None,
     template: Optional[str] = None,
 ) -> None:
-    try:
-        if input_json:
-            payload = json.loads(input_json)
-        else:
-            if not template:
-                template = "sample_wbs_template"
-            template_path = WBS_TEMPLATE_DIR / f"{template}.json"
-            if not template_path.exists():
-                await interaction.response.send_message("Template not found.", ephemeral=True)
-                return
-            payload = json.loads(template_path.read_text(encoding="utf-8"))
-    except json.JSONDecodeError as exc:
-        await interaction.response.send_message(f"Invalid JSON: {exc}", ephemeral=True)
-        return
+    if input_json:
+        try:
+            pages = render_wbs_pages(validate_wbs(json.loads(input_json)))
+        except json.JSONDecodeError as exc:
+            await interaction.response.send_message(f"Invalid JSON: {exc}", ephemeral=True)
+            return
+        except WBSValidationError as exc:
+            await interaction.response.send_message(f"Invalid WBS: {exc}", ephemeral=True)
+            return
+    else:
+        entry = await bot.wbs_templates.get(template or "sample_wbs_template")
+        if entry is None:
+            await interaction.response.send_message("Template not found.", ephemeral=True)
+            return
+        if entry.error is not None:
+            await interaction.response.send_message(f"Template is invalid: {entry.error}", ephemeral=True)
+            return
+        pages = entry.pages
+    await send_embed_pages(interaction, pages)
+
+
+@wbs.autocomplete("template")
+async def wbs_template_autocomplete(interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
+    return [app_commands.Choice(name=name, value=name) for name in bot.wbs_templates.search(current)]
+
+
+async def _download_attachment(attachment: discord.Attachment, destination: Path) -> None:
+    timeout = aiohttp.ClientTimeout(total=120)
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        async with session.get(attachment.url) as response:
+            response.raise_for_status()
+            with destination.open("wb") as handle:
+                async for chunk in response.content.iter_chunked(64 * 1024):
+                    handle.write(chunk)
 
-    project_name = payload.get("project", "Project")
+
+def _wbs_import_embed(rollup: WBSRollup, filename: str) -> discord.Embed:
     embed = discord.Embed(
-        title=f"WBS – {project_name}",
+        title=f"WBS Import – {rollup.project}"[:256],
+        description=f"{rollup.tasks} task(s) imported from `{filename}`. Full report attached.",
         colour=discord.Colour.teal(),
         timestamp=datetime.utcnow(),
     )
-    for phase in payload.get("phases", []):
-        tasks = phase.get("tasks", [])
-        lines = []
-        for task in tasks:
-            owner = task.get("owner", "Unassigned")
-            due = task.get("due", "TBD")
-            name = task.get("name", "Task")
-            lines.append(f"• **{name}** — {owner} _(due {due})_")
-        value = "\n".join(lines) if lines else "No tasks defined."
-        embed.add_field(name=phase.get("name", "Phase"), value=value, inline=False)
-    await interaction.response.send_message(embed=embed)
+    owners = sorted(rollup.owner_load.items(), key=lambda item: -item[1][1])
+    owner_lines = [f"• {owner}: {int(count)} task(s), {duration:g}d" for owner, (count, duration) in owners[:10]]
+    if len(owners) > 10:
+        owner_lines.append(f"… and {len(owners) - 10} more")
+    embed.add_field(name="Owner load", value="\n".join(owner_lines)[:1024] or "—", inline=False)
+    phase_lines = [
+        f"• {name}: {phase.tasks} task(s), {phase.first_due or 'TBD'} → {phase.last_due or 'TBD'}"
+        for name, phase in list(rollup.phases.items())[:10]
+    ]
+    if len(rollup.phases) > 10:
+        phase_lines.append(f"… and {len(rollup.phases) - 10} more")
+    embed.add_field(name="Phases", value="\n".join(phase_lines)[:1024] or "—", inline=False)
+    if rollup.critical_path:
+        chain = " → ".join(rollup.task_name(task_id) for task_id in rollup.critical_path)
+        if len(chain) > 1000:
+            chain = chain[:999] + "…"
+        embed.add_field(
+            name=f"Critical path ({rollup.critical_path_length:g}d, {len(rollup.critical_path)} tasks)",
+            value=chain,
+            inline=False,
+        )
+    if rollup.warnings:
+        embed.add_field(name="Warnings", value="\n".join(f"• {item}" for item in rollup.warnings)[:1024], inline=False)
+    return embed
+
+
+@bot.tree.command(name="wbs_import", description="Import a large WBS from a JSON, JSON Lines, or CSV attachment.")
+@app_commands.describe(file="WBS file (.json, .jsonl, .ndjson, or .csv)")
+async def wbs_import(interaction: discord.Interaction, file: discord.Attachment) -> None:
+    file_format = detect_format(file.filename)
+    if file_format is None:
+        await interaction.response.send_message("Attach a .json, .jsonl, .ndjson, or .csv file.", ephemeral=True)
+        return
+    if file.size > WBS_IMPORT_MAX_BYTES:
+        await interaction.response.send_message(
+            f"Attachment is too large (limit {WBS_IMPORT_MAX_BYTES // (1024 * 1024)} MB).",
+            ephemeral=True,
+        )
+        return
+    await interaction.response.defer(thinking=True)
+    with tempfile.TemporaryDirectory(prefix="wbs-import-") as workdir:
+        source = Path(workdir) / f"source{Path(file.filename).suffix.lower()}"
+        report = Path(workdir) / "wbs-report.md"
+        try:
+            await _download_attachment(file, source)
+            rollup = await asyncio.to_thread(import_wbs, source, file_format, report)
+        except aiohttp.ClientError as exc:
+            await send_private_error(interaction, f"Could not download the attachment: {exc}")
+            return
+        except WBSImportError as exc:
+            await send_private_error(interaction, f"Could not import WBS: {exc}")
+            return
+        await interaction.followup.send(
+            embed=_wbs_import_embed(rollup, file.filename),
+            file=discord.File(report, filename="wbs-report.md"),
+        )
 
 
 deploy_group = app_commands.Group(name="deploy", description="Deployment workflows")
@@ -346,8 +1141,7 @@ async def deploy_approve(interaction: discord.Interaction, version: str, quorum:
     if not isinstance(interaction.user, discord.Member):
         await interaction.response.send_message("Deployment approvals must run in a guild.", ephemeral=True)
         return
-    member_role_names = {role.name for role in interaction.user.roles}
-    if not (member_role_names & REQUIRED_APPROVER_ROLES):
+    if not bot.approvers.is_approver(interaction.user):
         await interaction.response.send_message("Only program, project, or DevOps leads can open deployment approvals.", ephemeral=True)
         return
     embed = discord.Embed(
@@ -358,7 +1152,7 @@ async def deploy_approve(interaction: discord.Interaction, version: str, quorum:
     )
     embed.add_field(name="Requested by", value=interaction.user.mention)
     embed.add_field(name="Quorum", value=str(quorum))
-    view = DeployApprovalView(quorum, REQUIRED_APPROVER_ROLES)
+    view = DeployApprovalView(quorum, bot.approvers)
     await interaction.response.send_message(embed=embed, view=view)
 
 bot.tree.add_command(deploy_group)
@@ -395,6 +1189,7 @@ async def oncall_add(interaction: discord.Interaction, role: discord.Role, membe
     rotation = _ensure_rotation_structure(data, role)
     if member.id not in rotation["members"]:
         rotation["members"].append(member.id)
+    bot.members.put(member)
     await bot.oncall.save(data)
     await interaction.response.send_message(
         f"{member.mention} added to the {role.name} rotation.",
@@ -425,15 +1220,16 @@ async def oncall_list(interaction: discord.Interaction, role: discord.Role) -> N
     if not member_ids:
         await interaction.response.send_message("No members enrolled in this rotation.", ephemeral=True)
         return
+    await interaction.response.defer(ephemeral=True)
+    members = await bot.members.get_many(interaction.guild, member_ids) if interaction.guild else [None] * len(member_ids)
     lines = []
-    for index, member_id in enumerate(member_ids):
-        member = interaction.guild.get_member(member_id) if interaction.guild else None
+    for index, (member_id, member) in enumerate(zip(member_ids, members)):
         indicator = "→" if rotation.get("active_member") == member_id else " "
         if member:
             lines.append(f"{indicator} {index + 1}. {member.mention}")
         else:
             lines.append(f"{indicator} {index + 1}. (member left server)")
-    await interaction.response.send_message("\n".join(lines), ephemeral=True)
+    await interaction.followup.send("\n".join(lines), ephemeral=True)
 
 
 @oncall_group.command(name="rotate")
@@ -444,10 +1240,14 @@ async def oncall_rotate(interaction: discord.Interaction, role: discord.Role) ->
     data = await bot.oncall.load()
     rotation = _ensure_rotation_structure(data, role)
     member_ids = rotation.get("members", [])
-    members = [interaction.guild.get_member(member_id) for member_id in member_ids]
+    if not member_ids:
+        await interaction.response.send_message("No members available to rotate.", ephemeral=True)
+        return
+    await interaction.response.defer(thinking=True)
+    members = await bot.members.get_many(interaction.guild, member_ids, fresh=True)
     members = [member for member in members if member is not None]
     if not members:
-        await interaction.response.send_message("No members available to rotate.", ephemeral=True)
+        await send_private_error(interaction, "No members available to rotate.")
         return
     members.append(members.pop(0))
     rotation["members"] = [member.id for member in members]
@@ -458,14 +1258,13 @@ async def oncall_rotate(interaction: discord.Interaction, role: discord.Role) ->
         has_role = role in member.roles
         if member is next_on_call and not has_role:
             await member.add_roles(role, reason="On-call rotation")
+            bot.members.discard(member.guild.id, member.id)
         elif member is not next_on_call and has_role:
             await member.remove_roles(role, reason="On-call rotation")
+            bot.members.discard(member.guild.id, member.id)
 
     await bot.oncall.save(data)
-    await interaction.response.send_message(
-        f"Rotation updated. {next_on_call.mention} is now on call.",
-        ephemeral=False,
-    )
+    await interaction.followup.send(f"Rotation updated. {next_on_call.mention} is now on call.")
 
 
 bot.tree.add_command(oncall_group)
@@ -474,42 +1273,184 @@ bot.tree.add_command(oncall_group)
 retro_group = app_commands.Group(name="retro", description="Retrospective utilities")
 
 
+def _parse_lenses(lens_set: Optional[str], custom: Optional[str]) -> Tuple[str, ...]:
+    if custom:
+        lenses = tuple(dict.fromkeys(part.strip() for part in custom.split(",") if part.strip()))
+        if lenses:
+            return lenses[:MAX_RETRO_LENSES]
+    return RETRO_LENS_SETS.get(lens_set or "", DEFAULT_RETRO_LENSES)
+
+
 @retro_group.command(name="open")
-@app_commands.describe(title="Retro title", channel="Channel to host the retro threads", duration="Auto archive duration in minutes")
+@app_commands.describe(
+    title="Retro title",
+    channel="Channel to host the retro threads",
+    duration="Auto archive duration in minutes",
+    lens_set="Predefined set of retro lanes",
+    lenses="Comma-separated custom lanes (overrides lens_set)",
+)
+@app_commands.choices(lens_set=[app_commands.Choice(name=name, value=name) for name in RETRO_LENS_SETS])
 async def retro_open(
     interaction: discord.Interaction,
     title: str,
     channel: Optional[discord.TextChannel] = None,
     duration: app_commands.Range[int, 60, 10080] = 1440,
+    lens_set: Optional[str] = None,
+    lenses: Optional[str] = None,
 ) -> None:
     target_channel = channel or interaction.channel
     if not isinstance(target_channel, discord.TextChannel):
         await interaction.response.send_message("Retros must be started in a text channel.", ephemeral=True)
         return
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    lanes = _parse_lenses(lens_set, lenses)
     message = await target_channel.send(
         embed=discord.Embed(
             title=f"Retro: {title}",
             description="Threads created for each lane. Share feedback asynchronously before the live session.",
             colour=discord.Colour.purple(),
             timestamp=datetime.utcnow(),
-        )
+        ).add_field(name="Lanes", value=", ".join(lanes), inline=False)
     )
-    for lens in DEFAULT_RETRO_LENSES:
-        thread_name = f"{title} – {lens}"
-        await target_channel.create_thread(
-            name=thread_name,
-            message=message,
-            auto_archive_duration=duration,
-            reason="Retro lane setup",
+
+    # A message can anchor only one thread, so the first lane hangs off the
+    # announcement and the remaining lanes are standalone public threads.
+    async def create_lane(lens: str) -> discord.Thread:
+        return await bot.api_limiter.run(
+            lambda: target_channel.create_thread(
+                name=f"{title} – {lens}"[:100],
+                message=message if lens == lanes[0] else None,
+                auto_archive_duration=duration,
+                type=discord.ChannelType.public_thread,
+                reason="Retro lane setup",
+            )
+        )
+
+    results = await asyncio.gather(*(create_lane(lens) for lens in lanes), return_exceptions=True)
+    threads: Dict[str, int] = {}
+    failed: List[str] = []
+    for lens, result in zip(lanes, results):
+        if isinstance(result, BaseException):
+            logger.warning("Failed to create retro lane %s: %s", lens, result)
+            failed.append(lens)
+        else:
+            threads[lens] = result.id
+
+    data = await bot.retros.load()
+    data.setdefault("retros", {})[str(message.id)] = {
+        "title": title,
+        "guild_id": target_channel.guild.id,
+        "channel_id": target_channel.id,
+        "lenses": list(lanes),
+        "threads": threads,
+        "opened_by": interaction.user.id,
+        "opened_at": datetime.utcnow().isoformat(),
+        "closed_at": None,
+    }
+    await bot.retros.save(data)
+    summary = f"Retrospective created with {len(threads)} lane(s)."
+    if failed:
+        summary += f" Failed to create: {', '.join(failed)}."
+    await interaction.followup.send(summary, ephemeral=True)
+
+
+async def _collect_lane(thread_id: int) -> Tuple[Optional[discord.Thread], List[discord.Message]]:
+    thread = bot.get_channel(thread_id)
+    if thread is None:
+        try:
+            thread = await bot.api_limiter.run(lambda: bot.fetch_channel(thread_id))
+        except (discord.NotFound, discord.Forbidden):
+            return None, []
+    if not isinstance(thread, discord.Thread):
+        return None, []
+
+    async def read_history() -> List[discord.Message]:
+        return [message async for message in thread.history(limit=None, oldest_first=True)]
+
+    messages = await bot.api_limiter.run(read_history)
+    return thread, [message for message in messages if message.type == discord.MessageType.default]
+
+
+def _retro_export(retro: Dict[str, Any], lanes: Dict[str, List[discord.Message]]) -> str:
+    lines = [f"# Retro: {retro['title']}", "", f"Opened {retro.get('opened_at', 'unknown')} UTC", ""]
+    for lens in retro.get("lenses", []):
+        lines.append(f"## {lens}")
+        lines.append("")
+        messages = lanes.get(lens, [])
+        if not messages:
+            lines.append("_No feedback._")
+        for message in messages:
+            votes = sum(reaction.count for reaction in message.reactions)
+            content = message.content.replace("\n", " ").strip() or "(no text content)"
+            vote_note = f" (+{votes})" if votes else ""
+            lines.append(f"- **{message.author.display_name}**: {content}{vote_note}")
+        lines.append("")
+    return "\n".join(lines)
+
+
+@retro_group.command(name="close")
+@app_commands.describe(retro="Retro to close", lock="Lock the lane threads after exporting")
+async def retro_close(interaction: discord.Interaction, retro: str, lock: bool = True) -> None:
+    data = await bot.retros.load()
+    entry = data.get("retros", {}).get(retro)
+    if entry is None or entry.get("closed_at") or entry.get("guild_id") != interaction.guild_id:
+        await interaction.response.send_message("No open retro with that ID.", ephemeral=True)
+        return
+    can_manage = interaction.permissions.manage_threads if interaction.permissions else False
+    if interaction.user.id != entry.get("opened_by") and not can_manage:
+        await interaction.response.send_message("Only the facilitator or thread managers can close this retro.", ephemeral=True)
+        return
+    await interaction.response.defer(thinking=True)
+
+    lane_items = list(entry.get("threads", {}).items())
+    collected = await asyncio.gather(*(_collect_lane(thread_id) for _, thread_id in lane_items))
+    lanes = {lens: messages for (lens, _), (_, messages) in zip(lane_items, collected)}
+    export = _retro_export(entry, lanes)
+
+    if lock:
+        threads = [thread for thread, _ in collected if thread is not None]
+        await asyncio.gather(
+            *(
+                bot.api_limiter.run(lambda thread=thread: thread.edit(archived=True, locked=True, reason="Retro closed"))
+                for thread in threads
+            ),
+            return_exceptions=True,
         )
-    await interaction.response.send_message("Retrospective created.", ephemeral=True)
+
+    entry["closed_at"] = datetime.utcnow().isoformat()
+    await bot.retros.save(data)
+
+    embed = discord.Embed(
+        title=f"Retro closed: {entry['title']}",
+        colour=discord.Colour.purple(),
+        timestamp=datetime.utcnow(),
+    )
+    for lens in entry.get("lenses", []):
+        embed.add_field(name=lens, value=f"{len(lanes.get(lens, []))} item(s)", inline=True)
+    if not bot.config.enable_message_content:
+        embed.set_footer(text="Message content intent disabled; export lists authors only.")
+    file = discord.File(io.BytesIO(export.encode("utf-8")), filename="retro-summary.md")
+    await interaction.followup.send(embed=embed, file=file)
+
+
+@retro_close.autocomplete("retro")
+async def retro_autocomplete(interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
+    data = await bot.retros.load()
+    suggestions = []
+    for retro_id, entry in data.get("retros", {}).items():
+        if entry.get("closed_at") or entry.get("guild_id") != interaction.guild_id:
+            continue
+        label = f"{entry.get('title', 'Retro')} ({retro_id})"
+        if current.lower() in label.lower():
+            suggestions.append(app_commands.Choice(name=label[:100], value=retro_id))
+    return suggestions[:25]
 
 
 bot.tree.add_command(retro_group)
 
 
 async def main() -> None:
-    await bot.start(bot.config.token)
+    await run_until_signalled(bot, bot.config.token, timeout=bot.config.drain_timeout)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,150 @@
+"""Graceful shutdown for the bots on SIGTERM/SIGINT.
+
+Watchtower and ``docker stop`` send SIGTERM and wait for the container's stop
+grace period before sending SIGKILL. ``run_until_signalled`` starts the bot. On
+the first signal it awaits ``bot.drain(timeout)`` and then ``bot.close()``.
+
+``DrainingTree`` is the command tree both bots use. While the bot is running,
+it records the task and interaction of every slash command. Once draining
+starts, it answers new commands with a restart notice. The drain waits for the
+recorded commands until its deadline, then cancels the stragglers and tells
+their users to run the command again. Button and modal interactions bypass the
+tree, so ``DrainingView`` and ``DrainingModal`` route their checks through it.
+
+The same module ships with both bots (separate Docker build contexts).
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import signal
+import time
+from typing import Any, Awaitable, Dict
+
+import discord
+from discord import app_commands
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DRAIN_TIMEOUT = 25.0
+# Buffered state still gets this long to flush after the in-flight deadline has passed.
+MIN_FLUSH_SECONDS = 2.0
+RESTART_NOTICE = "The bot is restarting for an update. Try again in a minute."
+UNFINISHED_NOTICE = "The bot restarted before this request finished. Please run it again in a minute."
+
+
+class Deadline:
+    """Shared time budget for the steps of a drain."""
+
+    def __init__(self, seconds: float) -> None:
+        self.expires = time.monotonic() + seconds
+
+    def remaining(self, floor: float = 0.0) -> float:
+        return max(floor, self.expires - time.monotonic())
+
+    async def wait(self, awaitable: Awaitable[Any], what: str, *, floor: float = 0.0) -> bool:
+        """Await ``awaitable`` within the remaining budget; False (and a warning) if it ran out."""
+        try:
+            await asyncio.wait_for(awaitable, self.remaining(floor))
+        except asyncio.TimeoutError:
+            logger.warning("Drain deadline passed while waiting for %s", what)
+            return False
+        return True
+
+
+async def notify(interaction: discord.Interaction, message: str) -> None:
+    """Send an ephemeral notice, whether or not the interaction was already answered."""
+    try:
+        if interaction.response.is_done():
+            await interaction.followup.send(message, ephemeral=True)
+        else:
+            await interaction.response.send_message(message, ephemeral=True)
+    except discord.HTTPException as exc:
+        logger.debug("Could not notify interaction %s: %s", interaction.id, exc)
+
+
+class DrainingTree(app_commands.CommandTree):
+    def __init__(self, client: discord.Client, **kwargs: Any) -> None:
+        super().__init__(client, **kwargs)
+        self.draining = False
+        self.inflight: Dict["asyncio.Task[Any]", discord.Interaction] = {}
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return await self.admit(interaction)
+
+    async def admit(self, interaction: discord.Interaction) -> bool:
+        """Refuse ``interaction`` with a restart notice once draining; otherwise track it as in flight."""
+        autocomplete = interaction.type is discord.InteractionType.autocomplete
+        if self.draining:
+            if not autocomplete:
+                await notify(interaction, RESTART_NOTICE)
+            return False
+        task = asyncio.current_task()
+        # Checks run in the same task as the callback, so the task covers the whole command or component.
+        if task is not None and not autocomplete:
+            self.inflight[task] = interaction
+            task.add_done_callback(self._forget)
+        return True
+
+    def _forget(self, task: "asyncio.Task[Any]") -> None:
+        self.inflight.pop(task, None)
+
+    async def wait_inflight(self, deadline: Deadline) -> int:
+        """Wait for running commands until ``deadline``; cancel and notify the rest. Returns how many were cut off."""
+        tasks = set(self.inflight)
+        if not tasks:
+            return 0
+        logger.info("Waiting for %s in-flight command(s)", len(tasks))
+        _, pending = await asyncio.wait(tasks, timeout=deadline.remaining())
+        stranded = [self.inflight.pop(task) for task in pending if task in self.inflight]
+        for task in pending:
+            task.cancel()
+        for interaction in stranded:
+            await notify(interaction, UNFINISHED_NOTICE)
+        if pending:
+            logger.warning("Cancelled %s command(s) still running at the drain deadline", len(pending))
+        return len(pending)
+
+
+async def admit(interaction: discord.Interaction) -> bool:
+    tree = getattr(interaction.client, "tree", None)
+    return await tree.admit(interaction) if isinstance(tree, DrainingTree) else True
+
+
+class DrainingView(discord.ui.View):
+    """View whose buttons stop being accepted once the bot starts draining."""
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return await admit(interaction)
+
+
+class DrainingModal(discord.ui.Modal):
+    """Modal whose submissions stop being accepted once the bot starts draining."""
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return await admit(interaction)
+
+
+async def run_until_signalled(bot: Any, token: str, *, timeout: float = DEFAULT_DRAIN_TIMEOUT) -> None:
+    """Run ``bot`` until SIGTERM/SIGINT, then drain for up to ``timeout`` seconds and close it."""
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        with contextlib.suppress(NotImplementedError):  # add_signal_handler is unavailable on Windows
+            loop.add_signal_handler(signum, stop.set)
+    runner = asyncio.create_task(bot.start(token))
+    stopper = asyncio.create_task(stop.wait())
+    try:
+        done, _ = await asyncio.wait({runner, stopper}, return_when=asyncio.FIRST_COMPLETED)
+        if stopper in done:
+            logger.info("Shutdown signal received; draining for up to %.0fs", timeout)
+            started = time.monotonic()
+            await bot.drain(timeout)
+            logger.info("Drain finished in %.1fs", time.monotonic() - started)
+            await bot.close()
+        await runner
+    finally:
+        stopper.cancel()
+        if not bot.is_closed():
+            await bot.close()
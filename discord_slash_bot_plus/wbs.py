@@ -0,0 +1,249 @@
+"""Work breakdown structure validation, rendering and template caching."""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger("ops-bot.wbs")
+
+EMBED_TITLE_LIMIT = 256
+EMBED_FIELD_NAME_LIMIT = 256
+EMBED_FIELD_VALUE_LIMIT = 1024
+EMBED_MAX_FIELDS = 25
+EMBED_TOTAL_LIMIT = 6000
+MESSAGE_MAX_EMBEDS = 10
+WBS_COLOUR = 0x1ABC9C  # discord.Colour.teal()
+
+
+class WBSValidationError(ValueError):
+    """Raised when a WBS payload does not match the expected schema."""
+
+
+def _truncate(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[: limit - 1] + "…"
+
+
+def _optional_str(value: Any, path: str, errors: List[str], default: str) -> str:
+    if value is None:
+        return default
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    if not isinstance(value, str):
+        errors.append(f"{path} must be a string")
+        return default
+    return value.strip() or default
+
+
+def validate_wbs(payload: Any) -> Dict[str, Any]:
+    """Validate a WBS payload and return a normalised copy.
+
+    The schema is ``{"project": str, "phases": [{"name": str, "tasks":
+    [{"name": str, "owner": str, "due": str}]}]}``; every string is optional and
+    falls back to the same defaults the renderer has always used.
+    """
+    errors: List[str] = []
+    if not isinstance(payload, dict):
+        raise WBSValidationError("WBS payload must be a JSON object")
+    project = _optional_str(payload.get("project"), "project", errors, "Project")
+    phases_raw = payload.get("phases", [])
+    if not isinstance(phases_raw, list):
+        raise WBSValidationError("phases must be a list")
+    phases: List[Dict[str, Any]] = []
+    for phase_index, phase in enumerate(phases_raw):
+        phase_path = f"phases[{phase_index}]"
+        if not isinstance(phase, dict):
+            errors.append(f"{phase_path} must be an object")
+            continue
+        tasks_raw = phase.get("tasks", [])
+        if not isinstance(tasks_raw, list):
+            errors.append(f"{phase_path}.tasks must be a list")
+            tasks_raw = []
+        tasks: List[Dict[str, str]] = []
+        for task_index, task in enumerate(tasks_raw):
+            task_path = f"{phase_path}.tasks[{task_index}]"
+            if not isinstance(task, dict):
+                errors.append(f"{task_path} must be an object")
+                continue
+            tasks.append(
+                {
+                    "name": _optional_str(task.get("name"), f"{task_path}.name", errors, "Task"),
+                    "owner": _optional_str(task.get("owner"), f"{task_path}.owner", errors, "Unassigned"),
+                    "due": _optional_str(task.get("due"), f"{task_path}.due", errors, "TBD"),
+                }
+            )
+        phases.append(
+            {
+                "name": _optional_str(phase.get("name"), f"{phase_path}.name", errors, "Phase"),
+                "tasks": tasks,
+            }
+        )
+    if errors:
+        more = f" (+{len(errors) - 5} more)" if len(errors) > 5 else ""
+        raise WBSValidationError("; ".join(errors[:5]) + more)
+    return {"project": project, "phases": phases}
+
+
+def _embed_size(embed: Dict[str, Any]) -> int:
+    size = len(embed.get("title", "")) + len(embed.get("description", ""))
+    size += len(embed.get("footer", {}).get("text", ""))
+    for item in embed.get("fields", []):
+        size += len(item["name"]) + len(item["value"])
+    return size
+
+
+def _phase_fields(phase: Dict[str, Any]) -> List[Dict[str, Any]]:
+    lines = [
+        _truncate(f"• **{task['name']}** — {task['owner']} _(due {task['due']})_", EMBED_FIELD_VALUE_LIMIT)
+        for task in phase["tasks"]
+    ]
+    if not lines:
+        lines = ["No tasks defined."]
+    chunks: List[str] = []
+    current = ""
+    for line in lines:
+        candidate = f"{current}\n{line}" if current else line
+        if len(candidate) > EMBED_FIELD_VALUE_LIMIT:
+            chunks.append(current)
+            candidate = line
+        current = candidate
+    chunks.append(current)
+    name = phase["name"]
+    return [
+        {
+            "name": _truncate(name if index == 0 else f"{name} (cont.)", EMBED_FIELD_NAME_LIMIT),
+            "value": chunk,
+            "inline": False,
+        }
+        for index, chunk in enumerate(chunks)
+    ]
+
+
+def render_wbs_pages(payload: Dict[str, Any]) -> List[List[Dict[str, Any]]]:
+    """Render a validated WBS into messages of embed dictionaries.
+
+    Each embed stays within Discord's per-embed limits and each message holds
+    at most ten embeds whose combined size fits the 6000 character budget.
+    Oversized structures spill into continuation embeds and follow-up messages.
+    """
+    title = _truncate(f"WBS – {payload['project']}", EMBED_TITLE_LIMIT)
+    footer_reserve = 32  # "Page NN/NN" added once the page count is known
+    embeds: List[Dict[str, Any]] = []
+    current: Dict[str, Any] = {"title": title, "color": WBS_COLOUR, "fields": []}
+    for phase in payload["phases"]:
+        for item in _phase_fields(phase):
+            field_size = len(item["name"]) + len(item["value"])
+            if current["fields"] and (
+                len(current["fields"]) >= EMBED_MAX_FIELDS
+                or _embed_size(current) + field_size + footer_reserve > EMBED_TOTAL_LIMIT
+            ):
+                embeds.append(current)
+                current = {"title": _truncate(f"{title} (cont.)", EMBED_TITLE_LIMIT), "color": WBS_COLOUR, "fields": []}
+            current["fields"].append(item)
+    embeds.append(current)
+
+    if len(embeds) > 1:
+        for index, embed in enumerate(embeds, start=1):
+            embed["footer"] = {"text": f"Page {index}/{len(embeds)}"}
+
+    messages: List[List[Dict[str, Any]]] = []
+    batch: List[Dict[str, Any]] = []
+    batch_size = 0
+    for embed in embeds:
+        size = _embed_size(embed)
+        if batch and (len(batch) >= MESSAGE_MAX_EMBEDS or batch_size + size > EMBED_TOTAL_LIMIT):
+            messages.append(batch)
+            batch, batch_size = [], 0
+        batch.append(embed)
+        batch_size += size
+    messages.append(batch)
+    return messages
+
+
+@dataclass
+class WBSTemplate:
+    name: str
+    path: Path
+    mtime_ns: int
+    payload: Optional[Dict[str, Any]] = None
+    pages: List[List[Dict[str, Any]]] = field(default_factory=list)
+    error: Optional[str] = None
+
+
+class WBSTemplateRegistry:
+    """Index of validated, pre-rendered templates keyed by file mtime.
+
+    Templates are parsed, validated and rendered once in a worker thread and
+    re-read only when the file's modification time changes, so ``/wbs`` never
+    touches the disk on the event loop.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        self._directory = directory
+        self._templates: Dict[str, WBSTemplate] = {}
+
+    async def load_all(self) -> None:
+        await asyncio.to_thread(self._scan)
+        valid = sum(1 for template in self._templates.values() if template.error is None)
+        logger.info("Loaded %s WBS template(s) from %s", valid, self._directory)
+
+    def names(self) -> List[str]:
+        return sorted(name for name, template in self._templates.items() if template.error is None)
+
+    def search(self, current: str, limit: int = 25) -> List[str]:
+        needle = current.lower()
+        return [name for name in self.names() if needle in name.lower()][:limit]
+
+    async def get(self, name: str) -> Optional[WBSTemplate]:
+        template = self._templates.get(name)
+        if template is None:
+            await asyncio.to_thread(self._scan)
+            return self._templates.get(name)
+        return await asyncio.to_thread(self._refresh, template)
+
+    def _scan(self) -> None:
+        # Runs in a worker thread: build a new mapping and swap it in with one
+        # assignment so ``names()`` on the event loop never sees it change size.
+        current = self._templates
+        templates: Dict[str, WBSTemplate] = {}
+        for path in sorted(self._directory.glob("*.json")):
+            template = current.get(path.stem)
+            loaded = self._load(path) if template is None else self._reload(template)
+            if loaded is not None:
+                templates[path.stem] = loaded
+        self._templates = templates
+
+    def _refresh(self, template: WBSTemplate) -> Optional[WBSTemplate]:
+        refreshed = self._reload(template)
+        if refreshed is not template:
+            templates = dict(self._templates)
+            if refreshed is None:
+                templates.pop(template.name, None)
+            else:
+                templates[refreshed.name] = refreshed
+            self._templates = templates
+        return refreshed
+
+    def _reload(self, template: WBSTemplate) -> Optional[WBSTemplate]:
+        """Return ``template``, a re-read copy if its file changed, or None if the file is gone."""
+        try:
+            mtime_ns = template.path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+        if mtime_ns != template.mtime_ns:
+            return self._load(template.path)
+        return template
+
+    def _load(self, path: Path) -> WBSTemplate:
+        mtime_ns = path.stat().st_mtime_ns
+        template = WBSTemplate(name=path.stem, path=path, mtime_ns=mtime_ns)
+        try:
+            template.payload = validate_wbs(json.loads(path.read_text(encoding="utf-8")))
+            template.pages = render_wbs_pages(template.payload)
+        except (OSError, json.JSONDecodeError, WBSValidationError) as exc:
+            template.error = str(exc)
+            logger.warning("Skipping invalid WBS template %s: %s", path.name, exc)
+        return template
@@ -0,0 +1,225 @@
+"""Pooled, batched posting through the webhooks recorded in ``server_state.json``.
+
+The provisioning script stores webhook URLs per channel under ``webhooks``.
+``WebhookPool`` posts broadcast embeds through those URLs instead of the bot's
+own channel-message route, so bursts do not compete with interaction replies
+for the channel's rate limit.
+
+Posts are queued per destination. Each lane lingers briefly so a burst lands in
+one message of up to 10 embeds (capped at Discord's 6000-character total), and
+every webhook spends tokens from its own bucket. Channels without a webhook, or
+whose webhook was deleted, fall back to ``channel.send`` with the same batching.
+
+The same module ships with both bots (separate Docker build contexts).
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Set
+
+import aiohttp
+import discord
+
+logger = logging.getLogger(__name__)
+
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_CHARS_PER_MESSAGE = 6000
+# Discord allows roughly 5 requests per 2 seconds per webhook.
+WEBHOOK_BURST = 5
+WEBHOOK_PER_SECONDS = 2.0
+DEFAULT_LINGER = 0.5
+# How long callers wait to confirm a post before telling the user it is still queued.
+DEFAULT_CONFIRM_TIMEOUT = 10.0
+
+
+class _TokenBucket:
+    def __init__(self, capacity: int, per_seconds: float) -> None:
+        self.capacity = capacity
+        self.rate = capacity / per_seconds
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    async def acquire(self) -> None:
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+@dataclass
+class _Post:
+    channel: discord.abc.Messageable
+    embed: discord.Embed
+    username: Optional[str]
+    future: "asyncio.Future[None]" = field(repr=False)
+
+
+class _Lane:
+    """Queue and sender task for one destination (a webhook or a channel)."""
+
+    def __init__(self, webhook: Optional[discord.Webhook]) -> None:
+        self.webhook = webhook
+        self.bucket = _TokenBucket(WEBHOOK_BURST, WEBHOOK_PER_SECONDS) if webhook is not None else None
+        self.queue: Deque[_Post] = deque()
+        self.task: Optional[asyncio.Task[None]] = None
+
+
+class WebhookPool:
+    def __init__(self, webhook_urls: Dict[int, str], *, linger: float = DEFAULT_LINGER) -> None:
+        self.webhook_urls = dict(webhook_urls)
+        self.linger = linger
+        self.messages_sent = 0
+        self.embeds_sent = 0
+        self.fallbacks = 0
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._lanes: Dict[Any, _Lane] = {}
+        self._dead: Set[int] = set()
+
+    @classmethod
+    def from_state(cls, path: Optional[Path], *, linger: float = DEFAULT_LINGER) -> "WebhookPool":
+        """Map channel IDs to the first webhook URL recorded for each channel."""
+        urls: Dict[int, str] = {}
+        if path is not None and path.exists():
+            try:
+                state = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, json.JSONDecodeError):
+                logger.warning("Unable to read webhook URLs from %s", path)
+                state = {}
+            # channels are recorded per category: {category: {channel name: id}}
+            channels: Dict[str, int] = {}
+            for by_name in (state.get("channels") or {}).values():
+                if isinstance(by_name, dict):
+                    channels.update(by_name)
+            for channel_name, hooks in (state.get("webhooks") or {}).items():
+                channel_id = channels.get(channel_name)
+                if channel_id and isinstance(hooks, dict) and hooks:
+                    urls[int(channel_id)] = next(iter(hooks.values()))
+        return cls(urls, linger=linger)
+
+    def has_webhook(self, channel_id: int) -> bool:
+        return channel_id in self.webhook_urls and channel_id not in self._dead
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "webhooks": len(self.webhook_urls) - len(self._dead),
+            "queued": sum(len(lane.queue) for lane in self._lanes.values()),
+            "messages": self.messages_sent,
+            "embeds": self.embeds_sent,
+            "fallbacks": self.fallbacks,
+        }
+
+    def post(
+        self,
+        channel: discord.abc.Messageable,
+        embed: discord.Embed,
+        *,
+        username: Optional[str] = None,
+    ) -> "asyncio.Future[None]":
+        """Queue ``embed`` for ``channel``; the returned future resolves once it has been sent."""
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[None] = loop.create_future()
+        future.add_done_callback(_log_failure)
+        channel_id = getattr(channel, "id", 0)
+        if self.has_webhook(channel_id):
+            key: Any = ("webhook", channel_id)
+            lane = self._lanes.get(key)
+            if lane is None:
+                if self._session is None:
+                    self._session = aiohttp.ClientSession()
+                webhook = discord.Webhook.from_url(self.webhook_urls[channel_id], session=self._session)
+                lane = self._lanes[key] = _Lane(webhook)
+        else:
+            key = ("channel", channel_id)
+            lane = self._lanes.setdefault(key, _Lane(None))
+        lane.queue.append(_Post(channel, embed, username, future))
+        if lane.task is None or lane.task.done():
+            lane.task = asyncio.create_task(self._drain(lane))
+        return future
+
+    async def _drain(self, lane: _Lane) -> None:
+        while lane.queue:
+            await asyncio.sleep(self.linger)
+            while lane.queue:
+                batch = self._take_batch(lane.queue)
+                await self._send(lane, batch)
+
+    @staticmethod
+    def _take_batch(queue: Deque[_Post]) -> List[_Post]:
+        batch = [queue.popleft()]
+        size = len(batch[0].embed)
+        while queue and len(batch) < MAX_EMBEDS_PER_MESSAGE:
+            candidate = queue[0]
+            if candidate.username != batch[0].username or size + len(candidate.embed) > MAX_EMBED_CHARS_PER_MESSAGE:
+                break
+            size += len(candidate.embed)
+            batch.append(queue.popleft())
+        return batch
+
+    async def _send(self, lane: _Lane, batch: List[_Post]) -> None:
+        embeds = [post.embed for post in batch]
+        try:
+            if lane.webhook is not None and lane.bucket is not None:
+                await lane.bucket.acquire()
+                try:
+                    await lane.webhook.send(embeds=embeds, username=batch[0].username or discord.utils.MISSING)
+                except (discord.NotFound, discord.Forbidden):
+                    channel_id = getattr(batch[0].channel, "id", 0)
+                    logger.warning("Webhook for channel %s is gone; falling back to channel messages", channel_id)
+                    self._dead.add(channel_id)
+                    lane.webhook = None
+                    lane.bucket = None
+                    await batch[0].channel.send(embeds=embeds)
+                    self.fallbacks += 1
+            else:
+                await batch[0].channel.send(embeds=embeds)
+                self.fallbacks += 1
+        except Exception as exc:
+            for post in batch:
+                if not post.future.done():
+                    post.future.set_exception(exc)
+            return
+        self.messages_sent += 1
+        self.embeds_sent += len(batch)
+        for post in batch:
+            if not post.future.done():
+                post.future.set_result(None)
+
+    async def flush(self) -> None:
+        """Wait for every queued post to be sent."""
+        tasks = [lane.task for lane in self._lanes.values() if lane.task is not None and not lane.task.done()]
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def close(self) -> None:
+        await self.flush()
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+async def wait_posted(future: "asyncio.Future[None]", timeout: float = DEFAULT_CONFIRM_TIMEOUT) -> bool:
+    """Wait for a post returned by ``WebhookPool.post``.
+
+    Returns True once it is sent and False if it is still queued after
+    ``timeout``; a failed send re-raises its error so callers can fall back.
+    """
+    try:
+        await asyncio.wait_for(asyncio.shield(future), timeout)
+    except asyncio.TimeoutError:
+        return False
+    return True
+
+
+def _log_failure(future: "asyncio.Future[None]") -> None:
+    if not future.cancelled() and future.exception() is not None:
+        logger.warning("Queued post failed: %s", future.exception())
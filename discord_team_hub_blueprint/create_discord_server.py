@@ -6,306 +6,1267 @@ artifacts and identifiers are persisted in ``server_state.json`` so the
 configuration can be referenced by downstream automation (for example the ops
 and AI bots).
 
+The specification is compiled and validated up front by ``spec_compiler.py``
+(permission names, overwrite roles, channel types, includes and channel
+templates), so a broken blueprint fails before any change is made.
+
+``server_state.json`` is also read back on the next run: objects are matched by
+their recorded IDs before falling back to names, so a channel or role renamed in
+Discord is renamed back instead of duplicated. The file is rewritten atomically
+after every applied change, so an interrupted run resumes where it stopped.
+
+Every run has two phases. The *plan* phase reads the current guild state once
+and computes a structural diff against the specification; the *apply* phase
+issues only the API calls needed to converge, so a no-op reconcile makes no
+write requests at all.
+
 Usage
 -----
 ```
-python create_discord_server.py
+python create_discord_server.py          # print the plan, then apply it
+python create_discord_server.py --plan   # print the plan only
+python create_discord_server.py --guild 123 --guild 456   # batch provision
+python create_discord_server.py --rest --plan             # REST only, no gateway
 ```
 The script uses the following environment variables:
 ``DISCORD_BOT_TOKEN`` – token for a provisioning bot with administrator access.
 ``DISCORD_GUILD_ID`` – numeric guild identifier to configure.
+``DISCORD_GUILD_IDS`` – optional comma-separated guild identifiers for batch
+runs; each guild gets its own ``state/server_state.<guild id>.json``.
+``PROVISION_REST_ONLY`` – set to ``1`` to default to ``--rest``.
 
 The provisioning bot can be disabled after the server has been created.
 """
 from __future__ import annotations
 
+import argparse
 import asyncio
 import json
 import os
-from dataclasses import dataclass
+import re
+import time
+from dataclasses import dataclass, field, replace
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Mapping, MutableMapping, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, MutableMapping, Optional, Set, Tuple
 
 import discord
 
+from spec_compiler import (
+    SPEC_PATH,
+    CategorySpec,
+    ChannelSpec,
+    CompiledSpec,
+    OverwriteState,
+    RoleSpec,
+    WebhookSpec,
+    channel_type_for,
+    compile_spec,
+)
+
 ROOT = Path(__file__).resolve().parent
-SPEC_PATH = ROOT / "server_spec.json"
 STATE_PATH = ROOT / "server_state.json"
+BATCH_STATE_DIR = ROOT / "state"
+DEFAULT_CONCURRENCY = 8
+DEFAULT_ROUTE_CONCURRENCY = 2
+DEFAULT_REQUESTS_PER_SECOND = 40.0
+DEFAULT_GUILD_CONCURRENCY = 3
 
 
-@dataclass
-class RoleSpec:
-    """Data class describing a role defined in the specification."""
+def load_spec(path: Path = SPEC_PATH) -> CompiledSpec:
+    """Validate and compile the blueprint before any API call is made."""
+    return compile_spec(path)
 
-    name: str
-    colour: str
-    hoist: bool
-    mentionable: bool
-    permissions: Mapping[str, bool]
-
-    def to_kwargs(self) -> Dict[str, Any]:
-        colour_value = int(self.colour.lstrip("#"), 16)
-        return {
-            "name": self.name,
-            "colour": discord.Colour(colour_value),
-            "hoist": self.hoist,
-            "mentionable": self.mentionable,
-            "permissions": discord.Permissions(**self.permissions),
-        }
+
+def permission_overwrite_from_spec(
+    overwrite_spec: OverwriteState,
+    guild: discord.Guild,
+    roles: Mapping[str, discord.Role],
+) -> Dict[discord.abc.Snowflake, discord.PermissionOverwrite]:
+    """Build live overwrites from the compiled ``{target name: (allow, deny)}`` bitfields."""
+    overwrites: Dict[discord.abc.Snowflake, discord.PermissionOverwrite] = {}
+    for target_name, (allow, deny) in overwrite_spec.items():
+        target: discord.abc.Snowflake
+        if target_name == "@everyone":
+            target = guild.default_role
+        else:
+            role = roles.get(target_name)
+            if role is None:
+                raise ValueError(f"Role '{target_name}' referenced in overwrites does not exist yet.")
+            target = role
+        overwrites[target] = discord.PermissionOverwrite.from_pair(discord.Permissions(allow), discord.Permissions(deny))
+    return overwrites
+
+
+def normalize_channel_overwrites(channel: discord.abc.GuildChannel, role_names: Mapping[int, str]) -> OverwriteState:
+    """Reduce a channel's live overwrites to the same shape as the specification."""
+    normalized: OverwriteState = {}
+    for target, overwrite in channel.overwrites.items():
+        if target.id == channel.guild.id:
+            key = "@everyone"
+        elif target.id in role_names:
+            key = role_names[target.id]
+        else:
+            key = f"member:{target.id}"
+        allow, deny = overwrite.pair()
+        normalized[key] = (allow.value, deny.value)
+    return normalized
 
 
 @dataclass
-class ChannelSpec:
+class Change:
+    """One planned reconciliation step for a blueprint object.
+
+    ``action`` is ``create``, ``update`` or ``noop``; ``diff`` maps each drifted
+    attribute to its ``(current, desired)`` values for updates.
+    """
+
+    action: str
+    kind: str
     name: str
-    type: str
-    topic: Optional[str] = None
-    slowmode_delay: Optional[int] = None
-    bitrate: Optional[int] = None
-    user_limit: Optional[int] = None
-    overwrites: Optional[Mapping[str, Mapping[str, Iterable[str]]]] = None
+    spec: Any
+    parent: Optional[str] = None
+    target: Any = None
+    diff: Dict[str, Tuple[Any, Any]] = field(default_factory=dict)
+    note: Optional[str] = None
+
+    @property
+    def label(self) -> str:
+        if self.kind == "channel":
+            return f"channel {self.parent}/#{self.name}"
+        if self.kind == "webhook":
+            return f"webhook #{self.parent}/{self.name}"
+        if self.kind == "positions":
+            return "channel positions"
+        return f"{self.kind} {self.name}"
+
+
+class GuildSnapshot:
+    """Name and ID indexes over a guild's roles, channels and webhooks.
+
+    Built in one pass over the guild caches and kept current as the provisioner
+    creates objects, so every lookup during planning and applying is a dict hit
+    instead of a scan. Gateway runs index the cached guild; REST-only runs pass
+    the channels fetched over HTTP. Webhooks are fetched at most once per channel. When names
+    collide the first object in cache order wins, matching ``discord.utils.get``.
+    """
+
+    def __init__(
+        self,
+        guild: discord.Guild,
+        channels: Optional[List[discord.abc.GuildChannel]] = None,
+    ) -> None:
+        self.guild = guild
+        self.roles_by_id: Dict[int, discord.Role] = {}
+        self.roles_by_name: Dict[str, discord.Role] = {}
+        self.channels_by_id: Dict[int, discord.abc.GuildChannel] = {}
+        self.categories_by_name: Dict[str, discord.CategoryChannel] = {}
+        self.channels_by_key: Dict[Tuple[Optional[int], str, discord.ChannelType], discord.abc.GuildChannel] = {}
+        self._webhooks: Dict[int, List[discord.Webhook]] = {}
+        self.fetches = 0
+        for role in guild.roles:
+            self.add_role(role)
+        for channel in guild.channels if channels is None else channels:
+            self.add_channel(channel)
+
+    @classmethod
+    async def fetch(cls, guild: discord.Guild) -> "GuildSnapshot":
+        """Index a guild obtained over REST, fetching its channels in one call.
+
+        ``Client.fetch_guild`` already carries the role list, so REST-only runs
+        need exactly two reads before planning.
+        """
+        snapshot = cls(guild, channels=list(await guild.fetch_channels()))
+        snapshot.fetches += 1
+        return snapshot
+
+    def add_role(self, role: discord.Role) -> None:
+        self.roles_by_id[role.id] = role
+        self.roles_by_name.setdefault(role.name, role)
+
+    def add_channel(self, channel: discord.abc.GuildChannel) -> None:
+        self.channels_by_id[channel.id] = channel
+        if channel.type == discord.ChannelType.category:
+            self.categories_by_name.setdefault(channel.name, channel)  # type: ignore[arg-type]
+            return
+        key = (getattr(channel, "category_id", None), channel.name, channel.type)
+        self.channels_by_key.setdefault(key, channel)
+
+    def role_names(self) -> Dict[int, str]:
+        return {role_id: role.name for role_id, role in self.roles_by_id.items()}
+
+    def role(self, name: str) -> Optional[discord.Role]:
+        return self.roles_by_name.get(name)
+
+    def category(self, name: str) -> Optional[discord.CategoryChannel]:
+        return self.categories_by_name.get(name)
+
+    def channel(self, category_id: Optional[int], spec: ChannelSpec) -> Optional[discord.abc.GuildChannel]:
+        return self.channels_by_key.get((category_id, spec.name, channel_type_for(spec)))
+
+    async def webhooks(self, channel: discord.TextChannel) -> List[discord.Webhook]:
+        cached = self._webhooks.get(channel.id)
+        if cached is None:
+            self.fetches += 1
+            cached = list(await channel.webhooks())
+            self._webhooks[channel.id] = cached
+        return cached
+
+    def add_webhook(self, channel_id: int, webhook: discord.Webhook) -> None:
+        self._webhooks.setdefault(channel_id, []).append(webhook)
 
 
 @dataclass
-class CategorySpec:
-    name: str
-    channels: List[ChannelSpec]
+class Plan:
+    changes: List[Change]
+    snapshot: Optional[GuildSnapshot] = None
 
+    def pending(self) -> List[Change]:
+        return [change for change in self.changes if change.action != "noop"]
 
-def load_spec() -> Dict[str, Any]:
-    with SPEC_PATH.open("r", encoding="utf-8") as handle:
-        return json.load(handle)
+    def render(self) -> str:
+        symbols = {"create": "+", "update": "~"}
+        lines: List[str] = []
+        for change in self.pending():
+            lines.append(f"  {symbols[change.action]} {change.label}")
+            if change.note:
+                lines.append(f"      # {change.note}")
+            for attribute, (current, desired) in change.diff.items():
+                lines.append(f"      {attribute}: {current!r} -> {desired!r}")
+        creates = sum(1 for change in self.changes if change.action == "create")
+        updates = sum(1 for change in self.changes if change.action == "update")
+        unchanged = sum(1 for change in self.changes if change.action == "noop")
+        if not lines:
+            lines.append("  No changes. The guild matches the blueprint.")
+        lines.append(f"Plan: {creates} to add, {updates} to change, {unchanged} unchanged.")
+        return "\n".join(lines)
 
 
-def build_role_specs(data: Iterable[Mapping[str, Any]]) -> List[RoleSpec]:
-    return [RoleSpec(**item) for item in data]
+def role_diff(spec: RoleSpec, role: discord.Role) -> Dict[str, Tuple[Any, Any]]:
+    desired = spec.to_kwargs()
+    diff: Dict[str, Tuple[Any, Any]] = {}
+    if role.name != spec.name:
+        diff["name"] = (role.name, spec.name)
+    if role.colour.value != desired["colour"].value:
+        diff["colour"] = (str(role.colour), str(desired["colour"]))
+    if role.hoist != desired["hoist"]:
+        diff["hoist"] = (role.hoist, desired["hoist"])
+    if role.mentionable != desired["mentionable"]:
+        diff["mentionable"] = (role.mentionable, desired["mentionable"])
+    if role.permissions.value != desired["permissions"].value:
+        diff["permissions"] = (role.permissions.value, desired["permissions"].value)
+    return diff
 
 
-def build_category_specs(data: Iterable[Mapping[str, Any]]) -> List[CategorySpec]:
-    categories: List[CategorySpec] = []
-    for item in data:
-        channels = [ChannelSpec(**channel) for channel in item.get("channels", [])]
-        categories.append(CategorySpec(name=item["name"], channels=channels))
-    return categories
+def desired_channel_attributes(guild: discord.Guild, spec: ChannelSpec) -> Dict[str, Any]:
+    channel_type = spec.type.lower()
+    if channel_type == "text":
+        return {"topic": spec.topic or None, "slowmode_delay": spec.slowmode_delay or 0}
+    if channel_type == "voice":
+        return {"bitrate": int(spec.bitrate or guild.bitrate_limit), "user_limit": spec.user_limit or 0}
+    if channel_type == "stage":
+        # discord.py 2.x sets a stage topic only on a live stage instance, not on the channel.
+        return {}
+    raise ValueError(f"Unsupported channel type: {spec.type}")
 
 
-def permission_overwrite_from_spec(
-    overwrite_spec: Mapping[str, Mapping[str, Iterable[str]]],
+def channel_diff(
     guild: discord.Guild,
-    roles: Mapping[str, discord.Role],
-) -> Dict[discord.abc.Snowflake, discord.PermissionOverwrite]:
-    overwrites: Dict[discord.abc.Snowflake, discord.PermissionOverwrite] = {}
-    for target_name, perms in overwrite_spec.items():
-        target: discord.abc.Snowflake
-        if target_name == "@everyone":
-            target = guild.default_role
+    spec: ChannelSpec,
+    channel: discord.abc.GuildChannel,
+    role_names: Mapping[int, str],
+) -> Dict[str, Tuple[Any, Any]]:
+    diff: Dict[str, Tuple[Any, Any]] = {}
+    if channel.name != spec.name:
+        diff["name"] = (channel.name, spec.name)
+    for attribute, desired in desired_channel_attributes(guild, spec).items():
+        current = getattr(channel, attribute, None)
+        if attribute == "topic":
+            current = current or None
+        if current != desired:
+            diff[attribute] = (current, desired)
+    if spec.overwrites:
+        current_overwrites = normalize_channel_overwrites(channel, role_names)
+        if spec.overwrites != current_overwrites:
+            diff["overwrites"] = (current_overwrites, spec.overwrites)
+    return diff
+
+
+WEBHOOK_URL_ID = re.compile(r"/webhooks/(\d+)/")
+
+
+def empty_state(guild_id: Optional[int]) -> Dict[str, Any]:
+    return {"guild_id": guild_id, "roles": {}, "categories": {}, "channels": {}, "webhooks": {}}
+
+
+def load_state(path: Path, guild_id: int) -> Dict[str, Any]:
+    """Read the IDs recorded by a previous run, ignoring state for another guild."""
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return empty_state(guild_id)
+    if not isinstance(data, dict) or data.get("guild_id") not in (None, guild_id):
+        return empty_state(guild_id)
+    state = empty_state(guild_id)
+    for key in ("roles", "categories", "channels", "webhooks"):
+        if isinstance(data.get(key), dict):
+            state[key] = data[key]
+    return state
+
+
+def write_state_atomically(path: Path, payload: str) -> None:
+    """Replace ``path`` in one step so a crash never leaves a truncated state file."""
+    temporary = path.with_name(f".{path.name}.tmp")
+    with temporary.open("w", encoding="utf-8") as handle:
+        handle.write(payload)
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(temporary, path)
+
+
+class _Matcher:
+    """Resolve blueprint objects by recorded ID first, then by name.
+
+    Each guild object is claimed by at most one blueprint entry, so a stale name
+    match can never steal an object already adopted by its ID.
+    """
+
+    def __init__(self, snapshot: GuildSnapshot, state: Mapping[str, Any]) -> None:
+        self.snapshot = snapshot
+        self.state = state
+        self.claimed: Set[int] = set()
+
+    def _recorded_id(self, *path: str) -> Optional[int]:
+        value: Any = self.state
+        for key in path:
+            if not isinstance(value, Mapping):
+                return None
+            value = value.get(key)
+        if isinstance(value, str):
+            match = WEBHOOK_URL_ID.search(value)
+            value = match.group(1) if match else value
+        try:
+            return int(value) if value is not None else None
+        except (TypeError, ValueError):
+            return None
+
+    def _claim(self, found: Any) -> Any:
+        if found is None or found.id in self.claimed:
+            return None
+        self.claimed.add(found.id)
+        return found
+
+    def _missing_note(self, recorded_id: Optional[int]) -> Optional[str]:
+        if recorded_id is None:
+            return None
+        return f"recorded id {recorded_id} no longer exists; recreating"
+
+    def role(self, spec: RoleSpec) -> Tuple[Optional[discord.Role], Optional[str]]:
+        recorded_id = self._recorded_id("roles", spec.name)
+        role = self._claim(self.snapshot.roles_by_id.get(recorded_id)) if recorded_id else None
+        if role is None:
+            role = self._claim(self.snapshot.role(spec.name))
+        return role, None if role is not None else self._missing_note(recorded_id)
+
+    def category(self, spec: CategorySpec) -> Tuple[Optional[discord.CategoryChannel], Optional[str]]:
+        recorded_id = self._recorded_id("categories", spec.name)
+        found = self.snapshot.channels_by_id.get(recorded_id) if recorded_id else None
+        category = self._claim(found) if found is not None and found.type == discord.ChannelType.category else None
+        if category is None:
+            category = self._claim(self.snapshot.category(spec.name))
+        return category, None if category is not None else self._missing_note(recorded_id)
+
+    def channel(
+        self,
+        category_name: str,
+        category: Optional[discord.CategoryChannel],
+        spec: ChannelSpec,
+    ) -> Tuple[Optional[discord.abc.GuildChannel], Optional[str]]:
+        recorded_id = self._recorded_id("channels", category_name, spec.name)
+        found = self.snapshot.channels_by_id.get(recorded_id) if recorded_id else None
+        channel = self._claim(found) if found is not None and found.type == channel_type_for(spec) else None
+        if channel is None and category is not None:
+            channel = self._claim(self.snapshot.channel(category.id, spec))
+        return channel, None if channel is not None else self._missing_note(recorded_id)
+
+    async def webhook(
+        self, channel: Optional[discord.TextChannel], spec: WebhookSpec
+    ) -> Tuple[Optional[discord.Webhook], Optional[str]]:
+        recorded_id = self._recorded_id("webhooks", spec.channel, spec.name)
+        if channel is None:
+            return None, self._missing_note(recorded_id)
+        webhooks = await self.snapshot.webhooks(channel)
+        webhook = self._claim(discord.utils.get(webhooks, id=recorded_id)) if recorded_id else None
+        if webhook is None:
+            webhook = self._claim(discord.utils.get(webhooks, name=spec.name))
+        return webhook, None if webhook is not None else self._missing_note(recorded_id)
+
+
+VOICE_SORT_TYPES = {discord.ChannelType.voice, discord.ChannelType.stage_voice}
+
+
+def _position_slots(objects: List[Any]) -> List[int]:
+    """Reuse the positions the objects already occupy, so unmanaged neighbours keep their place."""
+    slots = sorted(getattr(obj, "position", 0) for obj in objects)
+    if len(set(slots)) != len(slots):
+        start = slots[0] if slots else 0
+        slots = list(range(start, start + len(slots)))
+    return slots
+
+
+def plan_positions(
+    category_specs: List[CategorySpec],
+    categories: Mapping[str, discord.CategoryChannel],
+    channels: Mapping[str, Mapping[str, discord.abc.GuildChannel]],
+) -> Tuple[Dict[str, Tuple[Any, Any]], List[Dict[str, Any]]]:
+    """Compare live ordering with the spec and build one bulk position payload.
+
+    Categories are ordered among themselves and channels within each category
+    (text-like and voice-like channels sort separately in Discord). Only groups
+    whose order differs are sent; channels that belong in another category
+    carry a ``parent_id`` so the move rides the same request.
+    """
+    diff: Dict[str, Tuple[Any, Any]] = {}
+    payload: List[Dict[str, Any]] = []
+    live_categories = [categories[spec.name] for spec in category_specs if spec.name in categories]
+    current = [category.name for category in sorted(live_categories, key=lambda item: (item.position, item.id))]
+    desired = [category.name for category in live_categories]
+    if current != desired:
+        diff["categories"] = (current, desired)
+        for category, position in zip(live_categories, _position_slots(live_categories)):
+            payload.append({"id": category.id, "position": position})
+
+    for category_spec in category_specs:
+        category = categories.get(category_spec.name)
+        category_channels = channels.get(category_spec.name, {})
+        if category is None:
+            continue
+        for voice_group in (False, True):
+            group = [
+                category_channels[spec.name]
+                for spec in category_spec.channels
+                if spec.name in category_channels and (channel_type_for(spec) in VOICE_SORT_TYPES) == voice_group
+            ]
+            moved = {channel.id for channel in group if getattr(channel, "category_id", None) != category.id}
+            current = [channel.name for channel in sorted(group, key=lambda item: (item.position, item.id))]
+            desired = [channel.name for channel in group]
+            if current == desired and not moved:
+                continue
+            diff[f"{category_spec.name}{' (voice)' if voice_group else ''}"] = (current, desired)
+            in_place = [channel for channel in group if channel.id not in moved]
+            slots = _position_slots(in_place) if len(in_place) == len(group) else list(range(len(group)))
+            for channel, position in zip(group, slots):
+                entry: Dict[str, Any] = {"id": channel.id, "position": position}
+                if channel.id in moved:
+                    entry["parent_id"] = category.id
+                    entry["lock_permissions"] = False
+                payload.append(entry)
+    return diff, payload
+
+
+async def bulk_update_positions(guild: discord.Guild, payload: List[Dict[str, Any]]) -> None:
+    """Reorder (and re-parent) many channels with one ``PATCH /guilds/{id}/channels``."""
+    await guild._state.http.bulk_channel_update(guild.id, payload, reason="Reconciling blueprint channel order")
+
+
+async def build_plan(
+    guild: discord.Guild,
+    role_specs: List[RoleSpec],
+    category_specs: List[CategorySpec],
+    webhook_specs: List[WebhookSpec],
+    snapshot: Optional[GuildSnapshot] = None,
+    state: Optional[Mapping[str, Any]] = None,
+) -> Plan:
+    """Compare the indexed guild state with the blueprint without writing anything.
+
+    ``state`` is the previous ``server_state.json``; objects it names are
+    matched by ID, so renames and moves made in Discord show up as drift.
+    """
+    snapshot = snapshot or GuildSnapshot(guild)
+    matcher = _Matcher(snapshot, state or {})
+    role_names = snapshot.role_names()
+    changes: List[Change] = []
+    for role_spec in role_specs:
+        role, note = matcher.role(role_spec)
+        if role is None:
+            changes.append(Change("create", "role", role_spec.name, role_spec, note=note))
+            continue
+        diff = role_diff(role_spec, role)
+        changes.append(Change("update" if diff else "noop", "role", role_spec.name, role_spec, target=role, diff=diff))
+
+    text_channels: Dict[str, Optional[discord.TextChannel]] = {}
+    live_categories: Dict[str, discord.CategoryChannel] = {}
+    live_channels: Dict[str, Dict[str, discord.abc.GuildChannel]] = {}
+    layout_pending = False
+    for category_spec in category_specs:
+        category, note = matcher.category(category_spec)
+        if category is None:
+            layout_pending = True
+            changes.append(Change("create", "category", category_spec.name, category_spec, note=note))
         else:
-            role = roles.get(target_name)
-            if role is None:
-                raise ValueError(f"Role '{target_name}' referenced in overwrites does not exist yet.")
-            target = role
-        allow = perms.get("allow", [])
-        deny = perms.get("deny", [])
-        overwrite_kwargs: Dict[str, Optional[bool]] = {}
-        for flag in allow:
-            overwrite_kwargs[flag] = True
-        for flag in deny:
-            overwrite_kwargs[flag] = False
-        overwrites[target] = discord.PermissionOverwrite(**overwrite_kwargs)
-    return overwrites
+            live_categories[category_spec.name] = category
+            diff = {"name": (category.name, category_spec.name)} if category.name != category_spec.name else {}
+            changes.append(
+                Change("update" if diff else "noop", "category", category_spec.name, category_spec, target=category, diff=diff)
+            )
+        for channel_spec in category_spec.channels:
+            channel, note = matcher.channel(category_spec.name, category, channel_spec)
+            if channel_spec.type.lower() == "text":
+                text_channels.setdefault(channel_spec.name, channel)  # type: ignore[arg-type]
+            if channel is None:
+                layout_pending = True
+                changes.append(
+                    Change("create", "channel", channel_spec.name, channel_spec, parent=category_spec.name, note=note)
+                )
+                continue
+            live_channels.setdefault(category_spec.name, {})[channel_spec.name] = channel
+            diff = channel_diff(guild, channel_spec, channel, role_names)
+            current_category_id = getattr(channel, "category_id", None)
+            if category is None or current_category_id != category.id:
+                current_category = snapshot.channels_by_id.get(current_category_id) if current_category_id else None
+                diff["category"] = (getattr(current_category, "name", None), category_spec.name)
+            changes.append(
+                Change(
+                    "update" if diff else "noop",
+                    "channel",
+                    channel_spec.name,
+                    channel_spec,
+                    parent=category_spec.name,
+                    target=channel,
+                    diff=diff,
+                )
+            )
+
+    for webhook_spec in webhook_specs:
+        if webhook_spec.channel not in text_channels:
+            raise RuntimeError(
+                f"Cannot create webhook '{webhook_spec.name}' because channel '{webhook_spec.channel}' was not found"
+            )
+        existing, note = await matcher.webhook(text_channels[webhook_spec.channel], webhook_spec)
+        if existing is None:
+            changes.append(Change("create", "webhook", webhook_spec.name, webhook_spec, parent=webhook_spec.channel, note=note))
+            continue
+        diff = {"name": (existing.name, webhook_spec.name)} if existing.name != webhook_spec.name else {}
+        changes.append(
+            Change(
+                "update" if diff else "noop",
+                "webhook",
+                webhook_spec.name,
+                webhook_spec,
+                parent=webhook_spec.channel,
+                target=existing,
+                diff=diff,
+            )
+        )
+
+    position_diff, _ = plan_positions(category_specs, live_categories, live_channels)
+    if position_diff or layout_pending:
+        note = "order is re-checked once new categories and channels exist" if layout_pending else None
+        changes.append(Change("update", "positions", "channel positions", category_specs, diff=position_diff, note=note))
+    else:
+        changes.append(Change("noop", "positions", "channel positions", category_specs))
+    return Plan(changes, snapshot)
+
+
+@dataclass
+class ApplyContext:
+    """Objects resolved while applying a plan, keyed the way later steps look them up."""
+
+    roles: Dict[str, discord.Role] = field(default_factory=dict)
+    categories: Dict[str, discord.CategoryChannel] = field(default_factory=dict)
+    channels: Dict[str, Dict[str, discord.abc.GuildChannel]] = field(default_factory=dict)
+    text_channels: Dict[str, discord.TextChannel] = field(default_factory=dict)
+    webhooks: Dict[str, Dict[str, str]] = field(default_factory=dict)
+
+
+class StateStore:
+    """``server_state.json`` kept in step with the apply phase.
+
+    Seeded with every object the plan already resolved, then updated as each
+    change lands and rewritten atomically, so an interrupted run leaves the IDs
+    of everything it created for the next run to adopt. Checkpoints requested
+    while a write is in progress coalesce into the next one.
+    """
+
+    def __init__(self, path: Path, guild_id: int) -> None:
+        self.path = path
+        self.state = empty_state(guild_id)
+        self._lock = asyncio.Lock()
+        self._dirty = False
+
+    @classmethod
+    def from_plan(cls, path: Path, guild_id: int, plan: Plan) -> "StateStore":
+        store = cls(path, guild_id)
+        for change in plan.changes:
+            if change.target is not None:
+                store.record(change, change.target)
+        return store
 
+    def record(self, change: Change, obj: Any) -> None:
+        if change.kind == "role":
+            self.state["roles"][change.name] = obj.id
+        elif change.kind == "category":
+            self.state["categories"][change.name] = obj.id
+        elif change.kind == "channel":
+            self.state["channels"].setdefault(change.parent, {})[change.name] = obj.id
+        elif change.kind == "webhook":
+            self.state["webhooks"].setdefault(change.parent, {})[change.name] = obj.url
+        self._dirty = True
 
-async def ensure_role(guild: discord.Guild, spec: RoleSpec) -> discord.Role:
-    existing = discord.utils.find(lambda r: r.name == spec.name, guild.roles)
+    async def checkpoint(self) -> None:
+        async with self._lock:
+            if not self._dirty:
+                return
+            self._dirty = False
+            payload = json.dumps(self.state, indent=2)
+            await asyncio.to_thread(write_state_atomically, self.path, payload)
+
+
+async def ensure_role(guild: discord.Guild, change: Change) -> discord.Role:
+    spec: RoleSpec = change.spec
     kwargs = spec.to_kwargs()
-    if existing is None:
+    if change.action == "create":
         return await guild.create_role(**kwargs, reason="Provisioning blueprint role")
-    await existing.edit(**kwargs, reason="Reconciling blueprint role")
-    return existing
+    role: discord.Role = change.target
+    if change.action == "update":
+        await role.edit(**{key: kwargs[key] for key in change.diff}, reason="Reconciling blueprint role")
+    return role
 
 
-async def ensure_category(guild: discord.Guild, name: str) -> discord.CategoryChannel:
-    existing = discord.utils.get(guild.categories, name=name)
-    if existing is None:
-        return await guild.create_category(name=name, reason="Provisioning blueprint category")
-    return existing
+async def ensure_category(guild: discord.Guild, change: Change) -> discord.CategoryChannel:
+    if change.action == "create":
+        return await guild.create_category(name=change.name, reason="Provisioning blueprint category")
+    if change.action == "update":
+        await change.target.edit(name=change.name, reason="Reconciling blueprint category")
+    return change.target
+
+
+def _channel_edit_kwargs(
+    change: Change,
+    category: discord.CategoryChannel,
+    overwrites: Optional[Dict[discord.abc.Snowflake, discord.PermissionOverwrite]],
+) -> Dict[str, Any]:
+    kwargs = {
+        attribute: desired
+        for attribute, (_, desired) in change.diff.items()
+        if attribute not in ("overwrites", "category")
+    }
+    if "overwrites" in change.diff:
+        kwargs["overwrites"] = overwrites
+    if "category" in change.diff:
+        kwargs["category"] = category
+    return kwargs
 
 
 async def ensure_text_channel(
     guild: discord.Guild,
     category: discord.CategoryChannel,
-    spec: ChannelSpec,
+    change: Change,
     overwrites: Optional[Dict[discord.abc.Snowflake, discord.PermissionOverwrite]],
 ) -> discord.TextChannel:
-    existing = discord.utils.get(category.text_channels, name=spec.name)
-    if existing is None:
-        channel = await category.create_text_channel(
+    spec: ChannelSpec = change.spec
+    if change.action == "create":
+        return await category.create_text_channel(
             spec.name,
             topic=spec.topic,
             slowmode_delay=spec.slowmode_delay,
-            overwrites=overwrites,
+            overwrites=overwrites or {},
             reason="Provisioning blueprint text channel",
         )
-        return channel
-    await existing.edit(
-        topic=spec.topic,
-        slowmode_delay=spec.slowmode_delay,
-        overwrites=overwrites,
-        reason="Reconciling blueprint text channel",
-    )
-    return existing
+    if change.action == "update":
+        await change.target.edit(**_channel_edit_kwargs(change, category, overwrites), reason="Reconciling blueprint text channel")
+    return change.target
 
 
 async def ensure_voice_channel(
     guild: discord.Guild,
     category: discord.CategoryChannel,
-    spec: ChannelSpec,
+    change: Change,
     overwrites: Optional[Dict[discord.abc.Snowflake, discord.PermissionOverwrite]],
 ) -> discord.VoiceChannel:
-    existing = discord.utils.get(category.voice_channels, name=spec.name)
-    bitrate = spec.bitrate or guild.bitrate_limit
-    if existing is None:
-        channel = await category.create_voice_channel(
+    spec: ChannelSpec = change.spec
+    if change.action == "create":
+        desired = desired_channel_attributes(guild, spec)
+        return await category.create_voice_channel(
             spec.name,
-            bitrate=bitrate,
-            user_limit=spec.user_limit or 0,
-            overwrites=overwrites,
+            bitrate=desired["bitrate"],
+            user_limit=desired["user_limit"],
+            overwrites=overwrites or {},
             reason="Provisioning blueprint voice channel",
         )
-        return channel
-    await existing.edit(
-        bitrate=bitrate,
-        user_limit=spec.user_limit or 0,
-        overwrites=overwrites,
-        reason="Reconciling blueprint voice channel",
-    )
-    return existing
+    if change.action == "update":
+        await change.target.edit(**_channel_edit_kwargs(change, category, overwrites), reason="Reconciling blueprint voice channel")
+    return change.target
 
 
 async def ensure_stage_channel(
     guild: discord.Guild,
     category: discord.CategoryChannel,
-    spec: ChannelSpec,
+    change: Change,
     overwrites: Optional[Dict[discord.abc.Snowflake, discord.PermissionOverwrite]],
 ) -> discord.StageChannel:
-    existing = discord.utils.get(category.channels, name=spec.name, type=discord.ChannelType.stage_voice)
-    if existing is None:
-        channel = await guild.create_stage_channel(
+    spec: ChannelSpec = change.spec
+    if change.action == "create":
+        return await guild.create_stage_channel(
             spec.name,
-            topic=spec.topic,
             category=category,
-            overwrites=overwrites,
+            overwrites=overwrites or {},
             reason="Provisioning blueprint stage channel",
         )
-        return channel
-    await existing.edit(
-        topic=spec.topic,
-        category=category,
-        overwrites=overwrites,
-        reason="Reconciling blueprint stage channel",
-    )
-    return existing
+    if change.action == "update":
+        await change.target.edit(**_channel_edit_kwargs(change, category, overwrites), reason="Reconciling blueprint stage channel")
+    return change.target
 
 
 async def ensure_channel(
     guild: discord.Guild,
     category: discord.CategoryChannel,
-    spec: ChannelSpec,
+    change: Change,
     roles: Mapping[str, discord.Role],
 ) -> discord.abc.GuildChannel:
-    overwrite_spec = spec.overwrites or {}
-    overwrites = permission_overwrite_from_spec(overwrite_spec, guild, roles) if overwrite_spec else None
+    spec: ChannelSpec = change.spec
+    overwrites: Optional[Dict[discord.abc.Snowflake, discord.PermissionOverwrite]] = None
+    if spec.overwrites and (change.action == "create" or "overwrites" in change.diff):
+        overwrites = permission_overwrite_from_spec(spec.overwrites, guild, roles)
     channel_type = spec.type.lower()
     if channel_type == "text":
-        return await ensure_text_channel(guild, category, spec, overwrites)
+        return await ensure_text_channel(guild, category, change, overwrites)
     if channel_type == "voice":
-        return await ensure_voice_channel(guild, category, spec, overwrites)
+        return await ensure_voice_channel(guild, category, change, overwrites)
     if channel_type == "stage":
-        return await ensure_stage_channel(guild, category, spec, overwrites)
+        return await ensure_stage_channel(guild, category, change, overwrites)
     raise ValueError(f"Unsupported channel type: {spec.type}")
 
 
-async def ensure_webhook(
-    channel: discord.TextChannel,
-    name: str,
-) -> discord.Webhook:
-    existing = discord.utils.get(await channel.webhooks(), name=name)
-    if existing is None:
-        return await channel.create_webhook(name=name, reason="Provisioning blueprint webhook")
-    return existing
+async def ensure_webhook(channel: discord.TextChannel, change: Change) -> discord.Webhook:
+    if change.action == "create":
+        return await channel.create_webhook(name=change.name, reason="Provisioning blueprint webhook")
+    if change.action == "update":
+        await change.target.edit(name=change.name, reason="Reconciling blueprint webhook")
+    return change.target
+
+
+class RateBudget:
+    """Global request-rate and per-route concurrency budget for provisioning calls.
+
+    Discord enforces a global limit per bot plus per-route buckets (all channel
+    creations in a guild share one bucket, edits are bucketed per channel).
+    discord.py waits out 429s on its own; the budget keeps the scheduler from
+    provoking them by refilling a global token bucket and capping how many calls
+    may be in flight on the same route.
+    """
+
+    def __init__(self, requests_per_second: float, route_concurrency: int) -> None:
+        self._interval = 1.0 / requests_per_second
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+        self._route_concurrency = route_concurrency
+        self._routes: Dict[str, asyncio.Semaphore] = {}
+
+    async def run(self, route: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        semaphore = self._routes.setdefault(route, asyncio.Semaphore(self._route_concurrency))
+        async with semaphore:
+            async with self._lock:
+                now = time.perf_counter()
+                delay = self._next_slot - now
+                self._next_slot = max(now, self._next_slot) + self._interval
+            if delay > 0:
+                await asyncio.sleep(delay)
+            return await factory()
+
+
+@dataclass
+class Node:
+    key: str
+    change: Change
+    route: str
+    run: Callable[[], Awaitable[None]]
+    depends_on: Set[str] = field(default_factory=set)
+
+
+@dataclass
+class ApplyReport:
+    wall_seconds: float = 0.0
+    timings: List[Tuple[str, float]] = field(default_factory=list)
+
+    @property
+    def api_seconds(self) -> float:
+        return sum(seconds for _, seconds in self.timings)
+
+    def render(self) -> str:
+        lines = [f"  {seconds * 1000:8.1f} ms  {label}" for label, seconds in self.timings]
+        speedup = self.api_seconds / self.wall_seconds if self.wall_seconds else 1.0
+        lines.append(
+            f"Applied {len(self.timings)} change(s) in {self.wall_seconds:.2f}s wall-clock "
+            f"({self.api_seconds:.2f}s of sequential API time, {speedup:.1f}x parallel speedup)."
+        )
+        return "\n".join(lines)
+
+
+async def run_dag(nodes: Mapping[str, Node], budget: RateBudget, concurrency: int) -> ApplyReport:
+    """Run nodes as soon as their dependencies finish, bounded by ``concurrency``.
+
+    No-op nodes resolve instantly; pending nodes go through the rate budget. The
+    first failure cancels in-flight work and is re-raised.
+    """
+    report = ApplyReport()
+    remaining = {key: len(node.depends_on) for key, node in nodes.items()}
+    dependants: Dict[str, List[str]] = {}
+    for key, node in nodes.items():
+        for dependency in node.depends_on:
+            dependants.setdefault(dependency, []).append(key)
+    ready = [key for key, count in remaining.items() if count == 0]
+    slots = asyncio.Semaphore(concurrency)
+    started = time.perf_counter()
+
+    async def execute(node: Node) -> None:
+        if node.change.action == "noop":
+            await node.run()
+            return
+        async with slots:
+            began = time.perf_counter()
+            await budget.run(node.route, node.run)
+            report.timings.append((node.change.label, time.perf_counter() - began))
+
+    running: Dict[asyncio.Task[None], str] = {}
+    try:
+        while ready or running:
+            for key in ready:
+                running[asyncio.create_task(execute(nodes[key]))] = key
+            ready = []
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                key = running.pop(task)
+                task.result()
+                for dependant in dependants.get(key, ()):
+                    remaining[dependant] -= 1
+                    if remaining[dependant] == 0:
+                        ready.append(dependant)
+    finally:
+        for task in running:
+            task.cancel()
+    if any(count > 0 for count in remaining.values()):
+        raise RuntimeError("Provisioning graph contains a dependency cycle")
+    report.wall_seconds = time.perf_counter() - started
+    return report
+
+
+def overwrite_role_names(spec: ChannelSpec) -> Set[str]:
+    return {name for name in (spec.overwrites or {}) if name != "@everyone"}
+
+
+def _without_move(change: Change) -> Change:
+    """Drop the category move from a channel edit; the bulk position update performs it."""
+    if "category" not in change.diff or change.action != "update":
+        return change
+    diff = {attribute: values for attribute, values in change.diff.items() if attribute != "category"}
+    return replace(change, action="update" if diff else "noop", diff=diff)
+
+
+def build_nodes(
+    guild: discord.Guild,
+    plan: Plan,
+    context: ApplyContext,
+    snapshot: GuildSnapshot,
+    store: Optional[StateStore] = None,
+) -> Dict[str, Node]:
+    """Turn a plan into a dependency graph: roles → overwrites → categories → channels → webhooks.
+
+    Channels wait for their category and for every role named in their
+    overwrites; webhooks wait for their channel. Everything else is independent,
+    so unrelated channels and webhooks are reconciled concurrently. Ordering and
+    category moves are applied last in a single bulk position update, and every
+    attribute change of a channel (overwrites included) goes out in one edit.
+    Each applied change is checkpointed to ``store`` as soon as it lands.
+    """
+    nodes: Dict[str, Node] = {}
+    text_channel_keys: Dict[str, str] = {}
+
+    async def checkpoint(change: Change, obj: Any) -> None:
+        if store is not None and change.action != "noop":
+            store.record(change, obj)
+            await store.checkpoint()
+
+    for change in plan.changes:
+        if change.kind == "role":
+
+            async def run_role(change: Change = change) -> None:
+                role = await ensure_role(guild, change)
+                context.roles[change.name] = role
+                if change.action == "create":
+                    snapshot.add_role(role)
+                await checkpoint(change, role)
+
+            nodes[f"role:{change.name}"] = Node(f"role:{change.name}", change, f"guild:{guild.id}:roles", run_role)
+        elif change.kind == "category":
+
+            async def run_category(change: Change = change) -> None:
+                category = await ensure_category(guild, change)
+                context.categories[change.name] = category
+                if change.action == "create":
+                    snapshot.add_channel(category)
+                await checkpoint(change, category)
+
+            route = f"guild:{guild.id}:channels" if change.action == "create" else f"channel:{change.target.id}"
+            nodes[f"category:{change.name}"] = Node(f"category:{change.name}", change, route, run_category)
+        elif change.kind == "channel":
+            key = f"channel:{change.parent}/{change.name}"
+
+            async def run_channel(change: Change = change) -> None:
+                category = context.categories[change.parent]
+                channel = await ensure_channel(guild, category, _without_move(change), context.roles)
+                if change.action == "create":
+                    snapshot.add_channel(channel)
+                context.channels.setdefault(change.parent, {})[change.name] = channel
+                if change.spec.type.lower() == "text":
+                    context.text_channels.setdefault(change.name, channel)
+                await checkpoint(change, channel)
+
+            route = f"guild:{guild.id}:channels" if change.action == "create" else f"channel:{change.target.id}"
+            depends_on = {f"category:{change.parent}"}
+            depends_on.update(f"role:{name}" for name in overwrite_role_names(change.spec))
+            nodes[key] = Node(key, change, route, run_channel, depends_on)
+            if change.spec.type.lower() == "text":
+                text_channel_keys.setdefault(change.name, key)
+        elif change.kind == "webhook":
+            key = f"webhook:{change.parent}/{change.name}"
+
+            async def run_webhook(change: Change = change) -> None:
+                target_channel = context.text_channels[change.parent]
+                webhook = await ensure_webhook(target_channel, change)
+                if change.action == "create":
+                    snapshot.add_webhook(target_channel.id, webhook)
+                context.webhooks.setdefault(change.parent, {})[change.name] = webhook.url
+                await checkpoint(change, webhook)
+
+            nodes[key] = Node(key, change, f"guild:{guild.id}:webhooks:{change.parent}", run_webhook, {text_channel_keys[change.parent]})
+        elif change.kind == "positions":
+
+            async def run_positions(change: Change = change) -> None:
+                _, payload = plan_positions(change.spec, context.categories, context.channels)
+                if payload:
+                    await bulk_update_positions(guild, payload)
+                await checkpoint(change, None)
+
+            layout_keys = {key for key in nodes if key.startswith(("category:", "channel:"))}
+            nodes["positions"] = Node("positions", change, f"guild:{guild.id}:positions", run_positions, layout_keys)
+
+    for node in nodes.values():
+        # The compiler guarantees overwrite roles are declared; dependencies on
+        # roles filtered out of a partial plan are simply dropped.
+        node.depends_on &= nodes.keys()
+    return nodes
 
 
-async def provision() -> None:
+async def apply_plan(
+    guild: discord.Guild,
+    plan: Plan,
+    *,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    budget: Optional[RateBudget] = None,
+    store: Optional[StateStore] = None,
+) -> Tuple[ApplyContext, ApplyReport]:
+    """Issue the API calls for pending changes, resolving unchanged objects as-is."""
+    context = ApplyContext()
+    budget = budget or RateBudget(DEFAULT_REQUESTS_PER_SECOND, DEFAULT_ROUTE_CONCURRENCY)
+    snapshot = plan.snapshot or GuildSnapshot(guild)
+    report = await run_dag(build_nodes(guild, plan, context, snapshot, store), budget, concurrency)
+    return context, report
+
+
+def ensure_state_files(spec: CompiledSpec) -> None:
+    for state_file in spec.state_files:
+        if state_file == STATE_PATH.name:
+            continue
+        path = ROOT / state_file
+        if not path.exists():
+            path.write_text("{}\n", encoding="utf-8")
+
+
+async def reconcile_guild(
+    guild: discord.Guild,
+    spec: CompiledSpec,
+    *,
+    plan_only: bool = False,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    budget: Optional[RateBudget] = None,
+    state_path: Path = STATE_PATH,
+    fetch_state: bool = False,
+    echo: Callable[[str], None] = print,
+) -> Tuple[Plan, Optional[ApplyReport]]:
+    """Plan and (unless ``plan_only``) apply the blueprint against ``guild``.
+
+    ``fetch_state`` reads channels over REST instead of the gateway cache.
+    """
+    snapshot = await GuildSnapshot.fetch(guild) if fetch_state else GuildSnapshot(guild)
+    plan = await build_plan(
+        guild,
+        spec.roles,
+        spec.categories,
+        spec.webhooks,
+        snapshot=snapshot,
+        state=load_state(state_path, guild.id),
+    )
+    echo(f"Plan for guild {guild.name} ({guild.id}):")
+    echo(plan.render())
+    if plan_only:
+        return plan, None
+
+    store = StateStore.from_plan(state_path, guild.id, plan)
+    _, report = await apply_plan(guild, plan, concurrency=concurrency, budget=budget, store=store)
+    await store.checkpoint()
+    echo(report.render())
+    return plan, report
+
+
+@dataclass
+class GuildResult:
+    guild_id: int
+    name: str
+    seconds: float = 0.0
+    changes: int = 0
+    api_calls: int = 0
+    error: Optional[str] = None
+
+
+def render_batch_summary(results: List[GuildResult]) -> str:
+    lines = [f"{'guild':<24} {'id':>20} {'changes':>8} {'calls':>6} {'seconds':>8}  status"]
+    for result in results:
+        status = f"failed: {result.error}" if result.error else "ok"
+        lines.append(
+            f"{result.name[:24]:<24} {result.guild_id:>20} {result.changes:>8} "
+            f"{result.api_calls:>6} {result.seconds:>8.2f}  {status}"
+        )
+    failed = sum(1 for result in results if result.error)
+    lines.append(f"Provisioned {len(results) - failed}/{len(results)} guild(s).")
+    return "\n".join(lines)
+
+
+def batch_state_path(guild_id: int) -> Path:
+    return BATCH_STATE_DIR / f"server_state.{guild_id}.json"
+
+
+async def reconcile_guilds(
+    guilds: List[discord.Guild],
+    spec: CompiledSpec,
+    *,
+    plan_only: bool = False,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    guild_concurrency: int = DEFAULT_GUILD_CONCURRENCY,
+    budget: Optional[RateBudget] = None,
+    state_path_for: Callable[[int], Path] = batch_state_path,
+    fetch_state: bool = False,
+    echo: Callable[[str], None] = print,
+) -> List[GuildResult]:
+    """Reconcile several guilds against one spec, at most ``guild_concurrency`` at a time.
+
+    All guilds share one :class:`RateBudget` because Discord's global limit is
+    per bot, not per guild; route caps stay per guild. A failing guild is
+    reported in its result and does not stop the others.
+    """
+    budget = budget or RateBudget(DEFAULT_REQUESTS_PER_SECOND, DEFAULT_ROUTE_CONCURRENCY)
+    slots = asyncio.Semaphore(guild_concurrency)
+
+    async def run_one(guild: discord.Guild) -> GuildResult:
+        result = GuildResult(guild.id, guild.name)
+        async with slots:
+            started = time.perf_counter()
+            state_path = state_path_for(guild.id)
+            state_path.parent.mkdir(parents=True, exist_ok=True)
+
+            def guild_echo(text: str) -> None:
+                echo("\n".join(f"[{guild.name}] {line}" for line in text.splitlines()))
+
+            try:
+                plan, report = await reconcile_guild(
+                    guild,
+                    spec,
+                    plan_only=plan_only,
+                    concurrency=concurrency,
+                    budget=budget,
+                    state_path=state_path,
+                    fetch_state=fetch_state,
+                    echo=guild_echo,
+                )
+                result.changes = len(plan.pending())
+                result.api_calls = (plan.snapshot.fetches if plan.snapshot else 0) + (
+                    len(report.timings) if report else 0
+                )
+            except Exception as exc:  # noqa: BLE001 - reported per guild
+                result.error = f"{type(exc).__name__}: {exc}"
+            result.seconds = time.perf_counter() - started
+        return result
+
+    return list(await asyncio.gather(*(run_one(guild) for guild in guilds)))
+
+
+def guild_ids_from_env(cli_ids: Optional[List[int]] = None) -> List[int]:
+    if cli_ids:
+        return list(dict.fromkeys(cli_ids))
+    raw = os.environ.get("DISCORD_GUILD_IDS") or os.environ.get("DISCORD_GUILD_ID") or ""
+    try:
+        ids = [int(part) for part in raw.replace(" ", "").split(",") if part]
+    except ValueError as exc:
+        raise RuntimeError(f"Invalid guild ID in DISCORD_GUILD_IDS/DISCORD_GUILD_ID: {exc}") from None
+    return list(dict.fromkeys(ids))
+
+
+async def provision_guilds(
+    guild_ids: List[int],
+    spec: CompiledSpec,
+    resolve_guild: Callable[[int], Awaitable[Optional[discord.Guild]]],
+    *,
+    fetch_state: bool,
+    plan_only: bool,
+    concurrency: int,
+    guild_concurrency: int,
+    budget: RateBudget,
+) -> None:
+    if len(guild_ids) == 1:
+        guild = await resolve_guild(guild_ids[0])
+        if guild is None:
+            raise RuntimeError(f"Bot is not a member of guild {guild_ids[0]}")
+        _, report = await reconcile_guild(
+            guild, spec, plan_only=plan_only, concurrency=concurrency, budget=budget, fetch_state=fetch_state
+        )
+        if report is not None:
+            ensure_state_files(spec)
+        return
+
+    guilds: List[discord.Guild] = []
+    missing: List[GuildResult] = []
+    for guild_id in guild_ids:
+        guild = await resolve_guild(guild_id)
+        if guild is None:
+            missing.append(GuildResult(guild_id, "?", error="bot is not a member of this guild"))
+        else:
+            guilds.append(guild)
+    results = await reconcile_guilds(
+        guilds,
+        spec,
+        plan_only=plan_only,
+        concurrency=concurrency,
+        guild_concurrency=guild_concurrency,
+        budget=budget,
+        fetch_state=fetch_state,
+    )
+    print(render_batch_summary(results + missing))
+    if not plan_only and any(result.error is None for result in results):
+        ensure_state_files(spec)
+
+
+async def provision(
+    *,
+    guild_ids: Optional[List[int]] = None,
+    plan_only: bool = False,
+    rest_only: bool = False,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    guild_concurrency: int = DEFAULT_GUILD_CONCURRENCY,
+    route_concurrency: int = DEFAULT_ROUTE_CONCURRENCY,
+    requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND,
+) -> None:
     token = os.environ.get("DISCORD_BOT_TOKEN")
-    guild_id_str = os.environ.get("DISCORD_GUILD_ID")
-    if not token or not guild_id_str:
-        raise RuntimeError("DISCORD_BOT_TOKEN and DISCORD_GUILD_ID must be set")
+    guild_ids = guild_ids_from_env(guild_ids)
+    if not token or not guild_ids:
+        raise RuntimeError("DISCORD_BOT_TOKEN and DISCORD_GUILD_ID (or DISCORD_GUILD_IDS / --guild) must be set")
 
     spec = load_spec()
+    budget = RateBudget(requests_per_second, route_concurrency)
+    options: Dict[str, Any] = {
+        "plan_only": plan_only,
+        "concurrency": concurrency,
+        "guild_concurrency": guild_concurrency,
+        "budget": budget,
+    }
+    started = time.perf_counter()
+
+    if rest_only:
+        # Log in over HTTP only: no gateway handshake, no READY, no guild
+        # streaming. Each guild costs one fetch plus one channel listing.
+        client = discord.Client(intents=discord.Intents.none())
+
+        async def fetch_guild(guild_id: int) -> Optional[discord.Guild]:
+            try:
+                return await client.fetch_guild(guild_id)
+            except (discord.NotFound, discord.Forbidden):
+                return None
+
+        try:
+            await client.login(token)
+            print(f"Logged in over REST in {time.perf_counter() - started:.2f}s.")
+            await provision_guilds(guild_ids, spec, fetch_guild, fetch_state=True, **options)
+        finally:
+            await client.close()
+        return
+
+    # Roles and channels arrive with the guilds intent; provisioning never needs
+    # the member list, so the connection skips chunking entirely.
     intents = discord.Intents.none()
     intents.guilds = True
-    intents.members = True
 
-    client = discord.Client(intents=intents)
+    client = discord.Client(intents=intents, chunk_guilds_at_startup=False)
+
+    async def cached_guild(guild_id: int) -> Optional[discord.Guild]:
+        return client.get_guild(guild_id)
 
     @client.event
     async def on_ready() -> None:  # type: ignore[override]
-        guild_id = int(guild_id_str)
-        guild = client.get_guild(guild_id)
-        if guild is None:
-            raise RuntimeError(f"Bot is not a member of guild {guild_id}")
-
-        role_specs = build_role_specs(spec.get("roles", []))
-        role_objects: Dict[str, discord.Role] = {}
-        for role_spec in role_specs:
-            role = await ensure_role(guild, role_spec)
-            role_objects[role.name] = role
-
-        category_specs = build_category_specs(spec.get("categories", []))
-        channel_state: Dict[str, Dict[str, int]] = {}
-        for category_spec in category_specs:
-            category = await ensure_category(guild, category_spec.name)
-            category_channels: Dict[str, int] = {}
-            for channel_spec in category_spec.channels:
-                channel = await ensure_channel(guild, category, channel_spec, role_objects)
-                category_channels[channel.name] = channel.id
-            channel_state[category.name] = category_channels
-
-        webhook_state: Dict[str, Dict[str, str]] = {}
-        for webhook_spec in spec.get("webhooks", []):
-            channel_name = webhook_spec["channel"]
-            webhook_name = webhook_spec["name"]
-            # Locate the text channel by traversing categories.
-            target_channel: Optional[discord.TextChannel] = None
-            for category in guild.categories:
-                channel = discord.utils.get(category.text_channels, name=channel_name)
-                if channel is not None:
-                    target_channel = channel
-                    break
-            if target_channel is None:
-                raise RuntimeError(f"Cannot create webhook '{webhook_name}' because channel '{channel_name}' was not found")
-            webhook = await ensure_webhook(target_channel, webhook_name)
-            webhook_state.setdefault(target_channel.name, {})[webhook_name] = webhook.url
-
-        state_payload = {
-            "guild_id": guild.id,
-            "roles": {name: role.id for name, role in role_objects.items()},
-            "categories": {category.name: category.id for category in guild.categories},
-            "channels": channel_state,
-            "webhooks": webhook_state,
-        }
-        STATE_PATH.write_text(json.dumps(state_payload, indent=2), encoding="utf-8")
-
-        for state_file in spec.get("state_files", []):
-            if state_file == STATE_PATH.name:
-                continue
-            path = ROOT / state_file
-            if not path.exists():
-                path.write_text("{}\n", encoding="utf-8")
-
-        await client.close()
+        try:
+            print(f"Gateway ready in {time.perf_counter() - started:.2f}s.")
+            await provision_guilds(guild_ids, spec, cached_guild, fetch_state=False, **options)
+        finally:
+            await client.close()
 
     await client.start(token)
 
 
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Reconcile a Discord guild with server_spec.json.")
+    parser.add_argument("--plan", action="store_true", help="print the planned changes without applying them")
+    parser.add_argument(
+        "--rest",
+        action="store_true",
+        default=os.environ.get("PROVISION_REST_ONLY", "").lower() in {"1", "true", "yes"},
+        help="skip the gateway and read guild state over REST (faster cold start for CI)",
+    )
+    parser.add_argument(
+        "--guild",
+        dest="guild_ids",
+        type=int,
+        action="append",
+        help="guild ID to provision (repeat for a batch; defaults to DISCORD_GUILD_IDS or DISCORD_GUILD_ID)",
+    )
+    parser.add_argument(
+        "--guild-concurrency",
+        type=int,
+        default=DEFAULT_GUILD_CONCURRENCY,
+        help="maximum guilds reconciled at once in batch mode",
+    )
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="maximum API calls in flight")
+    parser.add_argument(
+        "--route-concurrency",
+        type=int,
+        default=DEFAULT_ROUTE_CONCURRENCY,
+        help="maximum API calls in flight per Discord route",
+    )
+    parser.add_argument(
+        "--rps",
+        type=float,
+        default=DEFAULT_REQUESTS_PER_SECOND,
+        help="global request budget per second (Discord allows 50)",
+    )
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
-    asyncio.run(provision())
+    args = parse_args()
+    asyncio.run(
+        provision(
+            guild_ids=args.guild_ids,
+            plan_only=args.plan,
+            rest_only=args.rest,
+            concurrency=args.concurrency,
+            guild_concurrency=args.guild_concurrency,
+            route_concurrency=args.route_concurrency,
+            requests_per_second=args.rps,
+        )
+    )
@@ -0,0 +1,401 @@
+"""Watch a provisioned guild and report (or heal) drift from the blueprint.
+
+Between provisioning runs admins edit channels, roles and permissions by hand.
+This long-running client subscribes to role and channel update/delete events
+and, for each event, compares only the changed object with the compiled
+specification. Lookups go through IDs recorded in ``server_state.json`` (or the
+blueprint name when an object was never recorded), so the work per event does
+not grow with the size of the guild.
+
+Drift is posted as an embed to a report channel. With ``DRIFT_AUTO_HEAL=1`` the
+watcher also edits the object back to the blueprint, using the same ``ensure_*``
+helpers as the provisioner; deletions are only reported, since recreating
+objects belongs to a full ``create_discord_server.py`` run.
+
+Usage
+-----
+```
+python drift_watch.py
+```
+Environment variables:
+``DISCORD_BOT_TOKEN`` – bot token (the guilds intent is all it needs).
+``DISCORD_GUILD_ID`` – guild to watch.
+``DRIFT_REPORT_CHANNEL`` – channel name or ID for reports (default ``audit-log``).
+``DRIFT_AUTO_HEAL`` – ``1`` to revert drift automatically (default off).
+``DRIFT_DEBOUNCE_SECONDS`` – quiet period before an object is checked (default 3).
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import discord
+
+from create_discord_server import (
+    STATE_PATH,
+    Change,
+    channel_diff,
+    ensure_category,
+    ensure_channel,
+    ensure_role,
+    load_state,
+    role_diff,
+)
+from spec_compiler import CHANNEL_TYPES, SPEC_PATH, CategorySpec, ChannelSpec, CompiledSpec, RoleSpec, SpecError, compile_spec
+
+logging.basicConfig(level=getattr(logging, os.getenv("LOG_LEVEL", "INFO").upper(), logging.INFO))
+logger = logging.getLogger("drift-watch")
+
+DEFAULT_REPORT_CHANNEL = "audit-log"
+DEFAULT_DEBOUNCE_SECONDS = 3.0
+EMBED_FIELD_VALUE_LIMIT = 1024
+EMBED_MAX_FIELDS = 25
+SPEC_TYPES = {channel_type: name for name, channel_type in CHANNEL_TYPES.items()}
+
+
+class BlueprintIndex:
+    """Constant-time lookups from a live role or channel to the spec entry governing it.
+
+    Objects recorded in ``server_state.json`` are identified by ID. Anything
+    else is matched by name, unless that name is already anchored to a
+    different recorded ID.
+    """
+
+    def __init__(self, spec: CompiledSpec, state: Dict[str, Any]) -> None:
+        self.spec = spec
+        self.roles: Dict[str, RoleSpec] = {role.name: role for role in spec.roles}
+        self.categories: Dict[str, CategorySpec] = {category.name: category for category in spec.categories}
+        self.channels: Dict[Tuple[str, str, str], ChannelSpec] = {}
+        for category in spec.categories:
+            for channel in category.channels:
+                self.channels.setdefault((category.name, channel.name, channel.type), channel)
+
+        self.role_anchors: Dict[str, int] = {name: int(role_id) for name, role_id in state["roles"].items()}
+        self.category_anchors: Dict[str, int] = {
+            name: int(category_id) for name, category_id in state["categories"].items()
+        }
+        self.channel_anchors: Dict[Tuple[str, str], int] = {
+            (category, name): int(channel_id)
+            for category, channels in state["channels"].items()
+            for name, channel_id in channels.items()
+        }
+        self._role_names = {role_id: name for name, role_id in self.role_anchors.items()}
+        self._category_names = {category_id: name for name, category_id in self.category_anchors.items()}
+        self._channel_keys = {channel_id: key for key, channel_id in self.channel_anchors.items()}
+
+    def role_spec(self, role: discord.Role) -> Optional[RoleSpec]:
+        name = self._role_names.get(role.id)
+        if name is None and self.role_anchors.get(role.name, role.id) == role.id:
+            name = role.name
+        return self.roles.get(name) if name is not None else None
+
+    def category_spec(self, category: discord.abc.GuildChannel) -> Optional[CategorySpec]:
+        name = self._category_names.get(category.id)
+        if name is None and self.category_anchors.get(category.name, category.id) == category.id:
+            name = category.name
+        return self.categories.get(name) if name is not None else None
+
+    def channel_spec(self, channel: discord.abc.GuildChannel) -> Tuple[Optional[ChannelSpec], Optional[str]]:
+        channel_type = SPEC_TYPES.get(channel.type)
+        if channel_type is None:
+            return None, None
+        key = self._channel_keys.get(channel.id)
+        if key is None:
+            parent = channel.category
+            category_spec = self.category_spec(parent) if parent is not None else None
+            if category_spec is None:
+                return None, None
+            key = (category_spec.name, channel.name)
+            if self.channel_anchors.get(key, channel.id) != channel.id:
+                return None, None
+        return self.channels.get((key[0], key[1], channel_type)), key[0]
+
+
+def _flag_names(value: int) -> str:
+    names = [name for name, enabled in discord.Permissions(value) if enabled]
+    return ", ".join(names) or "none"
+
+
+def _overwrite_pair(pair: Optional[Tuple[int, int]]) -> str:
+    if pair is None:
+        return "no overwrite"
+    allow, deny = pair
+    return f"allow {_flag_names(allow)}; deny {_flag_names(deny)}"
+
+
+def describe_drift(attribute: str, current: Any, desired: Any) -> str:
+    if attribute == "overwrites":
+        lines = []
+        for target in sorted(set(current) | set(desired)):
+            if current.get(target) != desired.get(target):
+                lines.append(f"**{target}**: {_overwrite_pair(current.get(target))} → {_overwrite_pair(desired.get(target))}")
+        text = "\n".join(lines)
+    elif attribute == "permissions":
+        added = _flag_names(desired & ~current)
+        removed = _flag_names(current & ~desired)
+        text = f"missing: {added}\nunexpected: {removed}"
+    else:
+        text = f"`{current!r}` → `{desired!r}`"
+    return text if len(text) <= EMBED_FIELD_VALUE_LIMIT else text[: EMBED_FIELD_VALUE_LIMIT - 1] + "…"
+
+
+class DriftWatcher(discord.Client):
+    def __init__(
+        self,
+        guild_id: int,
+        *,
+        report_channel: str = DEFAULT_REPORT_CHANNEL,
+        auto_heal: bool = False,
+        debounce: float = DEFAULT_DEBOUNCE_SECONDS,
+        spec_path: Path = SPEC_PATH,
+        state_path: Path = STATE_PATH,
+    ) -> None:
+        intents = discord.Intents.none()
+        intents.guilds = True
+        super().__init__(intents=intents, chunk_guilds_at_startup=False)
+        self.guild_id = guild_id
+        self.report_channel_name = report_channel
+        self.auto_heal = auto_heal
+        self.debounce = debounce
+        self.spec_path = spec_path
+        self.state_path = state_path
+        self.index: Optional[BlueprintIndex] = None
+        self.role_names: Dict[int, str] = {}
+        self.roles_by_spec: Dict[str, discord.Role] = {}
+        self._sources_mtime: Tuple[int, int] = (0, 0)
+        self._pending: Dict[int, asyncio.Task[None]] = {}
+        self._report_channel: Optional[discord.abc.Messageable] = None
+
+    @property
+    def guild(self) -> Optional[discord.Guild]:
+        return self.get_guild(self.guild_id)
+
+    def _mtime(self, path: Path) -> int:
+        try:
+            return path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return 0
+
+    def refresh_index(self) -> None:
+        """Recompile the blueprint when the spec or state file changed on disk."""
+        mtimes = (self._mtime(self.spec_path), self._mtime(self.state_path))
+        if self.index is not None and mtimes == self._sources_mtime:
+            return
+        try:
+            spec = compile_spec(self.spec_path)
+        except SpecError as exc:
+            logger.error("Keeping the previous blueprint; the edited spec is invalid:\n%s", exc)
+            self._sources_mtime = mtimes
+            return
+        self.index = BlueprintIndex(spec, load_state(self.state_path, self.guild_id))
+        self._sources_mtime = mtimes
+        guild = self.guild
+        if guild is not None:
+            self.roles_by_spec = {}
+            for role in guild.roles:
+                self._track_role(role)
+        logger.info("Loaded blueprint %s", spec.digest[:12])
+
+    def _track_role(self, role: discord.Role) -> None:
+        self.role_names[role.id] = role.name
+        spec = self.index.role_spec(role) if self.index is not None else None
+        if spec is not None:
+            self.roles_by_spec[spec.name] = role
+
+    def _untrack_role(self, role: discord.Role) -> None:
+        self.role_names.pop(role.id, None)
+        for name, tracked in list(self.roles_by_spec.items()):
+            if tracked.id == role.id:
+                del self.roles_by_spec[name]
+
+    def _resolve_report_channel(self, guild: discord.Guild) -> Optional[discord.abc.Messageable]:
+        target = self.report_channel_name
+        if target.isdigit():
+            channel = guild.get_channel(int(target))
+        else:
+            channel = discord.utils.get(guild.text_channels, name=target.lstrip("#"))
+        if not isinstance(channel, discord.TextChannel):
+            logger.warning("Report channel %s not found; drift will only be logged", target)
+            return None
+        return channel
+
+    async def on_ready(self) -> None:
+        guild = self.guild
+        if guild is None:
+            logger.error("Bot is not a member of guild %s", self.guild_id)
+            await self.close()
+            return
+        self.refresh_index()
+        self._report_channel = self._resolve_report_channel(guild)
+        logger.info(
+            "Watching %s for drift (auto-heal %s, reports to %s)",
+            guild.name,
+            "on" if self.auto_heal else "off",
+            self.report_channel_name,
+        )
+
+    def _schedule(self, object_id: int, check: Callable[[int], Awaitable[None]]) -> None:
+        """Debounce bursts of events for one object into a single check."""
+        previous = self._pending.pop(object_id, None)
+        if previous is not None:
+            previous.cancel()
+
+        async def run() -> None:
+            await asyncio.sleep(self.debounce)
+            self._pending.pop(object_id, None)
+            try:
+                await check(object_id)
+            except Exception:  # noqa: BLE001 - keep the watcher alive
+                logger.exception("Drift check for %s failed", object_id)
+
+        self._pending[object_id] = asyncio.create_task(run())
+
+    # Role events -----------------------------------------------------------
+
+    async def on_guild_role_create(self, role: discord.Role) -> None:
+        if role.guild.id == self.guild_id:
+            self._track_role(role)
+
+    async def on_guild_role_update(self, before: discord.Role, after: discord.Role) -> None:
+        if after.guild.id != self.guild_id:
+            return
+        self._track_role(after)
+        self._schedule(after.id, self.check_role)
+
+    async def on_guild_role_delete(self, role: discord.Role) -> None:
+        if role.guild.id != self.guild_id or self.index is None:
+            return
+        self._untrack_role(role)
+        spec = self.index.role_spec(role)
+        if spec is not None:
+            await self.report(f"Role {spec.name} was deleted", {}, note="Run create_discord_server.py to recreate it.")
+
+    async def check_role(self, role_id: int) -> None:
+        self.refresh_index()
+        guild = self.guild
+        role = guild.get_role(role_id) if guild is not None else None
+        spec = self.index.role_spec(role) if role is not None and self.index is not None else None
+        if spec is None or role.managed:
+            return
+        diff = role_diff(spec, role)
+        if not diff:
+            return
+        change = Change("update", "role", spec.name, spec, target=role, diff=diff)
+        await self._heal_and_report(f"Role {spec.name} drifted", diff, lambda: ensure_role(guild, change))
+
+    # Channel events --------------------------------------------------------
+
+    async def on_guild_channel_update(self, before: discord.abc.GuildChannel, after: discord.abc.GuildChannel) -> None:
+        if after.guild.id == self.guild_id:
+            self._schedule(after.id, self.check_channel)
+
+    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel) -> None:
+        if channel.guild.id != self.guild_id or self.index is None:
+            return
+        if channel.type == discord.ChannelType.category:
+            spec = self.index.category_spec(channel)
+            label = f"Category {spec.name}" if spec is not None else None
+        else:
+            channel_spec, category_name = self.index.channel_spec(channel)
+            label = f"Channel {category_name}/#{channel_spec.name}" if channel_spec is not None else None
+        if label is not None:
+            await self.report(f"{label} was deleted", {}, note="Run create_discord_server.py to recreate it.")
+
+    def _live_category(self, guild: discord.Guild, name: str) -> Optional[discord.CategoryChannel]:
+        anchored = self.index.category_anchors.get(name) if self.index is not None else None
+        if anchored is not None:
+            category = guild.get_channel(anchored)
+            if isinstance(category, discord.CategoryChannel):
+                return category
+        return discord.utils.get(guild.categories, name=name)
+
+    async def check_channel(self, channel_id: int) -> None:
+        self.refresh_index()
+        guild = self.guild
+        channel = guild.get_channel(channel_id) if guild is not None else None
+        if channel is None or self.index is None:
+            return
+        if channel.type == discord.ChannelType.category:
+            category_spec = self.index.category_spec(channel)
+            if category_spec is None or channel.name == category_spec.name:
+                return
+            diff = {"name": (channel.name, category_spec.name)}
+            change = Change("update", "category", category_spec.name, category_spec, target=channel, diff=diff)
+            await self._heal_and_report(f"Category {category_spec.name} drifted", diff, lambda: ensure_category(guild, change))
+            return
+
+        spec, category_name = self.index.channel_spec(channel)
+        if spec is None or category_name is None:
+            return
+        diff = channel_diff(guild, spec, channel, self.role_names)
+        category = self._live_category(guild, category_name)
+        if category is None or channel.category_id != category.id:
+            current = channel.category.name if channel.category is not None else None
+            diff["category"] = (current, category_name)
+        if not diff:
+            return
+        title = f"Channel {category_name}/#{spec.name} drifted"
+        if category is None:
+            await self.report(title, diff, error=f"Category {category_name} is missing; run the provisioner.")
+            return
+        change = Change("update", "channel", spec.name, spec, parent=category_name, target=channel, diff=diff)
+        await self._heal_and_report(title, diff, lambda: ensure_channel(guild, category, change, self.roles_by_spec))
+
+    async def _heal_and_report(
+        self,
+        title: str,
+        diff: Dict[str, Tuple[Any, Any]],
+        heal: Callable[[], Awaitable[Any]],
+    ) -> None:
+        note, error = None, None
+        if self.auto_heal:
+            try:
+                await heal()
+                note = "Reverted to the blueprint."
+            except (discord.HTTPException, ValueError) as exc:
+                error = str(exc)
+        await self.report(title, diff, note=note, error=error)
+
+    async def report(
+        self,
+        title: str,
+        diff: Dict[str, Tuple[Any, Any]],
+        *,
+        note: Optional[str] = None,
+        error: Optional[str] = None,
+    ) -> None:
+        logger.warning("%s: %s", title, ", ".join(diff) or "-")
+        if self._report_channel is None:
+            return
+        colour = discord.Colour.red() if error else discord.Colour.green() if note else discord.Colour.orange()
+        embed = discord.Embed(title=title, colour=colour)
+        for attribute, (current, desired) in list(diff.items())[:EMBED_MAX_FIELDS]:
+            embed.add_field(name=attribute, value=describe_drift(attribute, current, desired), inline=False)
+        if error:
+            embed.description = f"Auto-heal failed: {error}" if self.auto_heal else error
+        embed.set_footer(text=note or "Run create_discord_server.py (or enable DRIFT_AUTO_HEAL) to reconcile.")
+        try:
+            await self._report_channel.send(embed=embed)
+        except discord.HTTPException as exc:
+            logger.warning("Could not post drift report: %s", exc)
+
+
+def main() -> None:
+    token = os.environ.get("DISCORD_BOT_TOKEN")
+    guild_id = os.environ.get("DISCORD_GUILD_ID")
+    if not token or not guild_id:
+        raise RuntimeError("DISCORD_BOT_TOKEN and DISCORD_GUILD_ID must be set")
+    watcher = DriftWatcher(
+        int(guild_id),
+        report_channel=os.environ.get("DRIFT_REPORT_CHANNEL", DEFAULT_REPORT_CHANNEL),
+        auto_heal=os.environ.get("DRIFT_AUTO_HEAL", "").lower() in {"1", "true", "yes"},
+        debounce=float(os.environ.get("DRIFT_DEBOUNCE_SECONDS", DEFAULT_DEBOUNCE_SECONDS)),
+    )
+    watcher.run(token, log_handler=None)
+
+
+if __name__ == "__main__":
+    main()
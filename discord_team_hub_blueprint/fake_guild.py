@@ -0,0 +1,562 @@
+"""In-process stand-in for a Discord guild, used to run the provisioner offline.
+
+The fake implements the subset of ``discord.Guild``, role, channel and webhook
+behaviour that ``create_discord_server.py`` relies on. Every mutating or
+fetching call goes through :class:`FakeDiscordAPI`, which counts requests per
+REST route, adds a configurable round-trip latency and models Discord's rate
+limit buckets: a global bucket plus one bucket per route and major parameter
+(guild or channel). When a bucket is exhausted the call is recorded as a 429 and
+waits for the bucket to reset, the same way discord.py retries.
+
+Running the module benchmarks the provisioner end-to-end without a token:
+
+```
+python fake_guild.py               # sequential vs. parallel vs. no-op vs. rename drift
+python fake_guild.py --latency 0.1 # slower simulated round trips
+python fake_guild.py --guilds 6    # also batch-provision six guilds at once
+```
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import tempfile
+import time
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Tuple, Type
+
+import discord
+
+from spec_compiler import CompiledSpec
+
+GLOBAL_BUCKET = "global"
+
+
+@dataclass(frozen=True)
+class BucketLimit:
+    limit: int
+    per: float
+
+
+DEFAULT_GLOBAL_LIMIT = BucketLimit(50, 1.0)
+DEFAULT_BUCKETS: Dict[str, BucketLimit] = {
+    "POST /guilds/{guild_id}/roles": BucketLimit(10, 1.0),
+    "PATCH /guilds/{guild_id}/roles/{role_id}": BucketLimit(10, 1.0),
+    "POST /guilds/{guild_id}/channels": BucketLimit(10, 1.0),
+    "PATCH /channels/{channel_id}": BucketLimit(5, 1.0),
+    "GET /channels/{channel_id}/webhooks": BucketLimit(5, 1.0),
+    "POST /channels/{channel_id}/webhooks": BucketLimit(5, 1.0),
+    "PATCH /webhooks/{webhook_id}": BucketLimit(5, 1.0),
+    "GET /guilds/{guild_id}/channels": BucketLimit(10, 1.0),
+    "PATCH /guilds/{guild_id}/channels": BucketLimit(5, 1.0),
+}
+
+
+class _Bucket:
+    def __init__(self, limit: BucketLimit) -> None:
+        self.limit = limit
+        self.remaining = limit.limit
+        self.reset_at = 0.0
+
+    def reserve(self, now: float) -> float:
+        if now >= self.reset_at:
+            self.remaining = self.limit.limit
+            self.reset_at = now + self.limit.per
+        if self.remaining > 0:
+            self.remaining -= 1
+            return 0.0
+        return self.reset_at - now
+
+
+class FakeDiscordAPI:
+    """Request accounting, latency and rate-limit buckets for the fake guild."""
+
+    def __init__(
+        self,
+        *,
+        latency: float = 0.05,
+        buckets: Optional[Mapping[str, BucketLimit]] = None,
+        global_limit: BucketLimit = DEFAULT_GLOBAL_LIMIT,
+    ) -> None:
+        self.latency = latency
+        self.limits = dict(DEFAULT_BUCKETS if buckets is None else buckets)
+        self.global_limit = global_limit
+        self.calls: Counter[str] = Counter()
+        self.rate_limited: Counter[str] = Counter()
+        self._buckets: Dict[Tuple[str, int], _Bucket] = {}
+
+    @property
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+    @property
+    def write_calls(self) -> int:
+        return sum(count for route, count in self.calls.items() if not route.startswith("GET "))
+
+    def reset(self) -> None:
+        self.calls.clear()
+        self.rate_limited.clear()
+
+    def _bucket(self, route: str, major: int) -> Optional[_Bucket]:
+        limit = self.limits.get(route)
+        if limit is None:
+            return None
+        return self._buckets.setdefault((route, major), _Bucket(limit))
+
+    async def request(self, route: str, major: int) -> None:
+        self.calls[route] += 1
+        loop = asyncio.get_running_loop()
+        global_bucket = self._buckets.setdefault((GLOBAL_BUCKET, 0), _Bucket(self.global_limit))
+        route_bucket = self._bucket(route, major)
+        while True:
+            now = loop.time()
+            wait = global_bucket.reserve(now)
+            if wait == 0.0 and route_bucket is not None:
+                wait = route_bucket.reserve(now)
+                if wait > 0:
+                    global_bucket.remaining += 1
+            if wait == 0.0:
+                break
+            self.rate_limited[route] += 1
+            await asyncio.sleep(wait)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+
+class FakeRole:
+    def __init__(
+        self,
+        guild: "FakeGuild",
+        role_id: int,
+        name: str,
+        *,
+        colour: discord.Colour = discord.Colour.default(),
+        hoist: bool = False,
+        mentionable: bool = False,
+        permissions: discord.Permissions = discord.Permissions.none(),
+    ) -> None:
+        self.guild = guild
+        self.id = role_id
+        self.name = name
+        self.colour = colour
+        self.hoist = hoist
+        self.mentionable = mentionable
+        self.permissions = permissions
+        self.managed = False
+
+    async def edit(self, *, reason: Optional[str] = None, **changes: Any) -> "FakeRole":
+        await self.guild.api.request("PATCH /guilds/{guild_id}/roles/{role_id}", self.guild.id)
+        for attribute, value in changes.items():
+            setattr(self, attribute, value)
+        return self
+
+    def __repr__(self) -> str:
+        return f"<FakeRole id={self.id} name={self.name!r}>"
+
+
+class FakeWebhook:
+    def __init__(self, webhook_id: int, name: str, channel: "FakeTextChannel") -> None:
+        self.id = webhook_id
+        self.name = name
+        self.channel = channel
+        self.channel_id = channel.id
+        self.url = f"https://discord.com/api/webhooks/{webhook_id}/fake-token-{webhook_id}"
+
+    async def edit(self, *, reason: Optional[str] = None, **changes: Any) -> "FakeWebhook":
+        await self.channel.guild.api.request("PATCH /webhooks/{webhook_id}", self.id)
+        for attribute, value in changes.items():
+            setattr(self, attribute, value)
+        return self
+
+
+class FakeGuildChannel:
+    type: discord.ChannelType
+
+    def __init__(
+        self,
+        guild: "FakeGuild",
+        channel_id: int,
+        name: str,
+        *,
+        category_id: Optional[int] = None,
+        position: int = 0,
+        overwrites: Optional[Mapping[Any, discord.PermissionOverwrite]] = None,
+    ) -> None:
+        self.guild = guild
+        self.id = channel_id
+        self.name = name
+        self.category_id = category_id
+        self.position = position
+        self.overwrites: Dict[Any, discord.PermissionOverwrite] = dict(overwrites or {})
+
+    @property
+    def category(self) -> Optional["FakeCategory"]:
+        channel = self.guild.get_channel(self.category_id) if self.category_id else None
+        return channel if isinstance(channel, FakeCategory) else None
+
+    async def edit(self, *, reason: Optional[str] = None, **changes: Any) -> "FakeGuildChannel":
+        await self.guild.api.request("PATCH /channels/{channel_id}", self.id)
+        for attribute, value in changes.items():
+            if attribute == "overwrites":
+                self.overwrites = dict(value or {})
+            elif attribute == "category":
+                self.category_id = value.id if value is not None else None
+            else:
+                setattr(self, attribute, value)
+        return self
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} id={self.id} name={self.name!r}>"
+
+
+class FakeTextChannel(FakeGuildChannel):
+    type = discord.ChannelType.text
+
+    def __init__(self, *args: Any, topic: Optional[str] = None, slowmode_delay: Optional[int] = None, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.topic = topic
+        self.slowmode_delay = slowmode_delay or 0
+        self._webhooks: List[FakeWebhook] = []
+
+    async def webhooks(self) -> List[FakeWebhook]:
+        await self.guild.api.request("GET /channels/{channel_id}/webhooks", self.id)
+        return list(self._webhooks)
+
+    async def create_webhook(self, *, name: str, reason: Optional[str] = None) -> FakeWebhook:
+        await self.guild.api.request("POST /channels/{channel_id}/webhooks", self.id)
+        webhook = FakeWebhook(self.guild.next_id(), name, self)
+        self._webhooks.append(webhook)
+        return webhook
+
+
+class FakeVoiceChannel(FakeGuildChannel):
+    type = discord.ChannelType.voice
+
+    def __init__(self, *args: Any, bitrate: int = 64000, user_limit: int = 0, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.bitrate = bitrate
+        self.user_limit = user_limit
+
+
+class FakeStageChannel(FakeGuildChannel):
+    type = discord.ChannelType.stage_voice
+
+    def __init__(self, *args: Any, bitrate: int = 64000, user_limit: int = 0, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.bitrate = bitrate
+        self.user_limit = user_limit
+
+
+class FakeCategory(FakeGuildChannel):
+    type = discord.ChannelType.category
+
+    @property
+    def channels(self) -> List[FakeGuildChannel]:
+        return sorted(
+            (channel for channel in self.guild.channels if channel.category_id == self.id),
+            key=lambda channel: (channel.position, channel.id),
+        )
+
+    @property
+    def text_channels(self) -> List[FakeTextChannel]:
+        return [channel for channel in self.channels if isinstance(channel, FakeTextChannel)]
+
+    @property
+    def voice_channels(self) -> List[FakeVoiceChannel]:
+        return [channel for channel in self.channels if isinstance(channel, FakeVoiceChannel)]
+
+    async def create_text_channel(self, name: str, **options: Any) -> FakeTextChannel:
+        return await self.guild.create_text_channel(name, category=self, **options)
+
+    async def create_voice_channel(self, name: str, **options: Any) -> FakeVoiceChannel:
+        return await self.guild.create_voice_channel(name, category=self, **options)
+
+
+class FakeHTTP:
+    """The ``discord.http.HTTPClient`` endpoints the provisioner calls directly."""
+
+    def __init__(self, guild: "FakeGuild") -> None:
+        self.guild = guild
+
+    async def bulk_channel_update(self, guild_id: int, data: List[Dict[str, Any]], *, reason: Optional[str] = None) -> None:
+        await self.guild.api.request("PATCH /guilds/{guild_id}/channels", guild_id)
+        for entry in data:
+            channel = self.guild.get_channel(int(entry["id"]))
+            if channel is None:
+                continue
+            channel.position = entry["position"]
+            if "parent_id" in entry:
+                channel.category_id = entry["parent_id"]
+
+
+class _FakeConnectionState:
+    def __init__(self, guild: "FakeGuild") -> None:
+        self.http = FakeHTTP(guild)
+
+
+class FakeGuild:
+    """A guild whose state lives in memory and whose API calls are simulated."""
+
+    def __init__(
+        self,
+        name: str = "Fake Guild",
+        *,
+        api: Optional[FakeDiscordAPI] = None,
+        guild_id: int = 100000000000000000,
+        bitrate_limit: float = 96000.0,
+    ) -> None:
+        self.name = name
+        self.id = guild_id
+        self.api = api or FakeDiscordAPI()
+        self.bitrate_limit = bitrate_limit
+        self._ids = itertools.count(guild_id + 1)
+        self.default_role = FakeRole(self, guild_id, "@everyone")
+        self._roles: Dict[int, FakeRole] = {self.default_role.id: self.default_role}
+        self._channels: Dict[int, FakeGuildChannel] = {}
+        self._state = _FakeConnectionState(self)
+
+    def next_id(self) -> int:
+        return next(self._ids)
+
+    @property
+    def roles(self) -> List[FakeRole]:
+        return list(self._roles.values())
+
+    @property
+    def channels(self) -> List[FakeGuildChannel]:
+        return list(self._channels.values())
+
+    @property
+    def categories(self) -> List[FakeCategory]:
+        categories = [channel for channel in self._channels.values() if isinstance(channel, FakeCategory)]
+        return sorted(categories, key=lambda channel: (channel.position, channel.id))
+
+    @property
+    def text_channels(self) -> List[FakeTextChannel]:
+        return [channel for channel in self._channels.values() if isinstance(channel, FakeTextChannel)]
+
+    def get_role(self, role_id: int) -> Optional[FakeRole]:
+        return self._roles.get(role_id)
+
+    def get_channel(self, channel_id: Optional[int]) -> Optional[FakeGuildChannel]:
+        return self._channels.get(channel_id) if channel_id is not None else None
+
+    async def create_role(self, *, reason: Optional[str] = None, **fields: Any) -> FakeRole:
+        await self.api.request("POST /guilds/{guild_id}/roles", self.id)
+        role = FakeRole(self, self.next_id(), **fields)
+        self._roles[role.id] = role
+        return role
+
+    async def _create_channel(
+        self,
+        channel_cls: Type[FakeGuildChannel],
+        name: str,
+        *,
+        category: Optional[FakeCategory],
+        position: Optional[int],
+        overwrites: Optional[Mapping[Any, discord.PermissionOverwrite]],
+        **attributes: Any,
+    ) -> Any:
+        await self.api.request("POST /guilds/{guild_id}/channels", self.id)
+        if position is None:
+            position = sum(1 for channel in self._channels.values() if channel.category_id == (category.id if category else None))
+        attributes = {key: value for key, value in attributes.items() if value is not None}
+        channel = channel_cls(
+            self,
+            self.next_id(),
+            name,
+            category_id=category.id if category else None,
+            position=position,
+            overwrites=overwrites,
+            **attributes,
+        )
+        self._channels[channel.id] = channel
+        return channel
+
+    async def fetch_channels(self) -> List[FakeGuildChannel]:
+        await self.api.request("GET /guilds/{guild_id}/channels", self.id)
+        return self.channels
+
+    # The create methods mirror the keyword-only parameters of discord.py's
+    # ``Guild.create_*`` so a call the real API would reject fails here too.
+    async def create_category(
+        self,
+        name: str,
+        *,
+        overwrites: Optional[Mapping[Any, discord.PermissionOverwrite]] = None,
+        reason: Optional[str] = None,
+        position: Optional[int] = None,
+    ) -> FakeCategory:
+        return await self._create_channel(FakeCategory, name, category=None, position=position, overwrites=overwrites)
+
+    async def create_text_channel(
+        self,
+        name: str,
+        *,
+        reason: Optional[str] = None,
+        category: Optional[FakeCategory] = None,
+        news: bool = False,
+        position: Optional[int] = None,
+        topic: Optional[str] = None,
+        slowmode_delay: Optional[int] = None,
+        nsfw: bool = False,
+        overwrites: Optional[Mapping[Any, discord.PermissionOverwrite]] = None,
+        default_auto_archive_duration: Optional[int] = None,
+        default_thread_slowmode_delay: Optional[int] = None,
+    ) -> FakeTextChannel:
+        return await self._create_channel(
+            FakeTextChannel,
+            name,
+            category=category,
+            position=position,
+            overwrites=overwrites,
+            topic=topic,
+            slowmode_delay=slowmode_delay,
+        )
+
+    async def create_voice_channel(
+        self,
+        name: str,
+        *,
+        reason: Optional[str] = None,
+        category: Optional[FakeCategory] = None,
+        position: Optional[int] = None,
+        bitrate: Optional[int] = None,
+        user_limit: Optional[int] = None,
+        rtc_region: Optional[str] = None,
+        video_quality_mode: Optional[discord.VideoQualityMode] = None,
+        overwrites: Optional[Mapping[Any, discord.PermissionOverwrite]] = None,
+        nsfw: bool = False,
+    ) -> FakeVoiceChannel:
+        return await self._create_channel(
+            FakeVoiceChannel,
+            name,
+            category=category,
+            position=position,
+            overwrites=overwrites,
+            bitrate=bitrate,
+            user_limit=user_limit,
+        )
+
+    async def create_stage_channel(
+        self,
+        name: str,
+        *,
+        reason: Optional[str] = None,
+        category: Optional[FakeCategory] = None,
+        position: Optional[int] = None,
+        bitrate: Optional[int] = None,
+        user_limit: Optional[int] = None,
+        rtc_region: Optional[str] = None,
+        video_quality_mode: Optional[discord.VideoQualityMode] = None,
+        overwrites: Optional[Mapping[Any, discord.PermissionOverwrite]] = None,
+        nsfw: bool = False,
+    ) -> FakeStageChannel:
+        return await self._create_channel(
+            FakeStageChannel,
+            name,
+            category=category,
+            position=position,
+            overwrites=overwrites,
+            bitrate=bitrate,
+            user_limit=user_limit,
+        )
+
+
+async def _timed_run(
+    label: str, guild: FakeGuild, spec: CompiledSpec, state_path: Path, **options: Any
+) -> Dict[str, Any]:
+    from create_discord_server import reconcile_guild
+
+    guild.api.reset()
+    started = time.perf_counter()
+    plan, _ = await reconcile_guild(
+        guild,  # type: ignore[arg-type]
+        spec,
+        state_path=state_path,
+        echo=lambda _: None,
+        **options,
+    )
+    elapsed = time.perf_counter() - started
+    return {
+        "run": label,
+        "changes": len(plan.pending()),
+        "seconds": elapsed,
+        "calls": guild.api.total_calls,
+        "writes": guild.api.write_calls,
+        "rate_limited": sum(guild.api.rate_limited.values()),
+    }
+
+
+async def benchmark(latency: float) -> List[Dict[str, Any]]:
+    from create_discord_server import RateBudget, load_spec
+
+    spec = load_spec()
+    sequential_guild = FakeGuild("Sequential", api=FakeDiscordAPI(latency=latency))
+    parallel_guild = FakeGuild("Parallel", api=FakeDiscordAPI(latency=latency))
+    with tempfile.TemporaryDirectory() as workdir:
+        sequential_state = Path(workdir) / "sequential_state.json"
+        parallel_state = Path(workdir) / "parallel_state.json"
+        rows = [
+            await _timed_run(
+                "sequential", sequential_guild, spec, sequential_state, concurrency=1, budget=RateBudget(50.0, 1)
+            ),
+            await _timed_run("parallel", parallel_guild, spec, parallel_state),
+            await _timed_run("no-op reconcile", parallel_guild, spec, parallel_state),
+        ]
+        # Rename one channel behind the provisioner's back: the recorded ID
+        # anchors it, so the reconcile renames it back instead of duplicating.
+        renamed = parallel_guild.text_channels[0]
+        renamed.name = f"{renamed.name}-renamed"
+        channel_count = len(parallel_guild.channels)
+        rows.append(await _timed_run("rename drift", parallel_guild, spec, parallel_state))
+        if len(parallel_guild.channels) != channel_count:
+            raise RuntimeError("Rename drift created a duplicate channel")
+        rows.append(await _timed_run("no-op (REST)", parallel_guild, spec, parallel_state, fetch_state=True))
+    return rows
+
+
+async def batch_benchmark(latency: float, guild_count: int, guild_concurrency: int) -> str:
+    from create_discord_server import reconcile_guilds, render_batch_summary, load_spec
+
+    spec = load_spec()
+    guilds = [
+        FakeGuild(f"Client {index + 1}", api=FakeDiscordAPI(latency=latency), guild_id=(index + 1) * 10**17)
+        for index in range(guild_count)
+    ]
+    with tempfile.TemporaryDirectory() as workdir:
+        started = time.perf_counter()
+        results = await reconcile_guilds(
+            guilds,  # type: ignore[arg-type]
+            spec,
+            guild_concurrency=guild_concurrency,
+            state_path_for=lambda guild_id: Path(workdir) / f"server_state.{guild_id}.json",
+            echo=lambda _: None,
+        )
+        elapsed = time.perf_counter() - started
+    return f"{render_batch_summary(results)}\nBatch wall-clock: {elapsed:.2f}s"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the provisioner against an in-process fake guild.")
+    parser.add_argument("--latency", type=float, default=0.05, help="simulated API round trip in seconds")
+    parser.add_argument("--guilds", type=int, default=0, help="also batch-provision this many fake guilds")
+    parser.add_argument("--guild-concurrency", type=int, default=3, help="guilds reconciled at once in the batch run")
+    args = parser.parse_args()
+    rows = asyncio.run(benchmark(args.latency))
+    print(f"{'run':<16} {'changes':>8} {'seconds':>8} {'calls':>6} {'writes':>7} {'429s':>5}")
+    for row in rows:
+        print(
+            f"{row['run']:<16} {row['changes']:>8} {row['seconds']:>8.2f} {row['calls']:>6} "
+            f"{row['writes']:>7} {row['rate_limited']:>5}"
+        )
+    if args.guilds:
+        print()
+        print(asyncio.run(batch_benchmark(args.latency, args.guilds, args.guild_concurrency)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,523 @@
+"""Compile ``server_spec.json`` into validated, ready-to-apply blueprint objects.
+
+The compiler checks the whole blueprint before the provisioner touches a guild:
+permission flag names, role colours, channel types and fields, roles referenced
+by overwrites, webhook target channels and duplicate names. Every problem is
+collected and reported together as a :class:`SpecError`.
+
+Two composition features keep large blueprints manageable:
+
+``include``
+    A list of spec files (relative to the including file) whose ``roles``,
+    ``categories``, ``webhooks``, ``channel_templates`` and ``state_files``
+    are appended to the including document.
+``channel_templates`` / ``extends``
+    Named partial channel definitions. A channel or another template names its
+    parent with ``"extends"``; fields are inherited and overwrites are merged
+    per role, with the child's entries winning.
+
+Role permissions and channel overwrites are compiled to integer bitfields once,
+and the compiled result is cached in ``.server_spec.compiled.json`` keyed by the
+SHA-256 of every source file, so unchanged blueprints load without re-parsing.
+
+Usage
+-----
+```
+python spec_compiler.py                  # validate server_spec.json
+python spec_compiler.py other_spec.json  # validate another blueprint
+```
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+import discord
+
+ROOT = Path(__file__).resolve().parent
+SPEC_PATH = ROOT / "server_spec.json"
+CACHE_PATH = ROOT / ".server_spec.compiled.json"
+COMPILER_VERSION = 1
+
+CHANNEL_TYPES = {
+    "text": discord.ChannelType.text,
+    "voice": discord.ChannelType.voice,
+    "stage": discord.ChannelType.stage_voice,
+}
+CHANNEL_FIELDS = {"name", "type", "topic", "slowmode_delay", "bitrate", "user_limit", "overwrites", "extends"}
+ROLE_FIELDS = {"name", "colour", "hoist", "mentionable", "permissions"}
+COLOUR_PATTERN = re.compile(r"^#[0-9a-fA-F]{6}$")
+VALID_PERMISSIONS = frozenset(discord.Permissions.VALID_FLAGS)
+MAX_TOPIC_LENGTH = 1024
+MAX_SLOWMODE_DELAY = 21600
+MAX_USER_LIMIT = 99
+
+OverwriteState = Dict[str, Tuple[int, int]]
+
+
+@dataclass
+class RoleSpec:
+    """Data class describing a role defined in the specification."""
+
+    name: str
+    colour: int
+    hoist: bool
+    mentionable: bool
+    permissions: int
+
+    def to_kwargs(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "colour": discord.Colour(self.colour),
+            "hoist": self.hoist,
+            "mentionable": self.mentionable,
+            "permissions": discord.Permissions(self.permissions),
+        }
+
+
+@dataclass
+class ChannelSpec:
+    name: str
+    type: str
+    topic: Optional[str] = None
+    slowmode_delay: Optional[int] = None
+    bitrate: Optional[int] = None
+    user_limit: Optional[int] = None
+    overwrites: Optional[OverwriteState] = None
+
+
+@dataclass
+class CategorySpec:
+    name: str
+    channels: List[ChannelSpec]
+
+
+@dataclass
+class WebhookSpec:
+    name: str
+    channel: str
+
+
+@dataclass
+class CompiledSpec:
+    """A validated blueprint with inheritance resolved and permissions precomputed."""
+
+    roles: List[RoleSpec]
+    categories: List[CategorySpec]
+    webhooks: List[WebhookSpec]
+    state_files: List[str] = field(default_factory=list)
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    digest: str = ""
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "CompiledSpec":
+        categories = []
+        for category in data["categories"]:
+            channels = []
+            for channel in category["channels"]:
+                overwrites = channel.get("overwrites")
+                if overwrites is not None:
+                    overwrites = {target: (pair[0], pair[1]) for target, pair in overwrites.items()}
+                channels.append(ChannelSpec(**{**channel, "overwrites": overwrites}))
+            categories.append(CategorySpec(name=category["name"], channels=channels))
+        return cls(
+            roles=[RoleSpec(**role) for role in data["roles"]],
+            categories=categories,
+            webhooks=[WebhookSpec(**webhook) for webhook in data["webhooks"]],
+            state_files=list(data.get("state_files", [])),
+            metadata=dict(data.get("metadata", {})),
+            digest=data.get("digest", ""),
+        )
+
+
+class SpecError(ValueError):
+    """Raised when a blueprint fails validation; ``problems`` lists every issue found."""
+
+    def __init__(self, problems: List[str]) -> None:
+        self.problems = problems
+        listing = "\n".join(f"  - {problem}" for problem in problems)
+        super().__init__(f"{len(problems)} problem(s) in the blueprint:\n{listing}")
+
+
+def channel_type_for(spec: ChannelSpec) -> discord.ChannelType:
+    channel_type = CHANNEL_TYPES.get(spec.type.lower())
+    if channel_type is None:
+        raise ValueError(f"Unsupported channel type: {spec.type}")
+    return channel_type
+
+
+def _sha256(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+class _Sources:
+    """Reads the root spec and its includes, recording each file's content hash."""
+
+    def __init__(self) -> None:
+        self.hashes: Dict[str, str] = {}
+        self.problems: List[str] = []
+
+    def load(self, path: Path, stack: Tuple[Path, ...] = ()) -> Dict[str, Any]:
+        path = path.resolve()
+        merged: Dict[str, Any] = {
+            "metadata": {},
+            "roles": [],
+            "categories": [],
+            "webhooks": [],
+            "channel_templates": {},
+            "state_files": [],
+        }
+        if path in stack:
+            chain = " -> ".join(item.name for item in (*stack, path))
+            self.problems.append(f"include cycle: {chain}")
+            return merged
+        try:
+            raw = path.read_bytes()
+            document = json.loads(raw)
+        except FileNotFoundError:
+            self.problems.append(f"{path.name}: file not found")
+            return merged
+        except json.JSONDecodeError as exc:
+            self.problems.append(f"{path.name}: invalid JSON ({exc})")
+            return merged
+        self.hashes[str(path)] = hashlib.sha256(raw).hexdigest()
+        if not isinstance(document, dict):
+            self.problems.append(f"{path.name}: top level must be an object")
+            return merged
+
+        self._merge(merged, document, path.name)
+        includes = document.get("include", [])
+        if not isinstance(includes, list):
+            self.problems.append(f"{path.name}: include must be a list of paths")
+            includes = []
+        for include in includes:
+            self._merge(merged, self.load(path.parent / str(include), (*stack, path)), path.name)
+        return merged
+
+    def _merge(self, merged: Dict[str, Any], document: Mapping[str, Any], source: str) -> None:
+        if isinstance(document.get("metadata"), dict) and not merged["metadata"]:
+            merged["metadata"] = dict(document["metadata"])
+        for key in ("roles", "categories", "webhooks"):
+            items = document.get(key, [])
+            if not isinstance(items, list):
+                self.problems.append(f"{source}: {key} must be a list")
+                continue
+            merged[key].extend(items)
+        templates = document.get("channel_templates", {})
+        if not isinstance(templates, dict):
+            self.problems.append(f"{source}: channel_templates must be an object")
+            templates = {}
+        for name, template in templates.items():
+            if name in merged["channel_templates"]:
+                self.problems.append(f"{source}: channel template '{name}' is defined more than once")
+            merged["channel_templates"][name] = template
+        for state_file in document.get("state_files", []):
+            if state_file not in merged["state_files"]:
+                merged["state_files"].append(state_file)
+
+
+def _merge_channel(base: Mapping[str, Any], child: Mapping[str, Any]) -> Dict[str, Any]:
+    merged = {**base, **{key: value for key, value in child.items() if key != "extends"}}
+    if "overwrites" in base and "overwrites" in child:
+        merged["overwrites"] = {**base["overwrites"], **child["overwrites"]}
+    merged.pop("extends", None)
+    return merged
+
+
+class _Compiler:
+    def __init__(self, document: Mapping[str, Any], problems: List[str]) -> None:
+        self.document = document
+        self.problems = problems
+        self.templates: Mapping[str, Any] = document["channel_templates"]
+        self._resolved: Dict[str, Dict[str, Any]] = {}
+        self.role_names: List[str] = []
+
+    def error(self, path: str, message: str) -> None:
+        self.problems.append(f"{path}: {message}")
+
+    def permissions(self, raw: Any, path: str) -> int:
+        if not isinstance(raw, dict):
+            self.error(path, "must map permission names to true/false")
+            return 0
+        flags: Dict[str, bool] = {}
+        for flag, enabled in raw.items():
+            if flag not in VALID_PERMISSIONS:
+                self.error(path, f"unknown permission '{flag}'")
+            elif not isinstance(enabled, bool):
+                self.error(f"{path}.{flag}", "must be true or false")
+            else:
+                flags[flag] = enabled
+        return discord.Permissions(**flags).value
+
+    def roles(self) -> List[RoleSpec]:
+        specs: List[RoleSpec] = []
+        seen: Dict[str, str] = {}
+        for index, raw in enumerate(self.document["roles"]):
+            path = f"roles[{index}]"
+            if not isinstance(raw, dict) or not isinstance(raw.get("name"), str) or not raw["name"].strip():
+                self.error(path, "must be an object with a non-empty name")
+                continue
+            name = raw["name"]
+            path = f"roles[{name}]"
+            if name == "@everyone":
+                self.error(path, "@everyone is managed by Discord and cannot be declared")
+            if name in seen:
+                self.error(path, f"duplicate role name (first declared at {seen[name]})")
+            seen[name] = f"roles[{index}]"
+            for key in sorted(set(raw) - ROLE_FIELDS):
+                self.error(path, f"unknown field '{key}'")
+            colour = raw.get("colour", "#000000")
+            colour_value = 0
+            if not isinstance(colour, str) or not COLOUR_PATTERN.match(colour):
+                self.error(f"{path}.colour", f"expected '#RRGGBB', got {colour!r}")
+            else:
+                colour_value = int(colour[1:], 16)
+            for flag in ("hoist", "mentionable"):
+                if not isinstance(raw.get(flag, False), bool):
+                    self.error(f"{path}.{flag}", "must be true or false")
+            specs.append(
+                RoleSpec(
+                    name=name,
+                    colour=colour_value,
+                    hoist=bool(raw.get("hoist", False)),
+                    mentionable=bool(raw.get("mentionable", False)),
+                    permissions=self.permissions(raw.get("permissions", {}), f"{path}.permissions"),
+                )
+            )
+        self.role_names = list(seen)
+        return specs
+
+    def template(self, name: str, path: str, chain: Tuple[str, ...] = ()) -> Dict[str, Any]:
+        if name in self._resolved:
+            return self._resolved[name]
+        if name in chain:
+            self.error(path, f"template inheritance cycle: {' -> '.join((*chain, name))}")
+            return {}
+        raw = self.templates.get(name)
+        if not isinstance(raw, dict):
+            self.error(path, f"unknown channel template '{name}'")
+            return {}
+        for key in sorted(set(raw) - CHANNEL_FIELDS):
+            self.error(f"channel_templates[{name}]", f"unknown field '{key}'")
+        resolved = self.inherit(raw, f"channel_templates[{name}]", (*chain, name))
+        self._resolved[name] = resolved
+        return resolved
+
+    def inherit(self, raw: Mapping[str, Any], path: str, chain: Tuple[str, ...] = ()) -> Dict[str, Any]:
+        parent = raw.get("extends")
+        if parent is None:
+            return _merge_channel({}, raw)
+        if not isinstance(parent, str):
+            self.error(f"{path}.extends", "must be a template name")
+            return _merge_channel({}, raw)
+        return _merge_channel(self.template(parent, f"{path}.extends", chain), raw)
+
+    def overwrites(self, raw: Any, path: str) -> Optional[OverwriteState]:
+        if raw is None:
+            return None
+        if not isinstance(raw, dict):
+            self.error(path, "must map role names to allow/deny lists")
+            return None
+        compiled: OverwriteState = {}
+        for target, perms in raw.items():
+            target_path = f"{path}[{target}]"
+            if target != "@everyone" and target not in self.role_names:
+                self.error(target_path, f"references role '{target}' which is not declared in roles")
+            if not isinstance(perms, dict) or set(perms) - {"allow", "deny"}:
+                self.error(target_path, "must only contain 'allow' and 'deny' lists")
+                continue
+            overwrite_kwargs: Dict[str, bool] = {}
+            for key, enabled in (("allow", True), ("deny", False)):
+                flags = perms.get(key, [])
+                if not isinstance(flags, list):
+                    self.error(f"{target_path}.{key}", "must be a list of permission names")
+                    continue
+                for flag in flags:
+                    if flag not in VALID_PERMISSIONS:
+                        self.error(f"{target_path}.{key}", f"unknown permission '{flag}'")
+                    elif overwrite_kwargs.get(flag, enabled) != enabled:
+                        self.error(target_path, f"'{flag}' is both allowed and denied")
+                    else:
+                        overwrite_kwargs[flag] = enabled
+            allow, deny = discord.PermissionOverwrite(**overwrite_kwargs).pair()
+            compiled[target] = (allow.value, deny.value)
+        return compiled
+
+    def _integer(self, raw: Mapping[str, Any], key: str, path: str, low: int, high: Optional[int]) -> Optional[int]:
+        value = raw.get(key)
+        if value is None:
+            return None
+        if not isinstance(value, int) or isinstance(value, bool) or value < low or (high is not None and value > high):
+            bound = f"{low}..{high}" if high is not None else f">= {low}"
+            self.error(f"{path}.{key}", f"must be an integer in {bound}, got {value!r}")
+            return None
+        return value
+
+    def channel(self, raw: Any, path: str) -> Optional[ChannelSpec]:
+        if not isinstance(raw, dict):
+            self.error(path, "must be an object")
+            return None
+        for key in sorted(set(raw) - CHANNEL_FIELDS):
+            self.error(path, f"unknown field '{key}'")
+        resolved = self.inherit(raw, path)
+        name = resolved.get("name")
+        if not isinstance(name, str) or not name.strip():
+            self.error(path, "channel needs a non-empty name")
+            return None
+        path = f"{path.rsplit('[', 1)[0]}[{name}]"
+        channel_type = resolved.get("type")
+        if not isinstance(channel_type, str) or channel_type.lower() not in CHANNEL_TYPES:
+            self.error(f"{path}.type", f"must be one of {', '.join(CHANNEL_TYPES)}, got {channel_type!r}")
+            return None
+        topic = resolved.get("topic")
+        if topic is not None and (not isinstance(topic, str) or len(topic) > MAX_TOPIC_LENGTH):
+            self.error(f"{path}.topic", f"must be a string of at most {MAX_TOPIC_LENGTH} characters")
+            topic = None
+        return ChannelSpec(
+            name=name,
+            type=channel_type.lower(),
+            topic=topic,
+            slowmode_delay=self._integer(resolved, "slowmode_delay", path, 0, MAX_SLOWMODE_DELAY),
+            bitrate=self._integer(resolved, "bitrate", path, 8000, None),
+            user_limit=self._integer(resolved, "user_limit", path, 0, MAX_USER_LIMIT),
+            overwrites=self.overwrites(resolved.get("overwrites"), f"{path}.overwrites"),
+        )
+
+    def categories(self) -> List[CategorySpec]:
+        specs: List[CategorySpec] = []
+        seen: set = set()
+        for index, raw in enumerate(self.document["categories"]):
+            if not isinstance(raw, dict) or not isinstance(raw.get("name"), str) or not raw["name"].strip():
+                self.error(f"categories[{index}]", "must be an object with a non-empty name")
+                continue
+            name = raw["name"]
+            path = f"categories[{name}]"
+            if name in seen:
+                self.error(path, "duplicate category name")
+            seen.add(name)
+            channels: List[ChannelSpec] = []
+            channel_keys: set = set()
+            for channel_index, channel_raw in enumerate(raw.get("channels", [])):
+                channel = self.channel(channel_raw, f"{path}.channels[{channel_index}]")
+                if channel is None:
+                    continue
+                key = (channel.name, channel.type)
+                if key in channel_keys:
+                    self.error(f"{path}.channels[{channel.name}]", f"duplicate {channel.type} channel in this category")
+                channel_keys.add(key)
+                channels.append(channel)
+            specs.append(CategorySpec(name=name, channels=channels))
+        return specs
+
+    def webhooks(self, categories: List[CategorySpec]) -> List[WebhookSpec]:
+        text_channels = {
+            channel.name for category in categories for channel in category.channels if channel.type == "text"
+        }
+        specs: List[WebhookSpec] = []
+        seen: set = set()
+        for index, raw in enumerate(self.document["webhooks"]):
+            path = f"webhooks[{index}]"
+            if not isinstance(raw, dict) or not isinstance(raw.get("name"), str) or not isinstance(raw.get("channel"), str):
+                self.error(path, "must be an object with 'name' and 'channel' strings")
+                continue
+            spec = WebhookSpec(name=raw["name"], channel=raw["channel"])
+            path = f"webhooks[{spec.channel}/{spec.name}]"
+            if spec.channel not in text_channels:
+                self.error(path, f"channel '{spec.channel}' is not a text channel in the blueprint")
+            if (spec.channel, spec.name) in seen:
+                self.error(path, "duplicate webhook")
+            seen.add((spec.channel, spec.name))
+            specs.append(spec)
+        return specs
+
+
+def _digest(hashes: Mapping[str, str]) -> str:
+    payload = json.dumps({"version": COMPILER_VERSION, "sources": dict(sorted(hashes.items()))})
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _read_cache(cache_path: Path, spec_path: Path) -> Optional[CompiledSpec]:
+    try:
+        cached = json.loads(cache_path.read_text(encoding="utf-8"))
+        if cached.get("version") != COMPILER_VERSION or cached.get("root") != str(spec_path):
+            return None
+        hashes = cached["sources"]
+        if any(_sha256(Path(source)) != digest for source, digest in hashes.items()):
+            return None
+        return CompiledSpec.from_dict(cached["spec"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def _write_cache(cache_path: Path, spec_path: Path, hashes: Mapping[str, str], compiled: CompiledSpec) -> None:
+    payload = {"version": COMPILER_VERSION, "root": str(spec_path), "sources": dict(hashes), "spec": compiled.to_dict()}
+    temporary = cache_path.with_name(f".{cache_path.name}.tmp")
+    try:
+        temporary.write_text(json.dumps(payload), encoding="utf-8")
+        os.replace(temporary, cache_path)
+    except OSError:
+        pass  # The cache is an optimisation; a read-only checkout still compiles.
+
+
+def compile_spec(path: Path = SPEC_PATH, *, cache_path: Optional[Path] = CACHE_PATH) -> CompiledSpec:
+    """Validate and compile a blueprint, reusing the cached result when no source changed."""
+    path = path.resolve()
+    if cache_path is not None:
+        cached = _read_cache(cache_path, path)
+        if cached is not None:
+            return cached
+
+    sources = _Sources()
+    document = sources.load(path)
+    problems = list(sources.problems)
+    compiler = _Compiler(document, problems)
+    roles = compiler.roles()
+    categories = compiler.categories()
+    webhooks = compiler.webhooks(categories)
+    for name in compiler.templates:
+        compiler.template(name, f"channel_templates[{name}]")
+    if problems:
+        raise SpecError(problems)
+
+    compiled = CompiledSpec(
+        roles=roles,
+        categories=categories,
+        webhooks=webhooks,
+        state_files=document["state_files"],
+        metadata=document["metadata"],
+        digest=_digest(sources.hashes),
+    )
+    if cache_path is not None:
+        _write_cache(cache_path, path, sources.hashes, compiled)
+    return compiled
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Validate and compile a Discord blueprint.")
+    parser.add_argument("spec", nargs="?", type=Path, default=SPEC_PATH, help="blueprint to compile")
+    parser.add_argument("--no-cache", action="store_true", help="ignore and do not update the compiled cache")
+    args = parser.parse_args()
+    try:
+        compiled = compile_spec(args.spec, cache_path=None if args.no_cache else CACHE_PATH)
+    except SpecError as exc:
+        print(exc, file=sys.stderr)
+        sys.exit(1)
+    channels = sum(len(category.channels) for category in compiled.categories)
+    print(
+        f"{args.spec.name}: {len(compiled.roles)} roles, {len(compiled.categories)} categories, "
+        f"{channels} channels, {len(compiled.webhooks)} webhooks (digest {compiled.digest[:12]})"
+    )
+
+
+if __name__ == "__main__":
+    main()